@@ -0,0 +1,4 @@
+"""
+Benchmarks of the client's hot paths, run against an in-process stand-in server.
+See `benchmarks.run`.
+"""
@@ -0,0 +1,94 @@
+"""
+Check the cost of importing the package and creating a client, which every
+short-lived script pays before its first request:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 100 --runs 10
+
+Exits with status 1 if the best run is over the budget, or if a module that
+should only be loaded by the first request was imported. Both are enforced by
+tests/test_import_time.py.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import typing as t
+
+
+# Measured about 70ms on a laptop, the budget leaves room for slower machines
+DEFAULT_BUDGET_MS = 150.0
+# Loaded when the first request is sent, or by the async client only
+DEFERRED_MODULES = ["asyncio", "httpx", "numpy", "requests", "sqlite3", "urllib3"]
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import push_to_3yourmind
+client = push_to_3yourmind.PushTo3YourmindAPI(
+    access_token="token", base_url="https://example.com"
+)
+duration = time.perf_counter() - started
+print(json.dumps({
+    "milliseconds": duration * 1000,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def measure_once() -> t.Dict[str, t.Any]:
+    """
+    Import in a fresh interpreter, modules cached by an earlier import in this
+    process would hide the cost
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_SCRIPT % DEFERRED_MODULES],
+        check=True,
+        capture_output=True,
+        cwd=PROJECT_DIR,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def measure(runs: int = 5) -> t.Dict[str, t.Any]:
+    measurements = [measure_once() for _ in range(runs)]
+    durations = sorted(measurement["milliseconds"] for measurement in measurements)
+    return {
+        "runs": runs,
+        "best_ms": durations[0],
+        "median_ms": durations[len(durations) // 2],
+        "loaded_deferred_modules": sorted(
+            {name for measurement in measurements for name in measurement["loaded"]}
+        ),
+    }
+
+
+def main(argv: t.Optional[t.Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs)
+    print(json.dumps(result, indent=2))
+    failures = []
+    if result["best_ms"] > args.budget_ms:
+        failures.append(
+            f"import took {result['best_ms']:.1f}ms, "
+            f"over the budget of {args.budget_ms:.0f}ms"
+        )
+    if result["loaded_deferred_modules"]:
+        failures.append(
+            "modules loaded at import: "
+            + ", ".join(result["loaded_deferred_modules"])
+        )
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
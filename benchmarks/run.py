@@ -0,0 +1,468 @@
+"""
+Run the benchmarks and write their results as JSON:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --quick --only request_rate pagination
+    python -m benchmarks.run --output new.json --compare old.json
+"""
+import argparse
+import csv
+import datetime
+import importlib.metadata
+import importlib.util
+import json
+import logging
+import os
+import pathlib
+import platform
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types as python_types
+import typing as t
+
+import push_to_3yourmind
+from push_to_3yourmind import FileStatusPoller, PushTo3YourmindAPI, td
+
+from benchmarks import import_time
+from benchmarks.server import StandInServer
+
+
+REPOSITORY_DIR = pathlib.Path(__file__).resolve().parent.parent
+EXAMPLES_DIR = REPOSITORY_DIR / "examples"
+MEGABYTE = 1024 * 1024
+
+Result = t.Dict[str, t.Any]
+Benchmark = t.Callable[[bool], Result]
+
+BENCHMARKS: t.Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str) -> t.Callable[[Benchmark], Benchmark]:
+    def decorator(function: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = function
+        return function
+
+    return decorator
+
+
+def create_client(server: StandInServer, **kwargs: t.Any) -> PushTo3YourmindAPI:
+    return PushTo3YourmindAPI(
+        access_token="benchmark", base_url=server.url, retry_policy=None, **kwargs
+    )
+
+
+def create_fast_poller() -> FileStatusPoller:
+    """
+    The stand-in server finishes file analysis at once, checking it sooner
+    than a real client would keeps runs short
+    """
+    return FileStatusPoller(min_interval=0.01, max_interval=0.05, max_workers=8)
+
+
+def write_cube_stl(path: pathlib.Path) -> None:
+    vertices = [(x, y, z) for x in (0, 10) for y in (0, 10) for z in (0, 10)]
+    faces = [
+        (0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+        (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3),
+    ]  # fmt: skip
+    with open(path, "wb") as stl_file:
+        stl_file.write(b"benchmark cube".ljust(80, b" "))
+        stl_file.write(struct.pack("<I", len(faces)))
+        for face in faces:
+            corners = [value for index in face for value in vertices[index]]
+            stl_file.write(struct.pack("<12fH", 0, 0, 0, *corners, 0))
+
+
+def load_example(relative_path: str) -> python_types.ModuleType:
+    path = EXAMPLES_DIR / relative_path
+    spec = importlib.util.spec_from_file_location(f"example_{path.stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure_flow(flow: t.Callable[[int], None]) -> Result:
+    """
+    Run a flow twice: once timed, once to get the peak of memory allocated by
+    Python code, as tracing allocations slows the flow down. The flow gets the
+    number of the run.
+    """
+    started = time.perf_counter()
+    flow(0)
+    duration = time.perf_counter() - started
+    tracemalloc.start()
+    try:
+        flow(1)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": duration, "peak_memory_mb": peak / MEGABYTE}
+
+
+@benchmark("import_time")
+def bench_import_time(quick: bool) -> Result:
+    """
+    Milliseconds to import the package and create a client, in a fresh interpreter
+    """
+    return import_time.measure(runs=3 if quick else 10)
+
+
+@benchmark("request_rate")
+def bench_request_rate(quick: bool) -> Result:
+    """
+    Requests per second of `_request`, from one thread and from 8 threads
+    """
+    count = 500 if quick else 5000
+    threads = 8
+    with StandInServer() as server:
+        client = create_client(server, pool_maxsize=threads)
+        namespace = client.common
+        for _ in range(50):
+            namespace._request("GET", "ping/")
+
+        started = time.perf_counter()
+        for _ in range(count):
+            namespace._request("GET", "ping/")
+        sequential = time.perf_counter() - started
+
+        def send(number: int) -> None:
+            for _ in range(number):
+                namespace._request("GET", "ping/")
+
+        workers = [
+            threading.Thread(target=send, args=(count // threads,))
+            for _ in range(threads)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        concurrent = time.perf_counter() - started
+        client.close()
+
+    return {
+        "requests": count,
+        "requests_per_second": count / sequential,
+        "mean_latency_ms": sequential / count * 1000,
+        "threads": threads,
+        "threaded_requests_per_second": count // threads * threads / concurrent,
+    }
+
+
+@benchmark("pagination")
+def bench_pagination(quick: bool) -> Result:
+    """
+    Time spent by the pagination helpers on top of requesting the pages
+    """
+    user_count = 2000 if quick else 20000
+    page_size = 100
+    page_count = -(-user_count // page_size)
+    with StandInServer(user_count=user_count) as server:
+        client = create_client(server)
+        panel = client.organization_panel
+        panel.get_users(page=1, page_size=page_size)
+
+        def get_pages() -> None:
+            for page in range(1, page_count + 1):
+                panel.get_users(page=page, page_size=page_size)
+
+        def iterate(**kwargs: t.Any) -> t.Callable[[], None]:
+            def consume() -> None:
+                records = sum(1 for _ in panel.iter_users(page_size=page_size, **kwargs))
+                assert records == user_count, records
+
+            return consume
+
+        timings = {}
+        for name, function in (
+            ("pages_only", get_pages),
+            ("iterate", iterate(prefetch=False)),
+            ("iterate_prefetch", iterate(prefetch=True)),
+            ("iterate_models", iterate(prefetch=False, as_models=True)),
+        ):
+            # Best of 3, the loopback server makes single runs noisy
+            durations = []
+            for _ in range(3):
+                started = time.perf_counter()
+                function()
+                durations.append(time.perf_counter() - started)
+            timings[name] = min(durations)
+        client.close()
+
+    return {
+        "records": user_count,
+        "pages": page_count,
+        **{f"{name}_seconds": seconds for name, seconds in timings.items()},
+        "overhead_per_page_ms": (
+            (timings["iterate"] - timings["pages_only"]) / page_count * 1000
+        ),
+        "records_per_second": user_count / timings["iterate"],
+        "prefetch_records_per_second": user_count / timings["iterate_prefetch"],
+    }
+
+
+@benchmark("upload")
+def bench_upload(quick: bool) -> Result:
+    """
+    Throughput of `upload_cad_file` for a large file, streamed from disk
+    """
+    size = (16 if quick else 256) * MEGABYTE
+    repeat = 3
+    with tempfile.TemporaryDirectory() as directory, StandInServer() as server:
+        path = pathlib.Path(directory) / "large.stl"
+        with open(path, "wb") as large_file:
+            block = os.urandom(MEGABYTE)
+            for _ in range(size // MEGABYTE):
+                large_file.write(block)
+
+        client = create_client(server)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            client.user_panel.upload_cad_file(
+                basket_id=1, line_id=1, unit="mm", cad_file=str(path)
+            )
+            timings.append(time.perf_counter() - started)
+        client.close()
+
+    best = min(timings)
+    return {
+        "file_mb": size / MEGABYTE,
+        "repeat": repeat,
+        "best_seconds": best,
+        "megabytes_per_second": size / MEGABYTE / best,
+    }
+
+
+@benchmark("line_workflow")
+def bench_line_workflow(quick: bool) -> Result:
+    """
+    Parts per minute of the line creation workflow, one by one and in a batch,
+    with 5 ms of simulated network latency and one "analysing" status per file
+    """
+    sequential_count = 10 if quick else 50
+    batch_count = 40 if quick else 400
+    max_concurrency = 8
+    with tempfile.TemporaryDirectory() as directory, StandInServer(
+        latency=0.005, analysis_polls=1
+    ) as server:
+        cad_file = pathlib.Path(directory) / "cube.stl"
+        write_cube_stl(cad_file)
+        client = create_client(server, file_status_poller=create_fast_poller())
+        panel = client.user_panel
+
+        started = time.perf_counter()
+        for _ in range(sequential_count):
+            panel.create_line_with_cad_file_and_product(
+                basket_id=1, cad_file=str(cad_file), product_id=1, quantity=1
+            )
+        sequential = time.perf_counter() - started
+
+        items = [
+            td.CadFileLineConfig(cad_file=str(cad_file), product_id=1)
+            for _ in range(batch_count)
+        ]
+        started = time.perf_counter()
+        results = panel.create_lines_with_cad_files(
+            basket_id=1, items=items, max_concurrency=max_concurrency
+        )
+        batch = time.perf_counter() - started
+        assert all(result.ok for result in results)
+        client.close()
+
+    return {
+        "sequential_parts": sequential_count,
+        "sequential_parts_per_minute": sequential_count / sequential * 60,
+        "batch_parts": batch_count,
+        "batch_concurrency": max_concurrency,
+        "batch_parts_per_minute": batch_count / batch * 60,
+    }
+
+
+@benchmark("catalog_import_memory")
+def bench_catalog_import_memory(quick: bool) -> Result:
+    """
+    Peak memory and duration of the catalog import example
+    """
+    row_count = 50 if quick else 500
+    script = load_example("import_catalog_items/script.py")
+    script.logger.setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory, StandInServer() as server:
+        directory = pathlib.Path(directory)
+        cad_file = directory / "cube.stl"
+        write_cube_stl(cad_file)
+        attachment = directory / "attachment.txt"
+        attachment.write_text("benchmark attachment\n" * 100)
+        csv_path = directory / "items.csv"
+        with open(csv_path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["stl_file", "product_id"])
+            writer.writerows([str(cad_file), 1] for _ in range(row_count))
+
+        def mapper(row: dict) -> t.Any:
+            return script.ItemData(
+                cad_file=row["stl_file"],
+                product_id=int(row["product_id"]),
+                post_processings=[],
+                part_requirements=None,
+                attachments=[str(attachment)],
+            )
+
+        script.client = create_client(
+            server, file_status_poller=create_fast_poller(), pool_maxsize=32
+        )
+
+        def import_items(run_number: int) -> None:
+            script.import_catalog_items(
+                str(csv_path),
+                mapper,
+                is_dry_run=False,
+                journal_path=str(directory / f"journal-{run_number}.sqlite3"),
+            )
+
+        result = measure_flow(import_items)
+        script.client.close()
+
+    return {
+        "rows": row_count,
+        "rows_per_minute": row_count / result["seconds"] * 60,
+        **result,
+    }
+
+
+@benchmark("user_migration_memory")
+def bench_user_migration_memory(quick: bool) -> Result:
+    """
+    Peak memory and duration of the user migration example
+    """
+    user_count = 200 if quick else 2000
+    script = load_example("migrate_users.py")
+    script.logger.setLevel(logging.WARNING)
+    # The target organization starts empty, so no user is skipped as existing
+    with tempfile.TemporaryDirectory() as directory, StandInServer(
+        user_count=user_count
+    ) as origin_server, StandInServer(user_count=0) as target_server:
+        migrator = script.UserMigrator(
+            origin_access_token="benchmark",
+            origin_base_url=origin_server.url,
+            target_access_token="benchmark",
+            target_base_url=target_server.url,
+        )
+        previous_directory = os.getcwd()
+        # The migration writes its log file to the working directory
+        os.chdir(directory)
+        try:
+            result = measure_flow(lambda run_number: migrator.migrate())
+        finally:
+            os.chdir(previous_directory)
+
+    return {
+        "users": user_count,
+        "users_per_minute": user_count / result["seconds"] * 60,
+        **result,
+    }
+
+
+def get_git_commit() -> t.Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPOSITORY_DIR,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_package_version() -> t.Optional[str]:
+    try:
+        return importlib.metadata.version("push-to-3yourmind")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def run(names: t.Sequence[str], quick: bool) -> Result:
+    results = {}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr, flush=True)
+        started = time.perf_counter()
+        results[name] = BENCHMARKS[name](quick)
+        print(
+            f"  done in {time.perf_counter() - started:.1f}s: "
+            + json.dumps(results[name]),
+            file=sys.stderr,
+        )
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "package_version": get_package_version(),
+            "package_path": os.path.dirname(push_to_3yourmind.__file__),
+            "git_commit": get_git_commit(),
+            "quick": quick,
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(baseline: Result, current: Result) -> str:
+    """
+    Table of the numeric results of two runs, with the relative change
+    """
+    lines = [f"{'metric':<60} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for name, values in current["benchmarks"].items():
+        baseline_values = baseline["benchmarks"].get(name, {})
+        for key, value in values.items():
+            previous = baseline_values.get(key)
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            if not isinstance(previous, (int, float)):
+                change = ""
+            elif previous:
+                change = f"{(value - previous) / previous:+.1%}"
+            else:
+                change = "n/a"
+            previous_text = f"{previous:.4g}" if previous is not None else "-"
+            lines.append(
+                f"{name + '.' + key:<60} {previous_text:>12} {value:>12.4g} {change:>8}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv: t.Optional[t.Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="smaller workloads, for a smoke run"
+    )
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    args = parser.parse_args(argv)
+
+    results = run(args.only or list(BENCHMARKS), args.quick)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            print(compare(json.load(baseline_file), results))
+
+
+if __name__ == "__main__":
+    main()
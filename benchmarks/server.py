@@ -0,0 +1,258 @@
+"""
+In-process stand-in for the 3YOURMIND API, serving just enough of it for the
+benchmarks. Responses are generated, nothing is stored.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import re
+import threading
+import time
+import typing as t
+import urllib.parse
+
+
+__all__ = ["StandInServer"]
+
+
+Handler = t.Callable[["StandInServer", re.Match, t.Dict[str, str], bytes], t.Any]
+
+# Method, path pattern and name of the handler method. Patterns are relative to
+# /api/v2.0/, unless they start with a slash.
+ROUTES: t.List[t.Tuple[str, re.Pattern, str]] = []
+
+
+def route(method: str, pattern: str) -> t.Callable[[Handler], Handler]:
+    def decorator(handler: Handler) -> Handler:
+        path = pattern if pattern.startswith("/") else f"/api/v2.0/{pattern}"
+        ROUTES.append((method, re.compile(f"^{path}$"), handler.__name__))
+        return handler
+
+    return decorator
+
+
+def make_user(user_id: int) -> t.Dict[str, t.Any]:
+    return {
+        "id": user_id,
+        "email": f"user{user_id}@example.com",
+        "firstName": "First",
+        "lastName": f"Last {user_id}",
+        "fullName": f"First Last {user_id}",
+        "isActive": True,
+        "dateJoined": "2024-01-01T00:00:00Z",
+        "lastLogin": None,
+        "defaultAddressId": user_id * 10,
+        "userProfile": {"company": "ACME", "phone": "+49 30 1234567"},
+    }
+
+
+def make_address(address_id: int) -> t.Dict[str, t.Any]:
+    return {
+        "id": address_id,
+        "title": "mr",
+        "firstName": "First",
+        "lastName": "Last",
+        "companyName": "ACME",
+        "department": "",
+        "vatId": "",
+        "line1": "Street 1",
+        "line2": "",
+        "zipCode": "10115",
+        "city": "Berlin",
+        "state": "",
+        "country": "DE",
+        "phoneNumber": "+49 30 1234567",
+    }
+
+
+class StandInServer:
+    """
+    HTTP server running in a background thread
+
+    >>> with StandInServer(user_count=1000) as server:
+    ...     client = PushTo3YourmindAPI(access_token="token", base_url=server.url)
+
+    Args:
+        user_count: number of users listed by the organization panel
+        addresses_per_user: number of addresses of every user
+        latency: seconds every response is delayed by, to mimic the network
+        analysis_polls: number of "analysing" file statuses before "finished"
+    """
+
+    def __init__(
+        self,
+        *,
+        user_count: int = 1000,
+        addresses_per_user: int = 2,
+        latency: float = 0.0,
+        analysis_polls: int = 0,
+    ):
+        self.user_count = user_count
+        self.addresses_per_user = addresses_per_user
+        self.latency = latency
+        self.analysis_polls = analysis_polls
+        self.request_count = 0
+        self.bytes_received = 0
+        self._ids = itertools.count(1)
+        self._polls: t.Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._create_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.stop()
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def _create_handler(self) -> t.Type[BaseHTTPRequestHandler]:
+        server = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are sent in one write, without Nagle's delay
+            wbufsize = 1 << 16
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: t.Any) -> None:
+                pass
+
+            def _read_body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding") == "chunked":
+                    chunks = []
+                    while True:
+                        size = int(self.rfile.readline().strip(), 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            return b"".join(chunks)
+                        chunks.append(self.rfile.read(size))
+                        self.rfile.readline()
+                length = int(self.headers.get("Content-Length") or 0)
+                remaining = length
+                # Uploads are consumed in chunks, and only their first bytes kept
+                head = self.rfile.read(min(remaining, 1 << 16))
+                remaining -= len(head)
+                while remaining > 0:
+                    remaining -= len(self.rfile.read(min(remaining, 1 << 20)))
+                with server._lock:
+                    server.bytes_received += length
+                return head
+
+            def _handle(self) -> None:
+                body = self._read_body()
+                url = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(url.query))
+                with server._lock:
+                    server.request_count += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                for method, pattern, handler_name in ROUTES:
+                    match = pattern.match(url.path)
+                    if method == self.command and match:
+                        payload = getattr(server, handler_name)(match, query, body)
+                        return self._respond(200, payload)
+                self._respond(200, {"method": self.command, "path": url.path})
+
+            def _respond(self, status_code: int, payload: t.Any) -> None:
+                content = json.dumps(payload).encode()
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+        return RequestHandler
+
+    @route("GET", "my-profile/preferences/")
+    def get_preferences(self, match: re.Match, query: dict, body: bytes) -> dict:
+        return {"country": "DE", "unit": "mm", "currency": "EUR", "language": "en"}
+
+    @route("GET", "organization-panel/users/")
+    def get_users(self, match: re.Match, query: dict, body: bytes) -> dict:
+        page = int(query.get("page", 1))
+        page_size = int(query.get("pageSize", 25))
+        start = (page - 1) * page_size
+        end = min(start + page_size, self.user_count)
+        return {
+            "count": self.user_count,
+            "currentPage": page,
+            "totalPages": -(-self.user_count // page_size),
+            "pageSize": page_size,
+            "results": [make_user(user_id) for user_id in range(start + 1, end + 1)],
+        }
+
+    @route("POST", "organization-panel/users/create/")
+    def create_user(self, match: re.Match, query: dict, body: bytes) -> dict:
+        return {**json.loads(body), "id": self.next_id()}
+
+    @route("GET", r"organization-panel/users/(\d+)/preferences/")
+    def get_user_preferences(self, match: re.Match, query: dict, body: bytes) -> dict:
+        return {"country": None, "currency": "EUR", "language": "en", "unit": "mm"}
+
+    @route("PUT", r"organization-panel/users/(\d+)/preferences/")
+    def update_user_preferences(self, match: re.Match, query: dict, body: bytes) -> dict:
+        return json.loads(body)
+
+    @route("GET", r"organization-panel/users/(\d+)/addresses/")
+    def get_user_addresses(self, match: re.Match, query: dict, body: bytes) -> list:
+        user_id = int(match.group(1))
+        return [
+            make_address(user_id * 10 + index) for index in range(self.addresses_per_user)
+        ]
+
+    @route("POST", r"organization-panel/users/(\d+)/addresses/")
+    def create_user_address(self, match: re.Match, query: dict, body: bytes) -> dict:
+        return {**json.loads(body), "id": self.next_id()}
+
+    @route("POST", "user-panel/baskets/")
+    def create_basket(self, match: re.Match, query: dict, body: bytes) -> dict:
+        return {"id": self.next_id(), "lines": []}
+
+    @route("POST", r"user-panel/baskets/(\d+)/lines/")
+    def create_basket_line(self, match: re.Match, query: dict, body: bytes) -> dict:
+        return {"id": self.next_id()}
+
+    @route("PATCH", r"user-panel/baskets/(\d+)/lines/(\d+)/")
+    def update_basket_line(self, match: re.Match, query: dict, body: bytes) -> dict:
+        return {**json.loads(body), "id": int(match.group(2))}
+
+    @route("GET", r"user-panel/baskets/(\d+)/lines/(\d+)/file-status/")
+    def get_file_status(self, match: re.Match, query: dict, body: bytes) -> dict:
+        line_id = match.group(2)
+        with self._lock:
+            polls = self._polls[line_id] = self._polls.get(line_id, 0) + 1
+        if polls > self.analysis_polls:
+            return {"status": "finished"}
+        return {"status": "analysing"}
+
+    @route("POST", "/upload/")
+    def upload(self, match: re.Match, query: dict, body: bytes) -> dict:
+        return {"status": "uploaded"}
+
+    @route("POST", "user-panel/catalog/")
+    def create_catalog_item(self, match: re.Match, query: dict, body: bytes) -> dict:
+        return {"id": self.next_id()}
+
+    @route("POST", r"user-panel/catalog/(\d+)/attachments/")
+    def upload_attachment(self, match: re.Match, query: dict, body: bytes) -> dict:
+        return {"id": self.next_id()}
@@ -1,10 +1,10 @@
 import csv
-from dataclasses import dataclass
-import io
 import logging
+import os
 import typing as t
 
 import push_to_3yourmind
+from push_to_3yourmind.catalog_import import CatalogImporter, CatalogImportReport
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -19,13 +19,7 @@ mapper function this script can be used in a production environment
 as well.
 """
 
-@dataclass
-class ItemData:
-    cad_file: str
-    product_id: int
-    post_processings: push_to_3yourmind.td.PostProcessingConfig
-    part_requirements: t.Optional[push_to_3yourmind.td.FormData]
-    attachments: t.Optional[t.Sequence[str]]
+ItemData = push_to_3yourmind.td.CatalogItemConfig
 
 
 class MapperException(Exception):
@@ -38,122 +32,52 @@ class MapperException(Exception):
 MapperFunction = t.Callable[[dict], ItemData]
 
 
-class ImportCatalogClient:
-    """
-    Wraps an Api client instance and offers helper functions for a simple
-    workflow creating multiple catalog items.
-    """
-    def __init__(self, access_token: str, base_url: str):
-        self.client = push_to_3yourmind.PushTo3YourmindAPI(
-            access_token=access_token,
-            base_url=base_url,
-        )
-        
-    def list_form_details(self):
-        return self.client.common.get_forms()
-        
-    def create_basket(self):
-        return self.client.user_panel.create_basket()
-
-    def create_basket_item(
-            self,
-            *,
-            basket_id: int,
-            file: t.Union[str, io.BytesIO],
-            product_id: int,
-            post_processings: t.List[push_to_3yourmind.td.PostProcessingConfig] = (),
-            part_requirements: t.Optional[push_to_3yourmind.td.FormData] = None,
-    ):
-        line = self.client.user_panel.create_line_with_cad_file_and_product(
-            basket_id=basket_id,
-            cad_file=file,
-            quantity=1,
-            product_id=product_id,
-            post_processings=post_processings,
-        )
-        if part_requirements is not None:
-            self.client.user_panel.add_part_requirements_to_basket_line(
-                line_id=line["id"],
-                form_data=part_requirements,
-            )
-        return line
-    
-    def create_catalog_item(self, *, basket_line_id: int):
-        return self.client.user_panel.create_catalog_item(
-            basket_line_id=basket_line_id,
-        )
-
-    def add_attachments_to_catalog_item(
-            self,
-            catalog_item_id: int,
-            attachment: t.Union[str, io.BytesIO],
-    ):
-        self.client.user_panel.upload_catalog_item_attachment(
-            catalog_item_id=catalog_item_id,
-            attachment_file=attachment,
-        )
-
-    def delete_basket(self, basket_id: int):
-        # Clean up helper basket
-        self.client.user_panel.delete_basket(basket_id=basket_id)
-
-
-api_client = ImportCatalogClient(
+# The pool holds a connection for every worker of the stages sending requests
+client = push_to_3yourmind.PushTo3YourmindAPI(
     access_token="",
     base_url="https://instance.3yourmind.com",
+    pool_maxsize=32,
 )
-        
 
-def import_catalog_items(csv_path: str, mapper: MapperFunction, is_dry_run=True) -> None:
+
+def import_catalog_items(
+        csv_path: str,
+        mapper: MapperFunction,
+        is_dry_run=True,
+        journal_path: str = "./import_journal.sqlite3",
+        workers: t.Optional[t.Mapping[str, int]] = None,
+) -> CatalogImportReport:
     """
-    Will do all transformations and api calls to turn
+    Will do all transformations and api calls to turn every line of a csv
+    file into a catalog item. Lines go through the stages of the import in
+    parallel, see `CatalogImporter`.
+
+    The progress of every csv line is recorded in a local journal. If the
+    script is interrupted, running it again resumes every line at the stage
+    where it stopped, in the same basket.
 
-    :param conf: Contains base config for this process
     :param mapper: function that will transform a line in a csv file
                    and turns it into an ItemData struct
+    :param journal_path: path of the SQLite journal file
+    :param workers: number of workers per stage, see `DEFAULT_WORKERS`
     """
-    basket = api_client.create_basket()
-
-    logger.info("Start to read csv files")
-    with open(csv_path) as f:
-        csv_reader = csv.DictReader(f)
-
-        for index, line in enumerate(csv_reader):
-            logger.info(f"Reading line {index} of csv file")
-            try:
-                item_data = mapper(line)
-            except MapperException as e:
-                logger.error(f"Mapping Failed: {e}")
-                continue
-
-            try:
-                basket_line = api_client.create_basket_item(
-                    basket_id=basket["id"],
-                    file=item_data.cad_file,
-                    product_id=item_data.product_id,
-                    part_requirements=item_data.part_requirements,
-                    post_processings=item_data.post_processings,
-                )
-            except push_to_3yourmind.BasePushTo3YourmindAPIException as e:
-                logger.error(f"One Api call failed: {e}")
-                continue
-                
-            if not is_dry_run:
-                catalog_item = api_client.create_catalog_item(
-                    basket_line_id=basket_line["id"],
-                )
-                    
-                for attachment in item_data.attachments:
-                    api_client.add_attachments_to_catalog_item(
-                        catalog_item_id=catalog_item["id"],
-                        attachment=attachment,
-                    )
-
-    api_client.delete_basket(basket_id=basket["id"])
+    mode = "dry-run" if is_dry_run else "import"
+    journal = push_to_3yourmind.JobJournal(
+        journal_path, job_id=f"{os.path.abspath(csv_path)}:{mode}"
+    )
+    importer = CatalogImporter(
+        client, journal=journal, workers=workers, dry_run=is_dry_run
+    )
+
+    with journal:
+        logger.info("Start to read csv files")
+        with open(csv_path) as f:
+            report = importer.run(csv.DictReader(f), mapper)
+    logger.info(f"Import finished:\n{report.format()}")
+    return report
 
 
 if __name__ == "__main__":
-    import os
     import pathlib
 
     CSV_PATH = "./example.csv"
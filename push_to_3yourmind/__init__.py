@@ -1,3 +1,49 @@
+import importlib
+import typing as t
+
 from push_to_3yourmind import types as td
 from .exceptions import *
-from .main import PushTo3YourmindAPI
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from .cache import ResponseCache
+    from .cassette import Cassette
+    from .catalog_import import CatalogImporter
+    from .journal import JobJournal
+    from .main import PushTo3YourmindAPI
+    from .metrics import MetricsRegistry
+    from .polling import FileStatusPoller
+    from .preprocessing import UploadPreprocessor
+    from .rate_limit import RateLimiter
+    from .retry import RetryPolicy
+    from .tracing import Tracer
+    from .user_migration import UserMigrator
+
+
+# Exported names and their modules, imported on first access to keep the import of
+# the package fast
+_LAZY_EXPORTS = {
+    "Cassette": ".cassette",
+    "CatalogImporter": ".catalog_import",
+    "FileStatusPoller": ".polling",
+    "JobJournal": ".journal",
+    "MetricsRegistry": ".metrics",
+    "PushTo3YourmindAPI": ".main",
+    "RateLimiter": ".rate_limit",
+    "ResponseCache": ".cache",
+    "RetryPolicy": ".retry",
+    "Tracer": ".tracing",
+    "UploadPreprocessor": ".preprocessing",
+    "UserMigrator": ".user_migration",
+}
+
+
+def __getattr__(name: str) -> t.Any:
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> t.List[str]:
+    return sorted({*globals(), *_LAZY_EXPORTS})
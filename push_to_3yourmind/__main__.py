@@ -0,0 +1,6 @@
+import sys
+
+from push_to_3yourmind.cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,7 @@
+"""
+Asyncio client. Mirrors every namespace of `push_to_3yourmind.PushTo3YourmindAPI`
+with coroutines. Requires the optional `httpx` dependency:
+
+    pip install "push-to-3yourmind[async]"
+"""
+from .main import AsyncPushTo3YourmindAPI
@@ -0,0 +1,284 @@
+"""
+Base class of the asyncio namespaces
+"""
+import asyncio
+import time
+import typing as t
+
+try:
+    import httpx
+except ImportError as exc:  # pragma: no cover
+    raise ImportError(
+        "The asyncio client requires httpx, install it with "
+        '`pip install "push-to-3yourmind[async]"`'
+    ) from exc
+
+from push_to_3yourmind import exceptions
+from push_to_3yourmind import types
+from push_to_3yourmind import utils
+from push_to_3yourmind.api.base import BaseAPI
+from push_to_3yourmind.logger import logger
+from push_to_3yourmind.multipart import CHUNK_SIZE, MultipartEncoder
+from push_to_3yourmind.retry import (
+    RetryState,
+    get_stream_positions,
+    is_rewindable,
+    rewind_streams,
+)
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from push_to_3yourmind.cassette import Cassette
+
+
+__all__ = ["AsyncBaseAPI", "create_async_client"]
+
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DOWNLOAD_TIMEOUT = httpx.Timeout(
+    utils.DOWNLOAD_TIMEOUT[1], connect=utils.DOWNLOAD_TIMEOUT[0]
+)
+
+
+def create_async_client(
+    *,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    cassette: t.Optional["Cassette"] = None,
+) -> httpx.AsyncClient:
+    """
+    Create an `httpx.AsyncClient` with a keep-alive connection pool. Requests have no
+    timeout, same as the synchronous client. With a cassette, requests are recorded
+    to or replayed from it.
+    """
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+    )
+    if cassette is not None:
+        from push_to_3yourmind.aio.cassette import CassetteTransport
+
+        transport = CassetteTransport(cassette, httpx.AsyncHTTPTransport(limits=limits))
+        return httpx.AsyncClient(transport=transport, timeout=None)
+    return httpx.AsyncClient(limits=limits, timeout=None)
+
+
+class AsyncDownloadStream:
+    """
+    Async iterable over the body of a streamed `httpx` response, counterpart of
+    `push_to_3yourmind.utils.DownloadStream`
+    """
+
+    def __init__(self, response: httpx.Response):
+        self._response = response
+        self.name = utils.get_download_file_name(
+            str(response.url), response.headers.get("Content-Disposition")
+        )
+        self.len = utils.get_download_length(response.headers)
+
+    def __aiter__(self) -> t.AsyncIterator[bytes]:
+        return self._response.aiter_bytes(CHUNK_SIZE)
+
+
+class AsyncBaseAPI(BaseAPI):
+    """
+    Base class for all asyncio namespaces. Not to be instantiated directly.
+
+    Sends requests through `httpx.AsyncClient`, response handling and exceptions
+    are the same as in `push_to_3yourmind.api.base.BaseAPI`. Namespace methods that
+    only wrap a single request are inherited from the synchronous classes and return
+    awaitables.
+    """
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str,
+        *,
+        client: t.Optional[httpx.AsyncClient] = None,
+        **options: t.Any,
+    ):
+        """
+        Args:
+            client: HTTP client used to send requests. Namespaces of one client
+                share the same connection pool.
+        Other arguments are described in
+        `push_to_3yourmind.api.base.SharedStateMixin`.
+        """
+        # Skips the session of BaseAPI, requests are sent by the httpx client
+        super(BaseAPI, self).__init__(access_token, base_url, **options)
+        self._client = client if client is not None else create_async_client()
+
+    def _get_shared_options(self) -> t.Dict[str, t.Any]:
+        return {"client": self._client, **super(BaseAPI, self)._get_shared_options()}
+
+    def _convert_response(
+        self,
+        response: t.Awaitable[types.AnyResponse],
+        convert: t.Optional[t.Callable[[types.AnyResponse], t.Any]],
+    ) -> t.Awaitable[t.Any]:
+        if convert is None:
+            return response
+
+        async def convert_response() -> t.Any:
+            return convert(await response)
+
+        return convert_response()
+
+    async def _request(
+        self,
+        method: types.RequestMethod,
+        sub_path: str,
+        **kwargs: t.Any,
+    ) -> types.AnyResponse:
+        """
+        Coroutine counterpart of `push_to_3yourmind.api.base.BaseAPI._request`.
+        Keyword arguments are passed to `httpx.AsyncClient.request`.
+        """
+
+        response = await self._send(method, sub_path, **kwargs)
+        return self._get_observed_payload(method, sub_path, response)
+
+    async def _cached_request(self, sub_path: str) -> types.AnyResponse:
+        """
+        Coroutine counterpart of `push_to_3yourmind.api.base.BaseAPI._cached_request`
+        """
+
+        if self._response_cache is None:
+            return await self._request("GET", sub_path)
+
+        entry = self._response_cache.get(sub_path)
+        if entry is not None and entry.is_fresh():
+            return entry.payload
+
+        headers = entry.get_validators() if entry is not None else {}
+        response = await self._send("GET", sub_path, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            return self._response_cache.revalidate(sub_path, entry, response.headers)
+
+        response_payload = self._get_observed_payload("GET", sub_path, response)
+        self._response_cache.store(sub_path, response_payload, response.headers)
+        return response_payload
+
+    async def _get_preferences(self) -> types.ResponseDict:
+        """
+        Coroutine counterpart of `push_to_3yourmind.api.base.BaseAPI._get_preferences`
+        """
+
+        preferences = self._preferences_cache.get()
+        if preferences is None:
+            preferences = await self._request("GET", "my-profile/preferences/")
+            self._preferences_cache.set(preferences)
+        return preferences
+
+    async def _send(
+        self,
+        method: types.RequestMethod,
+        sub_path: str,
+        **kwargs: t.Any,
+    ) -> httpx.Response:
+        """
+        Coroutine counterpart of `push_to_3yourmind.api.base.BaseAPI._send`
+        """
+
+        url = self._get_url(sub_path)
+        headers = {**self._get_headers(), **kwargs.pop("headers", {})}
+        if "json" in kwargs:
+            kwargs["content"] = self._json_codec.dumps(kwargs.pop("json"))
+            headers.setdefault("Content-Type", "application/json")
+        retry_state = RetryState(
+            self._retry_policy, method, rewindable=is_rewindable(kwargs)
+        )
+        stream_positions = get_stream_positions(kwargs)
+        started = time.perf_counter()
+        try:
+            while True:
+                if self._rate_limiter is not None:
+                    await asyncio.sleep(self._rate_limiter.reserve(sub_path))
+                logger.debug(f"Request {method} to {url}")
+                try:
+                    response = await self._client.request(
+                        method=method,
+                        url=url,
+                        headers=headers,
+                        **kwargs,
+                    )
+                except httpx.TransportError as exc:
+                    delay = retry_state.get_next_delay()
+                    if delay is None:
+                        raise
+                    logger.info(f"Retrying {method} {url} in {delay:.2f}s: {exc}")
+                else:
+                    if not retry_state.is_retryable_status(response.status_code):
+                        break
+                    delay = retry_state.get_next_delay(
+                        response.headers.get("Retry-After")
+                    )
+                    if delay is None:
+                        break
+                    logger.info(
+                        f"Retrying {method} {url} in {delay:.2f}s: "
+                        f"status {response.status_code}"
+                    )
+
+                await asyncio.sleep(delay)
+                rewind_streams(stream_positions)
+        except Exception as exc:
+            self._observe_request(
+                method, sub_path, started, retry_state, kwargs, headers, exception=exc
+            )
+            raise
+        self._observe_request(
+            method, sub_path, started, retry_state, kwargs, headers, response=response
+        )
+        return response
+
+    async def _post_file(
+        self,
+        sub_path: str,
+        file: types.CadFileSpecifier,
+        *,
+        fields: t.Optional[t.Dict[str, t.Any]] = None,
+        preprocess: bool = False,
+    ) -> types.AnyResponse:
+        """
+        Coroutine counterpart of `push_to_3yourmind.api.base.BaseAPI._post_file`.
+        Preprocessing runs in a worker thread, downloads are not preprocessed.
+        """
+
+        if isinstance(file, str) and file.startswith("http"):
+            async with self._client.stream(
+                "GET", file, timeout=DOWNLOAD_TIMEOUT
+            ) as response:
+                if response.status_code != 200:
+                    raise exceptions.CADFileNotFoundError(await response.aread())
+                stream = AsyncDownloadStream(response)
+                return await self._post_stream(sub_path, stream.name, stream, fields)
+
+        with utils.open_file(file) as (filename, stream):
+            upload_stream = stream
+            if preprocess and self._upload_preprocessor is not None:
+                filename, upload_stream = await asyncio.to_thread(
+                    self._upload_preprocessor.prepare, filename, stream
+                )
+            try:
+                return await self._post_stream(sub_path, filename, upload_stream, fields)
+            finally:
+                if upload_stream is not stream:
+                    upload_stream.close()
+
+    async def _post_stream(
+        self,
+        sub_path: str,
+        filename: str,
+        stream: t.Union[t.IO[bytes], t.AsyncIterable[bytes]],
+        fields: t.Optional[t.Dict[str, t.Any]],
+    ) -> types.AnyResponse:
+        encoder = MultipartEncoder(fields=fields, files={"file": (filename, stream)})
+        headers = {"Content-Type": encoder.content_type}
+        if encoder.len is not None:
+            headers["Content-Length"] = str(encoder.len)
+        return await self._request(
+            "POST", sub_path, content=encoder.async_stream(), headers=headers
+        )
@@ -0,0 +1,84 @@
+"""
+Cassette transport of the asyncio client, see `push_to_3yourmind.cassette`
+"""
+import asyncio
+import time
+import typing as t
+
+import httpx
+
+from push_to_3yourmind.cassette import (
+    Cassette,
+    Exchange,
+    get_recorded_headers,
+    get_request_key,
+)
+
+
+__all__ = ["CassetteTransport"]
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    `httpx` transport recording to, or replaying from, a cassette. Used by
+    asyncio clients created with a cassette.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        transport: t.Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Args:
+            cassette: cassette to record to or to replay from
+            transport: transport sending the requests when recording
+        """
+        self.cassette = cassette
+        self.transport = (
+            transport if transport is not None else httpx.AsyncHTTPTransport()
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            body: t.Optional[bytes] = request.content
+        except httpx.RequestNotRead:
+            # Streamed body, ex. of an upload
+            body = None
+        key = get_request_key(request.method, str(request.url), body)
+        if self.cassette.mode == "replay":
+            exchange = self.cassette.find(key)
+            delay = self.cassette.get_delay(exchange)
+            if delay:
+                await asyncio.sleep(delay)
+            return httpx.Response(
+                exchange.status_code,
+                headers=exchange.headers,
+                content=exchange.body,
+                request=request,
+            )
+
+        started = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        try:
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        headers = get_recorded_headers(response.headers)
+        content_length = request.headers.get("Content-Length")
+        self.cassette.add(
+            Exchange(
+                key=key,
+                request_bytes=int(content_length) if content_length else None,
+                status_code=response.status_code,
+                headers=headers,
+                body=body,
+                duration=time.perf_counter() - started,
+            )
+        )
+        return httpx.Response(
+            response.status_code, headers=headers, content=body, request=request
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,15 @@
+"""
+Asyncio version of API methods common to all panels
+"""
+from push_to_3yourmind.aio.base import AsyncBaseAPI
+from push_to_3yourmind.api.common import CommonAPI
+
+
+__all__ = ["AsyncCommonAPI"]
+
+
+class AsyncCommonAPI(AsyncBaseAPI, CommonAPI):
+    """
+    Accessible via namespace `common`, for example:
+    >>> response = await client.common.get_colors()
+    """
@@ -0,0 +1,149 @@
+"""
+Asyncio client entrypoint declaration
+"""
+import asyncio
+import typing as t
+
+from push_to_3yourmind import types
+from push_to_3yourmind.aio.base import (
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    AsyncBaseAPI,
+    create_async_client,
+)
+from push_to_3yourmind.cache import ResponseCache
+from push_to_3yourmind.codec import JSONCodec
+from push_to_3yourmind.metrics import MetricsRegistry
+from push_to_3yourmind.namespaces import Namespace
+from push_to_3yourmind.polling import FileStatusPoller
+from push_to_3yourmind.preprocessing import UploadPreprocessor
+from push_to_3yourmind.rate_limit import RateLimiter
+from push_to_3yourmind.retry import RetryPolicy
+from push_to_3yourmind.tracing import Tracer
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from push_to_3yourmind.aio.common import AsyncCommonAPI
+    from push_to_3yourmind.aio.my_profile import AsyncMyProfileAPI
+    from push_to_3yourmind.aio.organization_panel import AsyncOrganizationPanelAPI
+    from push_to_3yourmind.aio.user_panel import AsyncUserPanelAPI
+    from push_to_3yourmind.cassette import Cassette
+
+
+__all__ = ["AsyncPushTo3YourmindAPI"]
+
+
+class AsyncPushTo3YourmindAPI(AsyncBaseAPI):
+    """
+    Asyncio counterpart of `push_to_3yourmind.PushTo3YourmindAPI`. Offers the same
+    namespaces, every method has to be awaited:
+
+    >>> from push_to_3yourmind.aio import AsyncPushTo3YourmindAPI
+    >>> async with AsyncPushTo3YourmindAPI(access_token="QWERTY123456789", base_url="http://<domain-name>") as client:
+    ...     baskets = await client.user_panel.get_baskets()
+
+    All namespaces share one connection pool, so many requests can run concurrently
+    on a single event loop.
+
+    Attributes:
+        user_panel: order management-related API: create/update basket lines,
+            upload CAD files, pricing
+        common: common API: country, unit, material lists
+        my_profile: API to manage user's preferences, profile, address list etc
+        organization_panel: API to manage users of the organization
+
+    Namespaces are created when they are first accessed.
+    """
+
+    user_panel: "Namespace[AsyncUserPanelAPI]" = Namespace(
+        "push_to_3yourmind.aio.user_panel", "AsyncUserPanelAPI"
+    )
+    common: "Namespace[AsyncCommonAPI]" = Namespace(
+        "push_to_3yourmind.aio.common", "AsyncCommonAPI"
+    )
+    my_profile: "Namespace[AsyncMyProfileAPI]" = Namespace(
+        "push_to_3yourmind.aio.my_profile", "AsyncMyProfileAPI"
+    )
+    organization_panel: "Namespace[AsyncOrganizationPanelAPI]" = Namespace(
+        "push_to_3yourmind.aio.organization_panel", "AsyncOrganizationPanelAPI"
+    )
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str,
+        *,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        retry_policy: t.Union[RetryPolicy, None, types.NoValueType] = types.NoValue,
+        rate_limiter: t.Optional[RateLimiter] = None,
+        response_cache: t.Optional[ResponseCache] = None,
+        file_status_poller: t.Optional[FileStatusPoller] = None,
+        upload_preprocessor: t.Optional[UploadPreprocessor] = None,
+        json_codec: t.Optional[JSONCodec] = None,
+        metrics: t.Optional[MetricsRegistry] = None,
+        tracer: t.Optional[Tracer] = None,
+        cassette: t.Optional["Cassette"] = None,
+    ):
+        """
+        Args:
+            access_token: API token of the user
+            base_url: application URL, ex. https://app.3yourmind.com
+            max_connections: maximum number of concurrent connections
+            max_keepalive_connections: number of idle connections kept open
+            retry_policy: when and how to retry failed requests. By default, idempotent
+                requests are retried up to 3 times, pass None to disable retries.
+            rate_limiter: caps the number of requests per second sent by all
+                namespaces and threads of the client, unlimited by default
+            response_cache: keeps reference data of the `common` namespace
+                between calls, disabled by default
+            file_status_poller: intervals and deadlines used to poll the analysis
+                of uploaded CAD files
+            upload_preprocessor: converts or compresses CAD files before
+                upload, see `UploadPreprocessor`. Files are sent unchanged
+                by default.
+            json_codec: encodes request bodies and decodes responses. Defaults
+                to orjson if it is installed, to the standard library otherwise.
+            metrics: records latency, sizes, status codes, exceptions and
+                retries of every request, see `MetricsRegistry`. Disabled
+                by default.
+            tracer: receives nested spans of composite methods and of
+                every request, see `push_to_3yourmind.tracing`. Disabled
+                by default.
+            cassette: record every request to, or replay it from, a cassette
+                file, see `push_to_3yourmind.cassette.Cassette`
+        """
+        client = create_async_client(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            cassette=cassette,
+        )
+        if retry_policy is types.NoValue:
+            retry_policy = RetryPolicy()
+        super().__init__(
+            access_token,
+            base_url,
+            client=client,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            response_cache=response_cache,
+            file_status_poller=file_status_poller,
+            upload_preprocessor=upload_preprocessor,
+            json_codec=json_codec,
+            metrics=metrics,
+            tracer=tracer,
+        )
+
+    async def aclose(self) -> None:
+        """
+        Close all pooled connections and stop polling file analysis statuses.
+        The client should not be used afterwards.
+        """
+        # Closing the poller joins its scheduler thread
+        await asyncio.to_thread(self._file_status_poller.close)
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncPushTo3YourmindAPI":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -0,0 +1,37 @@
+"""
+Asyncio version of user profile API
+"""
+from push_to_3yourmind import types
+from push_to_3yourmind.aio.base import AsyncBaseAPI
+from push_to_3yourmind.api.my_profile import MyProfileAPI
+
+
+__all__ = ["AsyncMyProfileAPI"]
+
+
+class AsyncMyProfileAPI(AsyncBaseAPI, MyProfileAPI):
+    """
+    Accessible via namespace `my_profile`, for example:
+    >>> response = await client.my_profile.get_preferences()
+    """
+
+    async def get_preferences(self) -> types.ResponseDict:
+        preferences = await self._request("GET", "my-profile/preferences/")
+        self._preferences_cache.set(dict(preferences))
+        return preferences
+
+    async def set_preferences(
+        self,
+        *,
+        country: types.OptionalString = types.NoValue,
+        currency: types.OptionalString = types.NoValue,
+        language: types.OptionalString = types.NoValue,
+        unit: types.OptionalString = types.NoValue,
+    ) -> types.ResponseDict:
+        json = self._get_parameters(
+            country=country, currency=currency, language=language, unit=unit
+        )
+        try:
+            return await self._request("PUT", "my-profile/preferences/", json=json)
+        finally:
+            self._preferences_cache.invalidate()
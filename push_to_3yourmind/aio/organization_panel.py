@@ -0,0 +1,58 @@
+"""
+Asyncio version of Organization Panel API
+"""
+import functools
+import typing as t
+
+from push_to_3yourmind import models, types
+from push_to_3yourmind.aio.base import AsyncBaseAPI
+from push_to_3yourmind.api.organization_panel import OrganizationPanelAPI
+from push_to_3yourmind.pagination import afetch_all_records, aiter_records
+
+
+__all__ = ["AsyncOrganizationPanelAPI"]
+
+
+class AsyncOrganizationPanelAPI(AsyncBaseAPI, OrganizationPanelAPI):
+    """
+    Accessible via namespace `organization_panel`, for example:
+    >>> response = await client.organization_panel.get_users()
+    """
+
+    def iter_users(
+            self,
+            *,
+            page_size: t.Optional[int] = types.NoValue,
+            search: t.Optional[str] = types.NoValue,
+            prefetch: bool = True,
+            as_models: bool = False,
+    ) -> t.AsyncIterator[types.ResponseDict]:
+        """
+        Async iterator version of `OrganizationPanelAPI.iter_users`
+        """
+        get_page = functools.partial(self.get_users, page_size=page_size, search=search)
+        return aiter_records(
+            lambda page: get_page(page=page),
+            prefetch=prefetch,
+            convert=models.User.from_dict if as_models else None,
+        )
+
+    def fetch_all_users(
+            self,
+            *,
+            page_size: t.Optional[int] = types.NoValue,
+            search: t.Optional[str] = types.NoValue,
+            max_workers: int = 8,
+            ordered: bool = True,
+            as_models: bool = False,
+    ) -> t.AsyncIterator[types.ResponseDict]:
+        """
+        Async iterator version of `OrganizationPanelAPI.fetch_all_users`
+        """
+        get_page = functools.partial(self.get_users, page_size=page_size, search=search)
+        return afetch_all_records(
+            lambda page: get_page(page=page),
+            max_workers=max_workers,
+            ordered=ordered,
+            convert=models.User.from_dict if as_models else None,
+        )
@@ -0,0 +1,336 @@
+"""
+Asyncio version of User Panel API. Methods making several requests are
+reimplemented as coroutines, all others are inherited from `UserPanelAPI`.
+"""
+import asyncio
+import functools
+import time
+import typing as t
+
+from push_to_3yourmind import types, exceptions, models, utils
+from push_to_3yourmind.logger import logger
+from push_to_3yourmind.aio.base import AsyncBaseAPI
+from push_to_3yourmind.api.user_panel import UserPanelAPI
+from push_to_3yourmind.pagination import afetch_all_records, aiter_records
+from push_to_3yourmind.tracing import traced
+
+
+__all__ = ["AsyncUserPanelAPI"]
+
+
+class AsyncUserPanelAPI(AsyncBaseAPI, UserPanelAPI):
+    """
+    Accessible via namespace `user_panel`, for example:
+    >>> response = await client.user_panel.get_baskets()
+    """
+
+    def iter_baskets(
+        self,
+        *,
+        page_size: types.OptionalInteger = types.NoValue,
+        prefetch: bool = True,
+        as_models: bool = False,
+    ) -> t.AsyncIterator[types.ResponseDict]:
+        """
+        Async iterator version of `UserPanelAPI.iter_baskets`:
+        >>> async for basket in client.user_panel.iter_baskets():
+        ...     print(basket["id"])
+        """
+        get_page = functools.partial(self.get_baskets, page_size=page_size)
+        return aiter_records(
+            lambda page: get_page(page=page),
+            prefetch=prefetch,
+            convert=models.Basket.from_dict if as_models else None,
+        )
+
+    def fetch_all_baskets(
+        self,
+        *,
+        page_size: types.OptionalInteger = types.NoValue,
+        max_workers: int = 8,
+        ordered: bool = True,
+        as_models: bool = False,
+    ) -> t.AsyncIterator[types.ResponseDict]:
+        """
+        Async iterator version of `UserPanelAPI.fetch_all_baskets`
+        """
+        get_page = functools.partial(self.get_baskets, page_size=page_size)
+        return afetch_all_records(
+            lambda page: get_page(page=page),
+            max_workers=max_workers,
+            ordered=ordered,
+            convert=models.Basket.from_dict if as_models else None,
+        )
+
+    def fetch_all_orders(
+        self,
+        *,
+        page_size: types.OptionalInteger = types.NoValue,
+        max_workers: int = 8,
+        ordered: bool = True,
+        as_models: bool = False,
+    ) -> t.AsyncIterator[types.ResponseDict]:
+        """
+        Async iterator version of `UserPanelAPI.fetch_all_orders`
+        """
+        get_page = functools.partial(self.get_orders, page_size=page_size)
+        return afetch_all_records(
+            lambda page: get_page(page=page),
+            max_workers=max_workers,
+            ordered=ordered,
+            convert=models.Order.from_dict if as_models else None,
+        )
+
+    async def get_materials(
+        self,
+        *,
+        basket_id: int,
+        line_id: int,
+        country: types.OptionalString = types.NoValue,
+    ) -> t.List[types.ResponseDict]:
+        """
+        Coroutine version of `UserPanelAPI.get_materials`
+        """
+        if country is types.NoValue:
+            country = (await self._get_preferences())["country"]
+        query = {"country": country}
+
+        return await self._request(
+            "GET",
+            f"user-panel/baskets/{basket_id}/lines/{line_id}/materials/",
+            params=query,
+        )
+
+    async def get_products(
+        self,
+        *,
+        basket_id: int,
+        line_id: int,
+        material_id: int,
+        country: types.OptionalString = types.NoValue,
+    ) -> t.List[types.ResponseDict]:
+        """
+        Coroutine version of `UserPanelAPI.get_products`
+        """
+        if country is types.NoValue:
+            country = (await self._get_preferences())["country"]
+        query = {"country": country}
+
+        return await self._request(
+            "GET",
+            f"user-panel/baskets/{basket_id}/lines/{line_id}/"
+            f"materials/{material_id}/offers/",
+            params=query,
+        )
+
+    @traced
+    async def upload_cad_file(
+        self,
+        *,
+        basket_id: int,
+        unit: types.Unit,
+        cad_file: types.CadFileSpecifier,
+        line_id: int,
+        inspect: bool = False,
+    ) -> types.ResponseDict:
+        """
+        Coroutine version of `UserPanelAPI.upload_cad_file`, the file is inspected
+        in a worker thread
+        """
+        if inspect:
+            await asyncio.to_thread(self._inspect_cad_file, cad_file, unit)
+
+        data = self._get_parameters(basket_id=basket_id, unit=unit, line_id=line_id)
+        return await self._post_file(f"/upload/", cad_file, fields=data, preprocess=True)
+
+    @traced
+    async def create_line_with_cad_file_and_product(
+        self,
+        *,
+        basket_id: int,
+        cad_file: types.CadFileSpecifier,
+        product_id: int,
+        quantity: int,
+        post_processings: t.Sequence[types.PostProcessingConfig] = (),
+        preferred_due_date: types.OptionalDate = types.NoValue,
+        unit: t.Union[types.Unit, types.NoValueType] = types.NoValue,
+        inspect: bool = False,
+    ) -> types.ResponseDict:
+        """
+        Coroutine version of `UserPanelAPI.create_line_with_cad_file_and_product`
+        """
+        if unit is types.NoValue:
+            unit = (await self._get_preferences())["unit"]
+        if inspect:
+            await asyncio.to_thread(self._inspect_cad_file, cad_file, unit)
+
+        file_size = utils.get_file_size(cad_file)
+        line_response = await self.create_basket_line(basket_id=basket_id)
+        line_id = line_response["id"]
+        await self.upload_cad_file(
+            basket_id=basket_id, line_id=line_id, unit=unit, cad_file=cad_file
+        )
+        await self.check_uploaded_file_status(
+            basket_id=basket_id, line_id=line_id, file_size=file_size
+        )
+
+        return await self.update_basket_line(
+            basket_id=basket_id,
+            line_id=line_id,
+            quantity=quantity,
+            product_id=product_id,
+            post_processings=post_processings,
+            preferred_due_date=preferred_due_date,
+        )
+
+    @traced
+    async def create_lines_with_cad_files(
+        self,
+        *,
+        basket_id: int,
+        items: t.Sequence[types.CadFileLineConfig],
+        max_concurrency: int = 4,
+        unit: t.Union[types.Unit, types.NoValueType] = types.NoValue,
+        inspect: bool = False,
+        on_result: t.Optional[t.Callable[[types.BatchItemResult], None]] = None,
+    ) -> t.List[types.BatchItemResult]:
+        """
+        Coroutine version of `UserPanelAPI.create_lines_with_cad_files`. The
+        concurrency limit doesn't apply to waiting for file analysis, and
+        `on_result` is called from the event loop.
+        """
+        if unit is types.NoValue:
+            unit = (await self._get_preferences())["unit"]
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def create_line(item: types.CadFileLineConfig) -> types.ResponseDict:
+            async with semaphore:
+                if inspect:
+                    await asyncio.to_thread(self._inspect_cad_file, item.cad_file, unit)
+                file_size = utils.get_file_size(item.cad_file)
+                line_response = await self.create_basket_line(basket_id=basket_id)
+                line_id = line_response["id"]
+                await self.upload_cad_file(
+                    basket_id=basket_id, line_id=line_id, unit=unit, cad_file=item.cad_file
+                )
+            await self.check_uploaded_file_status(
+                basket_id=basket_id, line_id=line_id, file_size=file_size
+            )
+            async with semaphore:
+                return await self.update_basket_line(
+                    basket_id=basket_id,
+                    line_id=line_id,
+                    quantity=item.quantity,
+                    product_id=item.product_id,
+                    post_processings=item.post_processings,
+                    preferred_due_date=item.preferred_due_date,
+                )
+
+        async def get_result(item: types.CadFileLineConfig) -> types.BatchItemResult:
+            try:
+                line = await create_line(item)
+            except Exception as exc:
+                logger.debug(f"Failed to create line from {item.cad_file}: {exc!r}")
+                result = types.BatchItemResult(item=item, error=exc)
+            else:
+                result = types.BatchItemResult(item=item, response=line)
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        return list(await asyncio.gather(*(get_result(item) for item in items)))
+
+    def wait_for_file_analysis(
+        self,
+        *,
+        basket_id: int,
+        line_id: int,
+        file_size: t.Optional[int] = None,
+        timeout: t.Optional[float] = None,
+    ) -> "asyncio.Task[None]":
+        """
+        Asyncio version of `UserPanelAPI.wait_for_file_analysis`, returns a task
+        """
+        return asyncio.ensure_future(
+            self.check_uploaded_file_status(
+                basket_id=basket_id,
+                line_id=line_id,
+                file_size=file_size,
+                timeout=timeout,
+            )
+        )
+
+    @traced
+    async def check_uploaded_file_status(
+        self,
+        *,
+        basket_id: int,
+        line_id: int,
+        file_size: t.Optional[int] = None,
+        timeout: t.Optional[float] = None,
+    ) -> None:
+        """
+        Coroutine version of `UserPanelAPI.check_uploaded_file_status`. Every file
+        is polled by its own task, with the intervals and deadline of the
+        `FileStatusPoller` of the client.
+        """
+        poller = self._file_status_poller
+        timeout = self._get_file_status_timeout(timeout)
+        if timeout is None:
+            timeout = poller.get_timeout(file_size)
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            delay = min(
+                poller.get_interval(attempt, file_size), deadline - time.monotonic()
+            )
+            await asyncio.sleep(max(delay, 0))
+            logger.debug(f"Checking file status, attempt {attempt}")
+            response = await self.get_file_status(basket_id=basket_id, line_id=line_id)
+            status = response.get("status")
+            if status == "finished":
+                logger.debug("File analysis done")
+                return
+            elif status != "analysing":
+                raise exceptions.FileAnalysisError(status)
+            elif time.monotonic() >= deadline:
+                raise exceptions.FileAnalysisTimeout()
+            attempt += 1
+
+    @traced
+    async def quick_order_quote(self, *, quote_id: int) -> types.ResponseDict:
+        """
+        Coroutine version of `UserPanelAPI.quick_order_quote`
+        """
+        quote_details = await self.get_quote(quote_id=quote_id)
+        supplier_id = quote_details["partner"]["id"]
+        quote_is_finalized = quote_details["status"] == "finalized"
+
+        if not quote_is_finalized:
+            addresses = await self._request("GET", "my-profile/addresses/")
+            address = addresses[0]
+            address_id = address["id"]
+
+            shipping_methods = await self.get_shipping_methods(
+                supplier_id=supplier_id,
+                quote_id=quote_id,
+                shipping_address_id=address_id,
+            )
+            shipping_method = shipping_methods[0]
+            shipping_method_id = shipping_method["id"]
+
+            await self.finalize_quote(
+                quote_id=quote_id,
+                billing_address_id=address_id,
+                shipping_address_id=address_id,
+                shipping_method_id=shipping_method_id,
+            )
+        payment_methods = await self.get_payment_methods(supplier_id=supplier_id)
+        payment_method = payment_methods[0]
+        payment_method_id = payment_method["id"]
+        return await self.place_order_from_quote(
+            quote_id=quote_id,
+            payment_method_id=payment_method_id,
+            currency=quote_details["currency"],
+            authorized_amount=quote_details["totalPrice"]["inclusiveTax"],
+        )
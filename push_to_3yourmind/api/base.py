@@ -1,34 +1,143 @@
 """
 Base classes
 """
+import time
 import typing as t
-import urllib
-
-import requests
+import urllib.parse
 
 from push_to_3yourmind import exceptions
 from push_to_3yourmind import types
+from push_to_3yourmind import utils
+from push_to_3yourmind.cache import PreferencesCache, ResponseCache
+from push_to_3yourmind.codec import JSONCodec, get_default_json_codec
 from push_to_3yourmind.logger import logger
+from push_to_3yourmind.metrics import (
+    MetricsRegistry,
+    get_body_length,
+    get_path_template,
+)
+from push_to_3yourmind.multipart import MultipartEncoder
+from push_to_3yourmind.polling import FileStatusPoller
+from push_to_3yourmind.preprocessing import UploadPreprocessor
+from push_to_3yourmind.rate_limit import RateLimiter
+from push_to_3yourmind.retry import (
+    RetryPolicy,
+    RetryState,
+    get_stream_positions,
+    is_rewindable,
+    rewind_streams,
+)
+from push_to_3yourmind.session import LazySession
+from push_to_3yourmind.tracing import Tracer
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    import requests
 
 
-__all__ = ["BaseAPI"]
+__all__ = ["BaseAPI", "SharedStateMixin"]
 
 
-class BaseAPI:
+class SharedStateMixin:
     """
-    Base class for all namespaced API methods. Not to be instantiated directly.
+    State shared by all namespaces of a client, sync or asyncio: credentials,
+    retries, rate limit, caches, poller, preprocessor, codec, metrics and
+    tracer. The HTTP transport is added by the base classes.
     """
 
-    def __init__(self, access_token: str, base_url: str):
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str,
+        *,
+        retry_policy: t.Optional[RetryPolicy] = None,
+        rate_limiter: t.Optional[RateLimiter] = None,
+        response_cache: t.Optional[ResponseCache] = None,
+        preferences_cache: t.Optional[PreferencesCache] = None,
+        file_status_poller: t.Optional[FileStatusPoller] = None,
+        upload_preprocessor: t.Optional[UploadPreprocessor] = None,
+        json_codec: t.Optional[JSONCodec] = None,
+        metrics: t.Optional[MetricsRegistry] = None,
+        tracer: t.Optional[Tracer] = None,
+    ):
         """
         Args:
             access_token: to create a token, open `/admin/auth/user/`, and click
                 "Create token" in the user list.
             base_url: application URL, ex. https://app.3yourmind.com
+            retry_policy: when and how to retry failed requests, None disables retries
+            rate_limiter: caps the number of requests per second, None means unlimited
+            response_cache: cache of reference data responses, None disables caching
+            preferences_cache: memoized preferences of the current user
+            file_status_poller: waits for the analysis of uploaded CAD files
+            upload_preprocessor: shrinks CAD files before upload, None sends
+                them unchanged
+            json_codec: encodes request bodies and decodes responses
+            metrics: records every request, None disables metrics
+            tracer: receives a span per request and per composite method,
+                None disables tracing
         """
         self._api_prefix = "api/v2.0/"
         self._access_token = access_token
         self._base_url = base_url
+        self._retry_policy = retry_policy
+        self._rate_limiter = rate_limiter
+        self._response_cache = response_cache
+        self._preferences_cache = (
+            preferences_cache if preferences_cache is not None else PreferencesCache()
+        )
+        self._file_status_poller = (
+            file_status_poller if file_status_poller is not None else FileStatusPoller()
+        )
+        self._upload_preprocessor = upload_preprocessor
+        self._json_codec = (
+            json_codec if json_codec is not None else get_default_json_codec()
+        )
+        self._metrics = metrics
+        self._tracer = tracer
+
+    def _get_shared_options(self) -> t.Dict[str, t.Any]:
+        """
+        Keyword arguments passed to every namespace, so all of them share
+        the state of one client
+        """
+
+        return {
+            "retry_policy": self._retry_policy,
+            "rate_limiter": self._rate_limiter,
+            "response_cache": self._response_cache,
+            "preferences_cache": self._preferences_cache,
+            "file_status_poller": self._file_status_poller,
+            "upload_preprocessor": self._upload_preprocessor,
+            "json_codec": self._json_codec,
+            "metrics": self._metrics,
+            "tracer": self._tracer,
+        }
+
+
+class BaseAPI(SharedStateMixin):
+    """
+    Base class for all namespaced API methods. Not to be instantiated directly.
+    """
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str,
+        *,
+        session: t.Optional["requests.Session"] = None,
+        **options: t.Any,
+    ):
+        """
+        Args:
+            session: HTTP session used to send requests. Namespaces of one client
+                share the same session and its connection pool.
+        Other arguments are described in `SharedStateMixin`.
+        """
+        super().__init__(access_token, base_url, **options)
+        self._session = session if session is not None else LazySession()
+
+    def _get_shared_options(self) -> t.Dict[str, t.Any]:
+        return {"session": self._session, **super()._get_shared_options()}
 
     def _get_url(self, sub_path: str) -> str:
         """
@@ -44,6 +153,18 @@ class BaseAPI:
     def _get_headers(self):
         return {"Authorization": f"Token {self._access_token}"}
 
+    def _convert_response(
+        self,
+        response: types.AnyResponse,
+        convert: t.Optional[t.Callable[[types.AnyResponse], t.Any]],
+    ) -> t.Any:
+        """
+        Apply `convert`, ex. `Order.from_dict`, to the response of `_request`.
+        Overridden by the asyncio client, whose `_request` returns an awaitable.
+        """
+
+        return convert(response) if convert is not None else response
+
     def _request(
         self,
         method: types.RequestMethod,
@@ -52,9 +173,10 @@ class BaseAPI:
     ) -> types.AnyResponse:
         """
         Main wrapper for request to the API. Together with required positional arguments
-        accepts keyword arguments that are passed to `requests.request` function.
+        accepts keyword arguments that are passed to `requests.Session.request` method.
 
-        - json: used to send JSON data with POST, PUT or PATCH request
+        - json: used to send JSON data with POST, PUT or PATCH request, encoded with
+          the JSON codec of the client
         - files: send files using multipart/form-urlencoded content type
         - params: send GET query params ({"sort": "date"} will result in ?sort=date)
 
@@ -68,20 +190,220 @@ class BaseAPI:
         :param kwargs:
         :return: JSON response from API if API response code is 200..299. Otherwise,
             raises an exception (a subclass of `push_to_3yourmind.exceptions.BasePushTo3YourmindAPIException`)
+
+        Failed requests are retried according to the retry policy of the client,
+        see `push_to_3yourmind.retry.RetryPolicy`.
+        """
+
+        response = self._send(method, sub_path, **kwargs)
+        return self._get_observed_payload(method, sub_path, response)
+
+    def _cached_request(self, sub_path: str) -> types.AnyResponse:
+        """
+        GET request served from the response cache of the client, if there is one.
+        Expired entries are revalidated with a conditional request.
         """
 
+        if self._response_cache is None:
+            return self._request("GET", sub_path)
+
+        entry = self._response_cache.get(sub_path)
+        if entry is not None and entry.is_fresh():
+            return entry.payload
+
+        headers = entry.get_validators() if entry is not None else {}
+        response = self._send("GET", sub_path, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            return self._response_cache.revalidate(sub_path, entry, response.headers)
+
+        response_payload = self._get_observed_payload("GET", sub_path, response)
+        self._response_cache.store(sub_path, response_payload, response.headers)
+        return response_payload
+
+    def _send(
+        self,
+        method: types.RequestMethod,
+        sub_path: str,
+        **kwargs: t.Any,
+    ) -> "requests.Response":
+        """
+        Send a request, applying rate limiting and retries, and return the final
+        response as is. Accepts the same arguments as `_request`, extra `headers`
+        are added to the authorization header.
+        """
+
+        # Imported here, the package is imported without loading requests
+        from requests import ConnectionError, Timeout
+
         url = self._get_url(sub_path)
-        logger.debug(f"Request {method} to {url}")
-        response = requests.request(
-            method=method,
-            url=url,
-            headers=self._get_headers(),
-            **kwargs,
+        headers = {**self._get_headers(), **kwargs.pop("headers", {})}
+        if "json" in kwargs:
+            kwargs["data"] = self._json_codec.dumps(kwargs.pop("json"))
+            headers.setdefault("Content-Type", "application/json")
+        retry_state = RetryState(
+            self._retry_policy, method, rewindable=is_rewindable(kwargs)
+        )
+        stream_positions = get_stream_positions(kwargs)
+        started = time.perf_counter()
+        try:
+            while True:
+                if self._rate_limiter is not None:
+                    self._rate_limiter.acquire(sub_path)
+                logger.debug(f"Request {method} to {url}")
+                try:
+                    response = self._session.request(
+                        method=method,
+                        url=url,
+                        headers=headers,
+                        **kwargs,
+                    )
+                except (ConnectionError, Timeout) as exc:
+                    delay = retry_state.get_next_delay()
+                    if delay is None:
+                        raise
+                    logger.info(f"Retrying {method} {url} in {delay:.2f}s: {exc}")
+                else:
+                    if not retry_state.is_retryable_status(response.status_code):
+                        break
+                    delay = retry_state.get_next_delay(
+                        response.headers.get("Retry-After")
+                    )
+                    if delay is None:
+                        break
+                    logger.info(
+                        f"Retrying {method} {url} in {delay:.2f}s: "
+                        f"status {response.status_code}"
+                    )
+
+                time.sleep(delay)
+                rewind_streams(stream_positions)
+        except Exception as exc:
+            self._observe_request(
+                method, sub_path, started, retry_state, kwargs, headers, exception=exc
+            )
+            raise
+        self._observe_request(
+            method, sub_path, started, retry_state, kwargs, headers, response=response
         )
+        return response
+
+    def _observe_request(
+        self,
+        method: types.RequestMethod,
+        sub_path: str,
+        started: float,
+        retry_state: RetryState,
+        request_kwargs: t.Dict[str, t.Any],
+        headers: t.Dict[str, str],
+        *,
+        response: t.Any = None,
+        exception: t.Optional[Exception] = None,
+    ) -> None:
+        """
+        Record a request sent by `_send` in the metrics registry of the client,
+        and as a span of its tracer
+        """
+
+        if self._metrics is None and self._tracer is None:
+            return
+        duration = time.perf_counter() - started
+        status_code = response.status_code if response is not None else None
+        if self._metrics is not None:
+            attempts = retry_state.retries + 1
+            self._metrics.observe_request(
+                method,
+                sub_path,
+                duration=duration,
+                status_code=status_code,
+                exception=exception,
+                request_bytes=get_body_length(request_kwargs, headers) * attempts,
+                response_bytes=len(response.content) if response is not None else 0,
+                retries=retry_state.retries,
+            )
+        if self._tracer is not None:
+            self._tracer.record_span(
+                f"{method} {get_path_template(sub_path)}",
+                duration=duration,
+                attributes={
+                    "http.method": method,
+                    "http.path": sub_path,
+                    "http.status_code": status_code,
+                    "retries": retry_state.retries,
+                },
+                error=exception,
+            )
+
+    def _get_observed_payload(
+        self, method: types.RequestMethod, sub_path: str, response: t.Any
+    ) -> types.AnyResponse:
+        """
+        `_get_response_payload`, counting the exceptions raised for error responses
+        """
+
+        try:
+            return self._get_response_payload(response)
+        except exceptions.BasePushTo3YourmindAPIException as exc:
+            if self._metrics is not None:
+                self._metrics.observe_exception(method, sub_path, exc)
+            raise
+
+    def _post_file(
+        self,
+        sub_path: str,
+        file: types.CadFileSpecifier,
+        *,
+        fields: t.Optional[t.Dict[str, t.Any]] = None,
+        preprocess: bool = False,
+    ) -> types.AnyResponse:
+        """
+        Upload a file as "file" field of a multipart/form-data POST request. The file
+        is streamed from its source, local files are closed once the request is done.
+        A file given by URL is piped from the download into the upload.
+
+        With `preprocess`, the file goes through the upload preprocessor of the
+        client first, if there is one.
+        """
+
+        with utils.open_file(file, self._session) as (filename, stream):
+            upload_stream = stream
+            if preprocess and self._upload_preprocessor is not None:
+                filename, upload_stream = self._upload_preprocessor.prepare(
+                    filename, stream
+                )
+            try:
+                encoder = MultipartEncoder(
+                    fields=fields, files={"file": (filename, upload_stream)}
+                )
+                return self._request(
+                    "POST",
+                    sub_path,
+                    data=encoder,
+                    headers={"Content-Type": encoder.content_type},
+                )
+            finally:
+                if upload_stream is not stream:
+                    upload_stream.close()
+
+    def _get_preferences(self) -> types.ResponseDict:
+        """
+        Preferences of the current user, requested once per client
+        """
+
+        preferences = self._preferences_cache.get()
+        if preferences is None:
+            preferences = self._request("GET", "my-profile/preferences/")
+            self._preferences_cache.set(preferences)
+        return preferences
+
+    def _get_response_payload(self, response: t.Any) -> types.AnyResponse:
+        """
+        Decode the response and map error status codes to exceptions. Works with
+        any response object exposing `status_code` and `content`.
+        """
 
         if 200 <= response.status_code < 500:
             if response.content:
-                response_payload = response.json()
+                response_payload = self._json_codec.loads(response.content)
             else:
                 response_payload = ""
 
@@ -95,6 +417,8 @@ class BaseAPI:
                 raise exceptions.ObjectNotFound(response_payload)
             elif response.status_code == 405:
                 raise exceptions.MethodNotAllowed(response_payload)
+            elif response.status_code == 429:
+                raise exceptions.TooManyRequests(response_payload)
             return response_payload
         else:
             raise exceptions.ServerError(response.content)
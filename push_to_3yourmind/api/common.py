@@ -14,36 +14,39 @@ class CommonAPI(BaseAPI):
     """
     Accessible via namespace `common`, for example:
     >>> response = client.common.get_colors()
+
+    The data returned here rarely changes. Pass a `push_to_3yourmind.cache.ResponseCache`
+    to the client to keep responses between calls.
     """
 
     def get_colors(self) -> t.List[types.ResponseDict]:
-        return self._request("GET", "colors/")
+        return self._cached_request("colors/")
 
     def get_units(self) -> t.List[types.ResponseDict]:
         """
         Get list of units of measure available on the platform.
         Currently, "mm" and "inch".
         """
-        return self._request("GET", "units/")
+        return self._cached_request("units/")
 
     def get_countries(self) -> t.List[types.ResponseDict]:
         """
         Get list of countries with codes and full names
         """
-        return self._request("GET", "countries/")
+        return self._cached_request("countries/")
 
     def get_currencies(self) -> t.List[str]:
         """
         Get list of currencies available on the platform
         """
-        return self._request("GET", "currencies/")
+        return self._cached_request("currencies/")
 
     def get_materials(self) -> t.List[types.ResponseDict]:
-        return self._request("GET", "materials/")
+        return self._cached_request("materials/")
 
     def get_forms(self):
-        return self._request("GET", "forms/")
+        return self._cached_request("forms/")
 
     def get_tax_types(self) -> t.List[str]:
-        return self._request("GET", "tax-types/")
+        return self._cached_request("tax-types/")
 
@@ -1,9 +1,10 @@
 """
 User profile API
 """
+import functools
 import typing as t
 
-from push_to_3yourmind import types
+from push_to_3yourmind import models, types
 from push_to_3yourmind.api.base import BaseAPI
 
 
@@ -13,10 +14,13 @@ __all__ = ["MyProfileAPI"]
 class MyProfileAPI(BaseAPI):
     def get_preferences(self) -> types.ResponseDict:
         """
-        Get preferences of the current user: country, currency, language, unit
+        Get preferences of the current user: country, currency, language, unit.
+        Also refreshes the preferences memoized by the client.
         """
 
-        return self._request("GET", "my-profile/preferences/")
+        preferences = self._request("GET", "my-profile/preferences/")
+        self._preferences_cache.set(dict(preferences))
+        return preferences
 
     def set_preferences(
         self,
@@ -40,7 +44,10 @@ class MyProfileAPI(BaseAPI):
         json = self._get_parameters(
             country=country, currency=currency, language=language, unit=unit
         )
-        return self._request("PUT", "my-profile/preferences/", json=json)
+        try:
+            return self._request("PUT", "my-profile/preferences/", json=json)
+        finally:
+            self._preferences_cache.invalidate()
 
     def get_profile(self) -> types.ResponseDict:
         """
@@ -49,16 +56,30 @@ class MyProfileAPI(BaseAPI):
 
         return self._request("GET", "my-profile/profile/")
 
-    def get_addresses(self) -> t.List[types.ResponseDict]:
+    def get_addresses(self, *, as_models: bool = False) -> t.List[types.ResponseDict]:
         """
         Get a list of current user's addresses
+
+        Args:
+            as_models: return `push_to_3yourmind.models.Address` instances
         """
 
-        return self._request("GET", "my-profile/addresses/")
+        return self._convert_response(
+            self._request("GET", "my-profile/addresses/"),
+            functools.partial(models.from_list, models.Address) if as_models else None,
+        )
 
-    def get_address(self, *, address_id: int) -> types.ResponseDict:
+    def get_address(
+        self, *, address_id: int, as_model: bool = False
+    ) -> types.ResponseDict:
         """
         Get specific address of the current user
+
+        Args:
+            as_model: return a `push_to_3yourmind.models.Address` instead of a dict
         """
 
-        return self._request("GET", f"my-profile/addresses/{address_id}/")
+        return self._convert_response(
+            self._request("GET", f"my-profile/addresses/{address_id}/"),
+            models.Address.from_dict if as_model else None,
+        )
@@ -5,10 +5,12 @@ placing orders, making requests for quotes, ordering quotes etc.
 
 import datetime
 import decimal
+import functools
 import typing as t
 import time
 
-from push_to_3yourmind import types, exceptions, utils
+from push_to_3yourmind import types, exceptions, models, utils
+from push_to_3yourmind.pagination import fetch_all_records, iter_records
 from push_to_3yourmind.logger import logger
 from push_to_3yourmind.api.base import BaseAPI
 from push_to_3yourmind.types import NoValue
@@ -47,6 +49,65 @@ class OrganizationPanelAPI(BaseAPI):
         query = self._get_parameters(page=page, pageSize=page_size, search=search)
         return self._request("GET", "organization-panel/users/", params=query)
 
+    def iter_users(
+            self,
+            *,
+            page_size: t.Optional[int] = NoValue,
+            search: t.Optional[str] = NoValue,
+            prefetch: bool = True,
+            as_models: bool = False,
+    ) -> t.Iterator[types.ResponseDict]:
+        """
+        Iterate over all users of the current organization, page by page. While the
+        caller processes one page, the next one is requested in the background.
+
+        Args:
+            page_size: int, optional
+            search: str, optional
+            prefetch: request the next page in the background, default True
+            as_models: yield `push_to_3yourmind.models.User` instances instead
+                of dicts, which take less memory
+        Returns:
+            iterator of user details
+        """
+        get_page = functools.partial(self.get_users, page_size=page_size, search=search)
+        return iter_records(
+            lambda page: get_page(page=page),
+            prefetch=prefetch,
+            convert=models.User.from_dict if as_models else None,
+        )
+
+    def fetch_all_users(
+            self,
+            *,
+            page_size: t.Optional[int] = NoValue,
+            search: t.Optional[str] = NoValue,
+            max_workers: int = 8,
+            ordered: bool = True,
+            as_models: bool = False,
+    ) -> t.Iterator[types.ResponseDict]:
+        """
+        Get all users of the current organization. After the first page, the
+        remaining pages are requested concurrently.
+
+        Args:
+            page_size: int, optional
+            search: str, optional
+            max_workers: number of pages requested at the same time, default 8
+            ordered: keep the order of pages, default True. Otherwise, users are
+                yielded as soon as their page arrives.
+            as_models: yield `push_to_3yourmind.models.User` instances
+        Returns:
+            iterator of user details
+        """
+        get_page = functools.partial(self.get_users, page_size=page_size, search=search)
+        return fetch_all_records(
+            lambda page: get_page(page=page),
+            max_workers=max_workers,
+            ordered=ordered,
+            convert=models.User.from_dict if as_models else None,
+        )
+
     def get_user_preferences(self, *, user_id: int) -> types.ResponseDict:
         """
         Get region preferences for a User
@@ -3,32 +3,46 @@ Groups API functionality from the User Panel, such as creating/updating baskets,
 placing orders, making requests for quotes, ordering quotes etc.
 """
 
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 import datetime
 import decimal
+import functools
 import typing as t
-import time
+import warnings
 
-from push_to_3yourmind import types, exceptions, utils
+from push_to_3yourmind import exceptions, models, stl, types, utils
+from push_to_3yourmind.pagination import fetch_all_records, iter_records
 from push_to_3yourmind.logger import logger
 from push_to_3yourmind.api.base import BaseAPI
+from push_to_3yourmind.tracing import bind_context, traced
 from push_to_3yourmind.types import NoValue
 
 
 __all__ = ["UserPanelAPI"]
 
 
+DEFAULT_CHECK_FILE_STATUS_MAX_ATTEMPTS = 60
+DEFAULT_CHECK_FILE_STATUS_DELAY = 0.5  # seconds
+
+
 class UserPanelAPI(BaseAPI):
     """
     Accessible via namespace `user_panel`, for example:
     >>> response = client.user_panel.get_baskets()
 
+    The analysis of uploaded CAD files is polled by the `FileStatusPoller` of the
+    client, see `push_to_3yourmind.polling.FileStatusPoller` for its intervals
+    and deadlines.
+
     Attributes:
-        CHECK_FILE_STATUS_MAX_ATTEMPTS: How many times to check for the uploaded CAD file analysis status
-        CHECK_FILE_STATUS_DELAY: Delay between status check requests, in seconds
+        CHECK_FILE_STATUS_MAX_ATTEMPTS: deprecated, pass a `FileStatusPoller` to
+            the client instead. If changed, the analysis of a file times out
+            after CHECK_FILE_STATUS_MAX_ATTEMPTS * CHECK_FILE_STATUS_DELAY seconds.
+        CHECK_FILE_STATUS_DELAY: deprecated, see CHECK_FILE_STATUS_MAX_ATTEMPTS
     """
 
-    CHECK_FILE_STATUS_MAX_ATTEMPTS = 60
-    CHECK_FILE_STATUS_DELAY = 0.5  # seconds
+    CHECK_FILE_STATUS_MAX_ATTEMPTS = DEFAULT_CHECK_FILE_STATUS_MAX_ATTEMPTS
+    CHECK_FILE_STATUS_DELAY = DEFAULT_CHECK_FILE_STATUS_DELAY
 
     def get_baskets(
         self,
@@ -55,6 +69,63 @@ class UserPanelAPI(BaseAPI):
         query = self._get_parameters(page=page, pageSize=page_size)
         return self._request("GET", "user-panel/baskets/", params=query)
 
+    def iter_baskets(
+        self,
+        *,
+        page_size: types.OptionalInteger = NoValue,
+        prefetch: bool = True,
+        as_models: bool = False,
+    ) -> t.Iterator[types.ResponseDict]:
+        """
+        Iterate over all baskets of the current user, page by page. While the caller
+        processes one page, the next one is requested in the background.
+
+        Args:
+            page_size: int, optional
+            prefetch: request the next page in the background, default True
+            as_models: yield `push_to_3yourmind.models.Basket` instances instead
+                of dicts, which take less memory
+        Returns:
+            iterator of basket details
+        """
+
+        get_page = functools.partial(self.get_baskets, page_size=page_size)
+        return iter_records(
+            lambda page: get_page(page=page),
+            prefetch=prefetch,
+            convert=models.Basket.from_dict if as_models else None,
+        )
+
+    def fetch_all_baskets(
+        self,
+        *,
+        page_size: types.OptionalInteger = NoValue,
+        max_workers: int = 8,
+        ordered: bool = True,
+        as_models: bool = False,
+    ) -> t.Iterator[types.ResponseDict]:
+        """
+        Get all baskets of the current user. After the first page, the remaining
+        pages are requested concurrently.
+
+        Args:
+            page_size: int, optional
+            max_workers: number of pages requested at the same time, default 8
+            ordered: keep the order of pages, default True. Otherwise, baskets are
+                yielded as soon as their page arrives.
+            as_models: yield `push_to_3yourmind.models.Basket` instances
+        Returns:
+            iterator of basket details
+        """
+
+        get_page = functools.partial(self.get_baskets, page_size=page_size)
+        return fetch_all_records(
+            lambda page: get_page(page=page),
+            max_workers=max_workers,
+            ordered=ordered,
+            convert=models.Basket.from_dict if as_models else None,
+        )
+
     def get_basket(self, *, basket_id: int) -> types.ResponseDict:
         """
         Args:
@@ -168,10 +239,21 @@ class UserPanelAPI(BaseAPI):
         )
 
     def get_materials(
-        self, *, basket_id: int, line_id: int
+        self,
+        *,
+        basket_id: int,
+        line_id: int,
+        country: types.OptionalString = types.NoValue,
     ) -> t.List[types.ResponseDict]:
-        preferences = self._request("GET", "my-profile/preferences/")
-        country = preferences["country"]
+        """
+        Args:
+            basket_id: int
+            line_id: int
+            country: 2-letter country code, defaults to the country from
+                the current user's preferences
+        """
+        if country is types.NoValue:
+            country = self._get_preferences()["country"]
         query = {"country": country}
 
         return self._request(
@@ -181,10 +263,23 @@ class UserPanelAPI(BaseAPI):
         )
 
     def get_products(
-        self, *, basket_id: int, line_id: int, material_id: int
+        self,
+        *,
+        basket_id: int,
+        line_id: int,
+        material_id: int,
+        country: types.OptionalString = types.NoValue,
     ) -> t.List[types.ResponseDict]:
-        preferences = self._request("GET", "my-profile/preferences/")
-        country = preferences["country"]
+        """
+        Args:
+            basket_id: int
+            line_id: int
+            material_id: int
+            country: 2-letter country code, defaults to the country from
+                the current user's preferences
+        """
+        if country is types.NoValue:
+            country = self._get_preferences()["country"]
         query = {"country": country}
 
         return self._request(
@@ -194,6 +289,7 @@ class UserPanelAPI(BaseAPI):
             params=query,
         )
 
+    @traced
     def upload_cad_file(
         self,
         *,
@@ -201,15 +297,34 @@ class UserPanelAPI(BaseAPI):
         unit: types.Unit,
         cad_file: types.CadFileSpecifier,
         line_id: int,
+        inspect: bool = False,
     ) -> types.ResponseDict:
+        """
+        Args:
+            inspect: check an STL file locally before uploading it, and raise
+                `InvalidCADFile` if it is obviously broken. Requires numpy.
+        """
+        if inspect:
+            self._inspect_cad_file(cad_file, unit)
 
         data = self._get_parameters(basket_id=basket_id, unit=unit, line_id=line_id)
-        cad_file_contents = utils.extract_file_content(cad_file)
-
-        return self._request(
-            "POST", f"/upload/", data=data, files={"file": cad_file_contents}
-        )
+        return self._post_file(f"/upload/", cad_file, fields=data, preprocess=True)
+
+    def _inspect_cad_file(self, cad_file: types.CadFileSpecifier, unit: types.Unit) -> None:
+        report = stl.inspect_cad_file(cad_file)
+        if report is None:
+            return
+        if not report.is_valid:
+            raise exceptions.InvalidCADFile("; ".join(report.problems))
+        for warning in report.warnings:
+            logger.warning(f"Uploading CAD file with {warning}")
+        if report.plausible_units and unit not in report.plausible_units:
+            logger.warning(
+                f"Uploading CAD file of size {report.size} in {unit}, "
+                f"its size suggests {report.suggested_unit}"
+            )
 
+    @traced
     def create_line_with_cad_file_and_product(
         self,
         *,
@@ -219,16 +334,33 @@ class UserPanelAPI(BaseAPI):
         quantity: int,
         post_processings: t.Sequence[types.PostProcessingConfig] = (),
         preferred_due_date: types.OptionalDate = types.NoValue,
+        unit: t.Union[types.Unit, types.NoValueType] = types.NoValue,
+        inspect: bool = False,
     ) -> types.ResponseDict:
-        preferences = self._request("GET", "my-profile/preferences/")
-        unit = preferences["unit"]
+        """
+        Create a basket line, upload the CAD file to it, wait for the file analysis
+        and set product, quantity and post processings of the line.
+
+        Args:
+            unit: unit of the CAD file, mm or inch. Defaults to the unit from
+                the current user's preferences.
+            inspect: check an STL file locally before creating the line, see
+                `upload_cad_file`
+        """
+        if unit is types.NoValue:
+            unit = self._get_preferences()["unit"]
+        if inspect:
+            self._inspect_cad_file(cad_file, unit)
 
+        file_size = utils.get_file_size(cad_file)
         line_response = self.create_basket_line(basket_id=basket_id)
         line_id = line_response["id"]
         self.upload_cad_file(
             basket_id=basket_id, line_id=line_id, unit=unit, cad_file=cad_file
         )
-        self.check_uploaded_file_status(basket_id=basket_id, line_id=line_id)
+        self.check_uploaded_file_status(
+            basket_id=basket_id, line_id=line_id, file_size=file_size
+        )
 
         return self.update_basket_line(
             basket_id=basket_id,
@@ -239,27 +371,221 @@ class UserPanelAPI(BaseAPI):
             preferred_due_date=preferred_due_date,
         )
 
+    @traced
+    def create_lines_with_cad_files(
+        self,
+        *,
+        basket_id: int,
+        items: t.Sequence[types.CadFileLineConfig],
+        max_concurrency: int = 4,
+        unit: t.Union[types.Unit, types.NoValueType] = types.NoValue,
+        inspect: bool = False,
+        on_result: t.Optional[t.Callable[[types.BatchItemResult], None]] = None,
+    ) -> t.List[types.BatchItemResult]:
+        """
+        Batch version of `create_line_with_cad_file_and_product`. Up to `max_concurrency`
+        lines are created, uploaded or updated at the same time. Meanwhile, the
+        analysis of all uploaded files is polled by the `FileStatusPoller` of the
+        client, so waiting for it doesn't hold a thread.
+
+        A failing item doesn't stop the batch, its exception is returned in
+        the item's result instead.
+
+        >>> results = client.user_panel.create_lines_with_cad_files(
+        ...     basket_id=4,
+        ...     items=[
+        ...         CadFileLineConfig(cad_file="/path/to/part1.stl", product_id=3),
+        ...         CadFileLineConfig(cad_file="/path/to/part2.stl", product_id=3, quantity=5),
+        ...     ],
+        ... )
+        >>> failed = [result for result in results if not result.ok]
+
+        Args:
+            basket_id: int
+            items: lines to create
+            max_concurrency: number of lines processed at the same time
+            unit: unit of the CAD files, mm or inch. Defaults to the unit from
+                the current user's preferences.
+            inspect: check STL files locally before creating their lines, broken
+                files fail with `InvalidCADFile`
+            on_result: called with the result of every item as soon as it is
+                done, ex. to report progress. Called from worker threads.
+        Returns:
+            one result per item, in the order of items
+        """
+        if unit is types.NoValue:
+            unit = self._get_preferences()["unit"]
+
+        @bind_context
+        def upload(item: types.CadFileLineConfig) -> t.Tuple[int, t.Optional[int]]:
+            if inspect:
+                self._inspect_cad_file(item.cad_file, unit)
+            file_size = utils.get_file_size(item.cad_file)
+            line_id = self.create_basket_line(basket_id=basket_id)["id"]
+            self.upload_cad_file(
+                basket_id=basket_id, line_id=line_id, unit=unit, cad_file=item.cad_file
+            )
+            return line_id, file_size
+
+        @bind_context
+        def update(item: types.CadFileLineConfig, line_id: int) -> types.ResponseDict:
+            return self.update_basket_line(
+                basket_id=basket_id,
+                line_id=line_id,
+                quantity=item.quantity,
+                product_id=item.product_id,
+                post_processings=item.post_processings,
+                preferred_due_date=item.preferred_due_date,
+            )
+
+        def on_line_done(
+            item: types.CadFileLineConfig, item_result: Future, line: Future
+        ) -> None:
+            try:
+                result = types.BatchItemResult(item=item, response=line.result())
+            except Exception as exc:
+                logger.debug(f"Failed to create line from {item.cad_file}: {exc!r}")
+                result = types.BatchItemResult(item=item, error=exc)
+            try:
+                if on_result is not None:
+                    on_result(result)
+            finally:
+                item_result.set_result(result)
+
+        def create_line(item: types.CadFileLineConfig) -> Future:
+            # The item's result is set after `on_result` was called, waiting for
+            # the line itself could return before its callbacks ran
+            line = Future()
+            item_result = Future()
+            line.add_done_callback(functools.partial(on_line_done, item, item_result))
+
+            @bind_context
+            def on_uploaded(upload_future: Future) -> None:
+                try:
+                    line_id, file_size = upload_future.result()
+                    analysis = self.wait_for_file_analysis(
+                        basket_id=basket_id, line_id=line_id, file_size=file_size
+                    )
+                except Exception as exc:
+                    line.set_exception(exc)
+                    return
+                analysis.add_done_callback(functools.partial(on_analysed, line_id))
+
+            def on_analysed(line_id: int, analysis: Future) -> None:
+                try:
+                    analysis.result()
+                    update_future = executor.submit(update, item, line_id)
+                except Exception as exc:
+                    line.set_exception(exc)
+                    return
+                update_future.add_done_callback(on_updated)
+
+            def on_updated(update_future: Future) -> None:
+                try:
+                    line.set_result(update_future.result())
+                except Exception as exc:
+                    line.set_exception(exc)
+
+            executor.submit(upload, item).add_done_callback(on_uploaded)
+            return item_result
+
+        with ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="push_to_3yourmind-lines"
+        ) as executor:
+            item_results = [create_line(item) for item in items]
+            wait(item_results)
+        return [item_result.result() for item_result in item_results]
+
+    def get_file_status(self, *, basket_id: int, line_id: int) -> types.ResponseDict:
+        return self._request(
+            "GET", f"user-panel/baskets/{basket_id}/lines/{line_id}/file-status/"
+        )
+
+    def wait_for_file_analysis(
+        self,
+        *,
+        basket_id: int,
+        line_id: int,
+        file_size: t.Optional[int] = None,
+        timeout: t.Optional[float] = None,
+    ) -> "Future[None]":
+        """
+        Start polling the analysis status of the file uploaded to a line, without
+        blocking. Many files can be polled at the same time:
+
+        >>> futures = [
+        ...     client.user_panel.wait_for_file_analysis(basket_id=4, line_id=line_id)
+        ...     for line_id in line_ids
+        ... ]
+        >>> concurrent.futures.wait(futures)
+
+        Args:
+            basket_id: int
+            line_id: int
+            file_size: size of the uploaded file in bytes. Big files are polled
+                less often and get a later deadline.
+            timeout: seconds to wait for the analysis, defaults to a deadline
+                based on the file size
+        Returns:
+            future resolved when the analysis is finished, see
+            `push_to_3yourmind.polling.FileStatusPoller.submit`
+        """
+
+        @bind_context
+        def get_status() -> t.Optional[str]:
+            response = self.get_file_status(basket_id=basket_id, line_id=line_id)
+            return response.get("status")
+
+        return self._file_status_poller.submit(
+            get_status,
+            file_size=file_size,
+            timeout=self._get_file_status_timeout(timeout),
+        )
+
+    def _get_file_status_timeout(
+        self, timeout: t.Optional[float]
+    ) -> t.Optional[float]:
+        """
+        Timeout of a file analysis from the deprecated CHECK_FILE_STATUS_*
+        attributes, if they were changed and no timeout is given
+        """
+
+        attempts = self.CHECK_FILE_STATUS_MAX_ATTEMPTS
+        delay = self.CHECK_FILE_STATUS_DELAY
+        if timeout is not None or (attempts, delay) == (
+            DEFAULT_CHECK_FILE_STATUS_MAX_ATTEMPTS,
+            DEFAULT_CHECK_FILE_STATUS_DELAY,
+        ):
+            return timeout
+        warnings.warn(
+            "CHECK_FILE_STATUS_MAX_ATTEMPTS and CHECK_FILE_STATUS_DELAY are "
+            "deprecated, pass a FileStatusPoller with a timeout to the client",
+            DeprecationWarning,
+            stacklevel=3,
+        )
+        return attempts * delay
+
+    @traced
     def check_uploaded_file_status(
         self,
         *,
         basket_id: int,
         line_id: int,
+        file_size: t.Optional[int] = None,
+        timeout: t.Optional[float] = None,
     ) -> None:
-        max_attempts = self.CHECK_FILE_STATUS_MAX_ATTEMPTS
-        for attempt_number in range(max_attempts):
-            logger.debug(f"Checking file status {attempt_number}/{max_attempts}")
-            response = self._request(
-                "GET", f"user-panel/baskets/{basket_id}/lines/{line_id}/file-status/"
-            )
-            response_content = response.get("status")
-            if response_content == "analysing":
-                time.sleep(self.CHECK_FILE_STATUS_DELAY)
-                continue
-            elif response_content == "finished":
-                logger.debug("File analysis done")
-                return
-            else:
-                raise exceptions.FileAnalysisError()
+        """
+        Block until the analysis of the file uploaded to a line is finished.
+        Raises `FileAnalysisError` if it failed, or `FileAnalysisTimeout` if it
+        didn't finish in time.
+
+        Args:
+            file_size: size of the uploaded file in bytes, if known
+            timeout: seconds to wait for the analysis
+        """
+        self.wait_for_file_analysis(
+            basket_id=basket_id, line_id=line_id, file_size=file_size, timeout=timeout
+        ).result()
 
     def create_request_for_quote(
         self, *, basket_id: int, supplier_id: int, message: str
@@ -274,17 +600,66 @@ class UserPanelAPI(BaseAPI):
     def get_quotes(self) -> types.ResponseDict:
         return self._request("GET", "user-panel/quotes/")
 
-    def get_orders(self) -> types.ResponseDict:
-        return self._request("GET", "user-panel/orders/")
+    def get_orders(
+        self,
+        *,
+        page: types.OptionalInteger = NoValue,
+        page_size: types.OptionalInteger = NoValue,
+    ) -> types.ResponseDict:
+        """
+        Get orders of the current user. Returns paginated list.
+        """
+
+        query = self._get_parameters(page=page, pageSize=page_size)
+        return self._request("GET", "user-panel/orders/", params=query)
+
+    def fetch_all_orders(
+        self,
+        *,
+        page_size: types.OptionalInteger = NoValue,
+        max_workers: int = 8,
+        ordered: bool = True,
+        as_models: bool = False,
+    ) -> t.Iterator[types.ResponseDict]:
+        """
+        Get all orders of the current user, see `fetch_all_baskets`
 
-    def get_order(self, *, order_id: int) -> types.ResponseDict:
-        return self._request("GET", f"user-panel/orders/{order_id}/")
+        Args:
+            as_models: yield `push_to_3yourmind.models.Order` instances
+        """
+
+        get_page = functools.partial(self.get_orders, page_size=page_size)
+        return fetch_all_records(
+            lambda page: get_page(page=page),
+            max_workers=max_workers,
+            ordered=ordered,
+            convert=models.Order.from_dict if as_models else None,
+        )
+
+    def get_order(self, *, order_id: int, as_model: bool = False) -> types.ResponseDict:
+        """
+        Args:
+            as_model: return a `push_to_3yourmind.models.Order` instead of a dict
+        """
+
+        return self._convert_response(
+            self._request("GET", f"user-panel/orders/{order_id}/"),
+            models.Order.from_dict if as_model else None,
+        )
 
     def get_order_line(self, *, order_id: int, line_id: int) -> types.ResponseDict:
         return self._request("GET", f"user-panel/orders/{order_id}/{line_id}/")
 
-    def get_quote(self, *, quote_id: int) -> types.ResponseDict:
-        return self._request("GET", f"user-panel/quotes/{quote_id}/")
+    def get_quote(self, *, quote_id: int, as_model: bool = False) -> types.ResponseDict:
+        """
+        Args:
+            as_model: return a `push_to_3yourmind.models.Quote` instead of a dict
+        """
+
+        return self._convert_response(
+            self._request("GET", f"user-panel/quotes/{quote_id}/"),
+            models.Quote.from_dict if as_model else None,
+        )
 
     def finalize_quote(
         self,
@@ -332,6 +707,7 @@ class UserPanelAPI(BaseAPI):
         }
         return self._request("POST", f"user-panel/orders/", json=json)
 
+    @traced
     def quick_order_quote(self, *, quote_id: int) -> types.ResponseDict:
         """
         get quote details
@@ -414,9 +790,6 @@ class UserPanelAPI(BaseAPI):
             catalog_item_id: int,
             attachment_file: types.AttachmentFileSpecifier,
     ) -> types.ResponseDict:
-        attachment_file_contents = utils.extract_file_content(attachment_file)
-        return self._request(
-            "POST",
-            f"user-panel/catalog/{catalog_item_id}/attachments/",
-            files={"file": attachment_file_contents},
+        return self._post_file(
+            f"user-panel/catalog/{catalog_item_id}/attachments/", attachment_file
         )
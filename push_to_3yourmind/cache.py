@@ -0,0 +1,157 @@
+"""
+Response cache for near-static reference data, such as countries or currencies
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import time
+import typing as t
+
+from push_to_3yourmind import types
+
+
+__all__ = ["PreferencesCache", "ResponseCache"]
+
+
+@dataclass
+class CacheEntry:
+    payload: types.AnyResponse
+    expires_at: float
+    etag: t.Optional[str] = None
+    last_modified: t.Optional[str] = None
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def get_validators(self) -> t.Dict[str, str]:
+        """
+        Headers turning the next request into a conditional one
+        """
+
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Thread-safe, size-bounded cache of GET responses, used by the `common` namespace.
+
+    A cached response is returned without a request until its TTL expires. After
+    that, if the API sent an `ETag` or `Last-Modified` header, the request is made
+    conditional, and a "304 Not Modified" answer reuses the cached payload. When the
+    cache is full, the least recently used entry is evicted.
+
+    >>> cache = ResponseCache(ttl=600, ttls={"countries/": 24 * 3600})
+    >>> client = PushTo3YourmindAPI(
+    ...     access_token="QWERTY123456789",
+    ...     base_url="http://<domain-name>",
+    ...     response_cache=cache,
+    ... )
+    >>> client.common.get_countries()
+    >>> cache.invalidate("countries/")
+
+    Cached payloads are shared between callers and must not be modified.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = 300.0,
+        ttls: t.Optional[t.Mapping[str, float]] = None,
+        max_entries: int = 128,
+    ):
+        """
+        Args:
+            ttl: default time to live of an entry, in seconds
+            ttls: time to live per endpoint, keyed by sub path, ex. "countries/"
+            max_entries: max number of cached responses
+        """
+        self._ttl = ttl
+        self._ttls = dict(ttls or {})
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sub_path: str) -> t.Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(sub_path)
+            if entry is not None:
+                self._entries.move_to_end(sub_path)
+            return entry
+
+    def store(
+        self,
+        sub_path: str,
+        payload: types.AnyResponse,
+        headers: t.Mapping[str, str],
+    ) -> None:
+        entry = CacheEntry(
+            payload=payload,
+            expires_at=time.monotonic() + self._ttls.get(sub_path, self._ttl),
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+        )
+        with self._lock:
+            self._entries[sub_path] = entry
+            self._entries.move_to_end(sub_path)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def revalidate(
+        self,
+        sub_path: str,
+        entry: CacheEntry,
+        headers: t.Mapping[str, str],
+    ) -> types.AnyResponse:
+        """
+        Renew an entry after the API answered "304 Not Modified"
+        """
+
+        self.store(
+            sub_path,
+            entry.payload,
+            {
+                "ETag": headers.get("ETag", entry.etag),
+                "Last-Modified": headers.get("Last-Modified", entry.last_modified),
+            },
+        )
+        return entry.payload
+
+    def invalidate(self, sub_path: t.Optional[str] = None) -> None:
+        """
+        Drop the entry of the given sub path, or all entries if it is not given
+        """
+
+        with self._lock:
+            if sub_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(sub_path, None)
+
+
+class PreferencesCache:
+    """
+    Preferences of the current user, memoized per client. Filled on the first
+    `get_preferences` call (or the first method needing the user's country or unit),
+    invalidated by `set_preferences`.
+    """
+
+    def __init__(self):
+        self._preferences: t.Optional[types.ResponseDict] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> t.Optional[types.ResponseDict]:
+        with self._lock:
+            return self._preferences
+
+    def set(self, preferences: types.ResponseDict) -> None:
+        with self._lock:
+            self._preferences = preferences
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._preferences = None
@@ -0,0 +1,329 @@
+"""
+Record the HTTP exchanges of a run to a cassette file, and replay them later
+without network, to profile or reproduce a run offline
+"""
+import base64
+import collections
+from dataclasses import asdict, dataclass
+import datetime
+import gzip
+import hashlib
+import http
+import io
+import json
+import threading
+import time
+import typing as t
+import urllib.parse
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from push_to_3yourmind import exceptions
+from push_to_3yourmind.logger import logger
+
+
+__all__ = ["Cassette", "CassetteAdapter", "Exchange"]
+
+
+CassetteMode = t.Literal["record", "replay"]
+
+# Version 2 adds the hash of the request body to the keys of requests
+FORMAT_VERSION = 2
+# The body is stored decoded, and its length may change when it is re-encoded
+SKIPPED_HEADERS = {
+    "connection",
+    "content-encoding",
+    "content-length",
+    "keep-alive",
+    "set-cookie",
+    "transfer-encoding",
+}
+
+
+def get_request_key(
+    method: str, url: str, body: t.Optional[t.Union[bytes, str]] = None
+) -> str:
+    """
+    Requests are matched by method, host, path, query and body. The host tells
+    apart the requests of clients of different platforms sharing a cassette.
+    The body tells apart requests to the same URL, ex. users created at the same
+    time, which could otherwise get each other's responses on replay. Streamed
+    bodies, ex. of uploads, are left out.
+    """
+
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query)))
+    key = f"{method.upper()} {parts.netloc}{parts.path}"
+    if query:
+        key = f"{key}?{query}"
+    if body:
+        key = f"{key} #{get_body_hash(body)}"
+    return key
+
+
+def get_body_hash(body: t.Union[bytes, str]) -> str:
+    """
+    Short hash of a request body. JSON bodies are normalized first, so the
+    order of their keys doesn't matter.
+    """
+
+    if isinstance(body, str):
+        body = body.encode()
+    try:
+        value = json.loads(body)
+    except ValueError:
+        pass
+    else:
+        body = json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+@dataclass
+class Exchange:
+    """
+    One request and its response
+
+    Attributes:
+        key: method, host, path, query and body hash of the request
+        request_bytes: size of the request body, if known
+        status_code: response status code
+        headers: response headers
+        body: response body, decoded
+        duration: seconds between sending the request and receiving the response
+    """
+
+    key: str
+    request_bytes: t.Optional[int]
+    status_code: int
+    headers: t.Dict[str, str]
+    body: bytes
+    duration: float
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        try:
+            data["body"] = self.body.decode()
+        except UnicodeDecodeError:
+            data["body"] = base64.b64encode(self.body).decode()
+            data["base64"] = True
+        return json.dumps(data, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, line: str) -> "Exchange":
+        data = json.loads(line)
+        body = data.pop("body")
+        if data.pop("base64", False):
+            data["body"] = base64.b64decode(body)
+        else:
+            data["body"] = body.encode()
+        return cls(**data)
+
+
+class Cassette:
+    """
+    File of recorded exchanges, one JSON line per exchange, gzip compressed.
+    Authorization headers are not recorded, and request bodies only as a hash.
+
+    Record a run:
+
+    >>> with Cassette("migration.jsonl.gz", mode="record") as cassette:
+    ...     client = PushTo3YourmindAPI(
+    ...         access_token="QWERTY123456789",
+    ...         base_url="https://<domain-name>",
+    ...         cassette=cassette,
+    ...     )
+    ...     UserMigrator(...).migrate()
+
+    and replay it, without network:
+
+    >>> cassette = Cassette("migration.jsonl.gz", mode="replay", time_scale=0)
+
+    Several clients, ex. of the origin and target platforms of a migration, can
+    share a cassette.
+
+    On replay, every request gets the next recorded response with the same method,
+    URL, query and body, in recording order. Once they are used up, the last one
+    is repeated, ex. for extra file status checks. A request that was never
+    recorded raises `UnrecordedRequest`. Streamed bodies, ex. of CAD file
+    uploads, are not compared: concurrent uploads to the same URL get the
+    recorded responses in the order they arrive.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        mode: CassetteMode = "replay",
+        time_scale: float = 0.0,
+    ):
+        """
+        Args:
+            path: cassette file, overwritten when recording
+            mode: "record" to send requests and record them, "replay" to answer
+                them from the cassette
+            time_scale: on replay, responses are delayed by their recorded
+                duration multiplied by this factor: 0 replays without latency,
+                1 with the original timings
+        """
+        if mode not in ("record", "replay"):
+            raise exceptions.BadArgument(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self._lock = threading.Lock()
+        self._file: t.Optional[t.TextIO] = None
+        self._exchanges: t.Dict[str, t.Deque[Exchange]] = {}
+        self._last_exchanges: t.Dict[str, Exchange] = {}
+
+        if mode == "record":
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+            header = {"version": FORMAT_VERSION, "created": _now()}
+            self._file.write(json.dumps(header) + "\n")
+        else:
+            self._load()
+
+    def _load(self) -> None:
+        with gzip.open(self.path, "rt", encoding="utf-8") as cassette_file:
+            header = json.loads(next(cassette_file))
+            if header.get("version") != FORMAT_VERSION:
+                raise exceptions.BadArgument(
+                    f"Unsupported cassette version: {header.get('version')}"
+                )
+            for line in cassette_file:
+                exchange = Exchange.from_json(line)
+                self._exchanges.setdefault(
+                    exchange.key, collections.deque()
+                ).append(exchange)
+
+    def __len__(self) -> int:
+        return sum(len(exchanges) for exchanges in self._exchanges.values())
+
+    def add(self, exchange: Exchange) -> None:
+        with self._lock:
+            if self._file is None:
+                raise exceptions.BadArgument("Cassette is not recording")
+            self._file.write(exchange.to_json() + "\n")
+
+    def find(self, key: str) -> Exchange:
+        """
+        Next recorded exchange of a request
+
+        Raises:
+            UnrecordedRequest: if no exchange was recorded for the request
+        """
+
+        with self._lock:
+            exchanges = self._exchanges.get(key)
+            if exchanges:
+                exchange = self._last_exchanges[key] = exchanges.popleft()
+                return exchange
+            exchange = self._last_exchanges.get(key)
+        if exchange is None:
+            raise exceptions.UnrecordedRequest(key)
+        logger.debug(f"Recorded responses of {key} used up, repeating the last one")
+        return exchange
+
+    def get_delay(self, exchange: Exchange) -> float:
+        return exchange.duration * self.time_scale
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.close()
+
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def get_recorded_headers(headers: t.Mapping[str, str]) -> t.Dict[str, str]:
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in SKIPPED_HEADERS
+    }
+
+
+def _get_body_length(body: t.Any) -> t.Optional[int]:
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    return getattr(body, "len", None)
+
+
+class CassetteAdapter(BaseAdapter):
+    """
+    Transport adapter of `requests` recording to, or replaying from, a cassette.
+    Mounted on the session of a client created with a cassette.
+    """
+
+    def __init__(self, cassette: Cassette, adapter: t.Optional[HTTPAdapter] = None):
+        """
+        Args:
+            cassette: cassette to record to or to replay from
+            adapter: adapter sending the requests when recording
+        """
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter if adapter is not None else HTTPAdapter()
+
+    def send(
+        self, request: requests.PreparedRequest, **kwargs: t.Any
+    ) -> requests.Response:
+        body = request.body if isinstance(request.body, (bytes, str)) else None
+        key = get_request_key(request.method, request.url, body)
+        if self.cassette.mode == "replay":
+            exchange = self.cassette.find(key)
+            delay = self.cassette.get_delay(exchange)
+            if delay:
+                time.sleep(delay)
+            return self._build_response(request, exchange)
+
+        started = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        # Streamed bodies are read at once, so the duration covers the download
+        body = response.content
+        exchange = Exchange(
+            key=key,
+            request_bytes=_get_body_length(request.body),
+            status_code=response.status_code,
+            headers=get_recorded_headers(response.headers),
+            body=body,
+            duration=time.perf_counter() - started,
+        )
+        self.cassette.add(exchange)
+        response.raw = io.BytesIO(body)
+        return response
+
+    def _build_response(
+        self, request: requests.PreparedRequest, exchange: Exchange
+    ) -> requests.Response:
+        response = requests.Response()
+        response.status_code = exchange.status_code
+        response.headers = CaseInsensitiveDict(exchange.headers)
+        response.headers["Content-Length"] = str(len(exchange.body))
+        response.raw = io.BytesIO(exchange.body)
+        response._content = exchange.body
+        response.url = request.url
+        response.request = request
+        try:
+            response.reason = http.HTTPStatus(exchange.status_code).phrase
+        except ValueError:
+            response.reason = ""
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.elapsed = datetime.timedelta(seconds=exchange.duration)
+        response.connection = self
+        return response
+
+    def close(self) -> None:
+        self.adapter.close()
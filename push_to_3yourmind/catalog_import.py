@@ -0,0 +1,315 @@
+"""
+Bulk import of catalog items. Every row goes through the steps of creating a
+catalog item, each step being a stage of a `push_to_3yourmind.pipeline.Pipeline`
+with its own workers, so rows are uploaded while others wait for their file
+analysis or get their attachments.
+"""
+from dataclasses import dataclass, field
+import typing as t
+
+from push_to_3yourmind import types, utils
+from push_to_3yourmind.journal import JobJournal, JournalEntry
+from push_to_3yourmind.logger import logger
+from push_to_3yourmind.pipeline import Pipeline, PipelineError, PipelineReport, Stage
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from push_to_3yourmind.main import PushTo3YourmindAPI
+
+
+__all__ = ["CatalogImporter", "CatalogImportReport", "DEFAULT_WORKERS"]
+
+
+Mapper = t.Callable[[t.Mapping[str, t.Any]], types.CatalogItemConfig]
+
+# Waiting for the file analysis only blocks on the client's FileStatusPoller,
+# many rows can wait at the same time
+DEFAULT_WORKERS: t.Dict[str, int] = {
+    "map": 2,
+    "line": 4,
+    "upload": 8,
+    "analysis": 64,
+    "line_update": 4,
+    "catalog_item": 4,
+    "attachments": 8,
+}
+
+
+@dataclass
+class ImportRow:
+    key: str
+    row: t.Mapping[str, t.Any]
+    entry: JournalEntry
+    item: t.Optional[types.CatalogItemConfig] = None
+
+
+@dataclass
+class CatalogImportReport:
+    """
+    Attributes:
+        basket_id: helper basket the lines of the catalog items were created in
+        skipped: rows skipped as imported by an earlier run
+        pipeline: throughput of the run, per stage
+        stage_counts: number of rows per journal stage, over all runs of the job
+        errors: error of every failed row, by row key
+    """
+
+    basket_id: int
+    skipped: int
+    pipeline: PipelineReport
+    stage_counts: t.Dict[str, int] = field(default_factory=dict)
+    errors: t.Dict[str, str] = field(default_factory=dict)
+
+    def format(self) -> str:
+        return f"{self.skipped} rows skipped\n{self.pipeline.format()}"
+
+
+class CatalogImporter:
+    """
+    Creates a catalog item for every row, through these stages: map the row,
+    create a basket line, upload the CAD file, wait for its analysis, set the
+    product, post processings and part requirements of the line, create the
+    catalog item and upload its attachments.
+
+    >>> with JobJournal("import.sqlite3", job_id="catalog.csv") as journal:
+    ...     importer = CatalogImporter(client, journal=journal)
+    ...     with open("catalog.csv") as csv_file:
+    ...         report = importer.run(csv.DictReader(csv_file), mapper)
+    >>> print(report.format())
+
+    The progress of every row is recorded in the journal. Running the import
+    again skips the rows that were done, resumes the others at the stage they
+    stopped at, and reuses the helper basket. A failing row doesn't stop the
+    import, its error is recorded in the journal and in the report.
+
+    The client should have a connection pool for all workers sending requests,
+    see `pool_maxsize` of `PushTo3YourmindAPI`.
+    """
+
+    def __init__(
+        self,
+        client: "PushTo3YourmindAPI",
+        *,
+        journal: t.Optional[JobJournal] = None,
+        workers: t.Optional[t.Mapping[str, int]] = None,
+        dry_run: bool = False,
+        unit: t.Union[types.Unit, types.NoValueType] = types.NoValue,
+        inspect: bool = False,
+        delete_basket: bool = True,
+    ):
+        """
+        Args:
+            client: client of the platform to import to
+            journal: journal recording the progress of rows, an in-memory one
+                by default, so an interrupted import can't be resumed
+            workers: number of workers of stages, by stage name, overriding
+                `DEFAULT_WORKERS`
+            dry_run: stop once the file of a line was analysed and its product
+                set ("line_configured" stage), without creating catalog items.
+                The helper basket is kept, for a later run creating them.
+            unit: unit of the CAD files, mm or inch. Defaults to the unit from
+                the current user's preferences.
+            inspect: check STL files locally before uploading them
+            delete_basket: delete the helper basket once all rows of the job
+                were imported, never on a dry run
+        """
+        self.client = client
+        self.journal = journal
+        self.workers = {**DEFAULT_WORKERS, **(workers or {})}
+        self.dry_run = dry_run
+        self.unit = unit
+        self.inspect = inspect
+        self.delete_basket = delete_basket
+        # Journal stage after which a row is done
+        self.last_stage: types.JobStage = (
+            "line_configured" if dry_run else "attachments_done"
+        )
+
+    def run(
+        self, rows: t.Iterable[t.Mapping[str, t.Any]], mapper: Mapper
+    ) -> CatalogImportReport:
+        """
+        Import rows, ex. read by `csv.DictReader`. Rows are read as the
+        pipeline has room for them, and keyed by their index in `rows`.
+
+        Args:
+            rows: rows to import
+            mapper: turns a row into a `CatalogItemConfig`. A row the mapper
+                raises an exception for fails.
+        """
+
+        journal = self.journal
+        if journal is None:
+            journal = JobJournal(":memory:", job_id="catalog-import")
+        try:
+            return self._run(journal, rows, mapper)
+        finally:
+            if self.journal is None:
+                journal.close()
+
+    def _run(
+        self,
+        journal: JobJournal,
+        rows: t.Iterable[t.Mapping[str, t.Any]],
+        mapper: Mapper,
+    ) -> CatalogImportReport:
+        user_panel = self.client.user_panel
+        unit = self.unit
+        if unit is types.NoValue:
+            unit = self.client.my_profile.get_preferences()["unit"]
+        basket_id = journal.get_meta("basket_id")
+        if basket_id is not None and journal.get_meta("basket_deleted", False):
+            # Rows with a catalog item are done, the others start over in a new
+            # basket, their lines were deleted with the old one
+            reset_count = journal.reset_before("catalog_item_created")
+            logger.info(
+                f"Helper basket {basket_id} was deleted, "
+                f"{reset_count} rows start over in a new one"
+            )
+            basket_id = None
+        if basket_id is None:
+            basket_id = user_panel.create_basket()["id"]
+            journal.set_meta("basket_id", basket_id)
+            journal.set_meta("basket_deleted", False)
+
+        def map_row(row: ImportRow) -> ImportRow:
+            row.item = mapper(row.row)
+            row.entry = journal.record(row.key, "mapped")
+            return row
+
+        def create_line(row: ImportRow) -> ImportRow:
+            if not row.entry.has_reached("line_created"):
+                line_id = user_panel.create_basket_line(basket_id=basket_id)["id"]
+                row.entry = journal.record(row.key, "line_created", line_id=line_id)
+            return row
+
+        def upload(row: ImportRow) -> ImportRow:
+            if not row.entry.has_reached("uploaded"):
+                user_panel.upload_cad_file(
+                    basket_id=basket_id,
+                    line_id=row.entry.data["line_id"],
+                    unit=unit,
+                    cad_file=row.item.cad_file,
+                    inspect=self.inspect,
+                )
+                row.entry = journal.record(row.key, "uploaded")
+            return row
+
+        def wait_for_analysis(row: ImportRow) -> ImportRow:
+            if not row.entry.has_reached("analysed"):
+                user_panel.check_uploaded_file_status(
+                    basket_id=basket_id,
+                    line_id=row.entry.data["line_id"],
+                    file_size=utils.get_file_size(row.item.cad_file),
+                )
+                row.entry = journal.record(row.key, "analysed")
+            return row
+
+        def update_line(row: ImportRow) -> ImportRow:
+            if not row.entry.has_reached("line_configured"):
+                line_id = row.entry.data["line_id"]
+                user_panel.update_basket_line(
+                    basket_id=basket_id,
+                    line_id=line_id,
+                    quantity=row.item.quantity,
+                    product_id=row.item.product_id,
+                    post_processings=row.item.post_processings,
+                )
+                if row.item.part_requirements is not None:
+                    user_panel.add_part_requirements_to_basket_line(
+                        line_id=line_id, form_data=row.item.part_requirements
+                    )
+                row.entry = journal.record(row.key, "line_configured")
+            return row
+
+        def create_catalog_item(row: ImportRow) -> ImportRow:
+            if not row.entry.has_reached("catalog_item_created"):
+                catalog_item = user_panel.create_catalog_item(
+                    basket_line_id=row.entry.data["line_id"]
+                )
+                row.entry = journal.record(
+                    row.key, "catalog_item_created", catalog_item_id=catalog_item["id"]
+                )
+            return row
+
+        def upload_attachments(row: ImportRow) -> ImportRow:
+            # Attachments uploaded by an earlier run are skipped
+            uploaded_count = row.entry.data.get("uploaded_attachments", 0)
+            for attachment in row.item.attachments[uploaded_count:]:
+                user_panel.upload_catalog_item_attachment(
+                    catalog_item_id=row.entry.data["catalog_item_id"],
+                    attachment_file=attachment,
+                )
+                uploaded_count += 1
+                row.entry = journal.record(
+                    row.key, "catalog_item_created", uploaded_attachments=uploaded_count
+                )
+            row.entry = journal.record(row.key, "attachments_done")
+            return row
+
+        functions = [
+            ("map", map_row),
+            ("line", create_line),
+            ("upload", upload),
+            ("analysis", wait_for_analysis),
+            ("line_update", update_line),
+        ]
+        if not self.dry_run:
+            functions += [
+                ("catalog_item", create_catalog_item),
+                ("attachments", upload_attachments),
+            ]
+        stages = [
+            Stage(
+                name,
+                function,
+                workers=self.workers[name],
+                waiting=name == "analysis",
+            )
+            for name, function in functions
+        ]
+
+        errors: t.Dict[str, str] = {}
+
+        def on_error(error: PipelineError) -> None:
+            message = f"{error.stage}: {error.error}"
+            logger.error(f"Failed to import row {error.item.key}: {message}")
+            errors[error.item.key] = message
+            journal.record_error(error.item.key, message)
+
+        skipped = 0
+
+        def iter_rows() -> t.Iterator[ImportRow]:
+            nonlocal skipped
+            for index, row in enumerate(rows):
+                key = str(index)
+                entry = journal.get(key)
+                if entry.has_reached(self.last_stage):
+                    skipped += 1
+                    continue
+                yield ImportRow(key=key, row=row, entry=entry)
+
+        pipeline_report = Pipeline(stages, on_error=on_error).run(iter_rows())
+        stage_counts = journal.get_stage_counts()
+        logger.info(f"Catalog import finished: {stage_counts}")
+
+        # The helper basket is kept until all rows of the job went through, a rerun
+        # needs it. Failed rows are never at the last stage.
+        row_count = sum(
+            count for stage, count in stage_counts.items() if stage != "failed"
+        )
+        if (
+            self.delete_basket
+            and not self.dry_run
+            and stage_counts["attachments_done"] == row_count
+            and not journal.get_meta("basket_deleted", False)
+        ):
+            user_panel.delete_basket(basket_id=basket_id)
+            journal.set_meta("basket_deleted", True)
+
+        return CatalogImportReport(
+            basket_id=basket_id,
+            skipped=skipped,
+            pipeline=pipeline_report,
+            stage_counts=stage_counts,
+            errors=errors,
+        )
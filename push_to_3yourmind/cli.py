@@ -0,0 +1,527 @@
+"""
+Command-line tool running bulk operations of the API in parallel:
+
+    push-to-3yourmind users --output users.csv
+    push-to-3yourmind upload-dir ./parts --product-id 12 --jobs 8
+    push-to-3yourmind export-orders --details --output orders.jsonl
+    push-to-3yourmind prices --all --currency EUR
+
+The access token and URL of the platform are read from the
+PUSH_TO_3YOURMIND_ACCESS_TOKEN and PUSH_TO_3YOURMIND_BASE_URL environment
+variables, or from --access-token and --base-url.
+
+Records are written as JSON lines, or as CSV when the output file ends with
+.csv, to stdout by default. Progress and throughput are written to stderr.
+The exit status is 1 if any item failed.
+"""
+import argparse
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+import csv
+import logging
+import os
+import pathlib
+import sys
+import threading
+import time
+import typing as t
+
+from push_to_3yourmind import types
+from push_to_3yourmind.codec import JSONCodec
+from push_to_3yourmind.logger import logger
+from push_to_3yourmind.main import PushTo3YourmindAPI
+from push_to_3yourmind.session import DEFAULT_POOL_MAXSIZE
+
+
+__all__ = ["main"]
+
+
+ACCESS_TOKEN_VARIABLE = "PUSH_TO_3YOURMIND_ACCESS_TOKEN"
+BASE_URL_VARIABLE = "PUSH_TO_3YOURMIND_BASE_URL"
+DEFAULT_JOBS = 4
+DEFAULT_CAD_FILE_PATTERNS = ("*.stl", "*.obj", "*.3mf", "*.step", "*.stp")
+
+Item = t.TypeVar("Item")
+OutputFormat = t.Literal["jsonl", "csv"]
+
+
+class Progress:
+    """
+    Number of done and failed items and their throughput, written to stderr.
+    Redrawn in place on a terminal, printed every `interval` seconds otherwise.
+    Can be updated from many threads.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        total: t.Optional[int] = None,
+        *,
+        enabled: bool = True,
+        stream: t.TextIO = sys.stderr,
+        interval: float = 5.0,
+    ):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.enabled = enabled
+        self.stream = stream
+        self.is_terminal = stream.isatty()
+        self.interval = 0.1 if self.is_terminal else interval
+        self._started = time.perf_counter()
+        self._last_shown = self._started
+        self._lock = threading.Lock()
+
+    def update(self, count: int = 1, *, failed: bool = False) -> None:
+        with self._lock:
+            self.done += count
+            if failed:
+                self.failed += count
+            now = time.perf_counter()
+            if self.enabled and now - self._last_shown >= self.interval:
+                self._last_shown = now
+                self._show(now)
+
+    def _show(self, now: float, end: str = "") -> None:
+        elapsed = now - self._started
+        done = f"{self.done}/{self.total}" if self.total is not None else str(self.done)
+        rate = self.done / elapsed if elapsed else 0.0
+        line = f"{self.label}: {done} done, {self.failed} failed, {rate:.1f}/s"
+        if self.is_terminal:
+            self.stream.write(f"\r\033[K{line}{end}")
+        else:
+            self.stream.write(f"{line}\n")
+        self.stream.flush()
+
+    def finish(self) -> None:
+        """
+        Print the totals and the throughput of the whole run
+        """
+
+        with self._lock:
+            if self.enabled:
+                now = time.perf_counter()
+                self._show(now, end="\n" if self.is_terminal else "")
+                self.stream.write(
+                    f"{self.label}: finished in {now - self._started:.1f}s\n"
+                )
+                self.stream.flush()
+
+
+def map_parallel(
+    function: t.Callable[[Item], t.Any],
+    items: t.Iterable[Item],
+    *,
+    jobs: int,
+    progress: Progress,
+) -> t.Iterator[t.Tuple[Item, t.Any, t.Optional[Exception]]]:
+    """
+    Call `function` with every item in `jobs` threads, and yield the item, the
+    result and the exception, if any, in the order of items. Items are read as
+    threads become free, so long inputs are not held in memory.
+    """
+
+    def on_done(future: Future) -> None:
+        progress.update(failed=future.exception() is not None)
+
+    pending: t.Deque[t.Tuple[Item, Future]] = collections.deque()
+    with ThreadPoolExecutor(
+        max_workers=jobs, thread_name_prefix="push_to_3yourmind-cli"
+    ) as executor:
+        for item in items:
+            future = executor.submit(function, item)
+            future.add_done_callback(on_done)
+            pending.append((item, future))
+            if len(pending) >= jobs * 2:
+                yield _get_outcome(*pending.popleft())
+        while pending:
+            yield _get_outcome(*pending.popleft())
+
+
+def _get_outcome(
+    item: Item, future: Future
+) -> t.Tuple[Item, t.Any, t.Optional[Exception]]:
+    try:
+        return item, future.result(), None
+    except Exception as exc:
+        logger.debug(f"Failed to process {item!r}: {exc!r}")
+        return item, None, exc
+
+
+def format_error(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}"
+
+
+class RecordWriter:
+    """
+    Writes records as JSON lines or CSV rows. CSV columns are the keys of the
+    first record, nested values are written as JSON.
+    """
+
+    def __init__(self, path: t.Optional[str], output_format: t.Optional[OutputFormat]):
+        if output_format is None:
+            output_format = "csv" if path and path.endswith(".csv") else "jsonl"
+        self.output_format = output_format
+        self.count = 0
+        self._file = (
+            open(path, "w", newline="", encoding="utf-8")
+            if path and path != "-"
+            else sys.stdout
+        )
+        self._csv_writer: t.Optional[csv.DictWriter] = None
+
+    def write(self, record: types.ResponseDict) -> None:
+        self.count += 1
+        if self.output_format == "jsonl":
+            self._file.write(_dumps(record) + "\n")
+            return
+        if self._csv_writer is None:
+            self._csv_writer = csv.DictWriter(
+                self._file, fieldnames=list(record), extrasaction="ignore"
+            )
+            self._csv_writer.writeheader()
+        self._csv_writer.writerow(
+            {
+                key: _dumps(value) if isinstance(value, (dict, list)) else value
+                for key, value in record.items()
+            }
+        )
+
+    def close(self) -> None:
+        if self._file is not sys.stdout:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.close()
+
+
+_codec = JSONCodec()
+
+
+def _dumps(value: t.Any) -> str:
+    return _codec.dumps(value).decode()
+
+
+def create_client(args: argparse.Namespace) -> PushTo3YourmindAPI:
+    return PushTo3YourmindAPI(
+        access_token=args.access_token,
+        base_url=args.base_url,
+        pool_maxsize=max(args.jobs, DEFAULT_POOL_MAXSIZE),
+    )
+
+
+def create_progress(
+    args: argparse.Namespace, label: str, total: t.Optional[int] = None
+) -> Progress:
+    return Progress(label, total, enabled=not args.no_progress)
+
+
+def run_users(args: argparse.Namespace, client: PushTo3YourmindAPI) -> int:
+    organization_panel = client.organization_panel
+    users = organization_panel.fetch_all_users(
+        page_size=args.page_size,
+        search=args.search if args.search is not None else types.NoValue,
+        max_workers=args.jobs,
+    )
+    progress = create_progress(args, "users")
+    failed = 0
+    with RecordWriter(args.output, args.format) as writer:
+        if not (args.with_preferences or args.with_addresses):
+            for user in users:
+                writer.write(user)
+                progress.update()
+            progress.finish()
+            return 0
+
+        def add_details(user: types.ResponseDict) -> types.ResponseDict:
+            user = dict(user)
+            if args.with_preferences:
+                user["preferences"] = organization_panel.get_user_preferences(
+                    user_id=user["id"]
+                )
+            if args.with_addresses:
+                user["addresses"] = organization_panel.get_user_addresses(
+                    user_id=user["id"]
+                )
+            return user
+
+        for user, detailed_user, error in map_parallel(
+            add_details, users, jobs=args.jobs, progress=progress
+        ):
+            if error is not None:
+                failed += 1
+                detailed_user = {**user, "error": format_error(error)}
+            writer.write(detailed_user)
+    progress.finish()
+    return 1 if failed else 0
+
+
+def run_export_orders(args: argparse.Namespace, client: PushTo3YourmindAPI) -> int:
+    user_panel = client.user_panel
+    orders = user_panel.fetch_all_orders(
+        page_size=args.page_size, max_workers=args.jobs
+    )
+    progress = create_progress(args, "orders")
+    failed = 0
+    with RecordWriter(args.output, args.format) as writer:
+        if not args.details:
+            for order in orders:
+                writer.write(order)
+                progress.update()
+            progress.finish()
+            return 0
+
+        for order, detailed_order, error in map_parallel(
+            lambda order: user_panel.get_order(order_id=order["id"]),
+            orders,
+            jobs=args.jobs,
+            progress=progress,
+        ):
+            if error is not None:
+                failed += 1
+                detailed_order = {**order, "error": format_error(error)}
+            writer.write(detailed_order)
+    progress.finish()
+    return 1 if failed else 0
+
+
+def run_prices(args: argparse.Namespace, client: PushTo3YourmindAPI) -> int:
+    user_panel = client.user_panel
+    if args.all:
+        baskets = user_panel.fetch_all_baskets(max_workers=args.jobs)
+        basket_ids: t.Iterable[int] = (basket["id"] for basket in baskets)
+        total = None
+    else:
+        basket_ids = args.basket_ids
+        total = len(basket_ids)
+    currency = args.currency or client.my_profile.get_preferences()["currency"]
+
+    def get_price(basket_id: int) -> types.ResponseDict:
+        return user_panel.get_basket_price(
+            basket_id=basket_id,
+            currency=currency,
+            shipping_method_id=_or_no_value(args.shipping_method_id),
+            voucher_code=_or_no_value(args.voucher_code),
+        )
+
+    progress = create_progress(args, "prices", total)
+    failed = 0
+    with RecordWriter(args.output, args.format) as writer:
+        for basket_id, price, error in map_parallel(
+            get_price, basket_ids, jobs=args.jobs, progress=progress
+        ):
+            if error is not None:
+                failed += 1
+                writer.write({"basketId": basket_id, "error": format_error(error)})
+            else:
+                writer.write({"basketId": basket_id, **price})
+    progress.finish()
+    return 1 if failed else 0
+
+
+def _or_no_value(value: t.Any) -> t.Any:
+    return value if value is not None else types.NoValue
+
+
+def find_cad_files(
+    directory: pathlib.Path, patterns: t.Sequence[str], recursive: bool
+) -> t.List[pathlib.Path]:
+    glob = directory.rglob if recursive else directory.glob
+    paths = {path for pattern in patterns for path in glob(pattern) if path.is_file()}
+    return sorted(paths)
+
+
+def run_upload_dir(args: argparse.Namespace, client: PushTo3YourmindAPI) -> int:
+    directory = pathlib.Path(args.directory)
+    if not directory.is_dir():
+        raise SystemExit(f"Not a directory: {directory}")
+    paths = find_cad_files(
+        directory, args.pattern or DEFAULT_CAD_FILE_PATTERNS, args.recursive
+    )
+    if not paths:
+        print(f"No CAD files found in {directory}", file=sys.stderr)
+        return 0
+
+    user_panel = client.user_panel
+    basket_id = args.basket_id
+    if basket_id is None:
+        basket_id = user_panel.create_basket()["id"]
+        print(f"Created basket {basket_id}", file=sys.stderr)
+
+    items = [
+        types.CadFileLineConfig(
+            cad_file=str(path), product_id=args.product_id, quantity=args.quantity
+        )
+        for path in paths
+    ]
+    progress = create_progress(args, "files", len(items))
+    results = user_panel.create_lines_with_cad_files(
+        basket_id=basket_id,
+        items=items,
+        max_concurrency=args.jobs,
+        unit=args.unit or types.NoValue,
+        inspect=args.inspect,
+        on_result=lambda result: progress.update(failed=not result.ok),
+    )
+    progress.finish()
+
+    with RecordWriter(args.output, args.format) as writer:
+        for result in results:
+            record = {"file": result.item.cad_file, "basketId": basket_id}
+            if result.ok:
+                record["lineId"] = result.response.get("id")
+            else:
+                record["error"] = format_error(result.error)
+            writer.write(record)
+    return 0 if all(result.ok for result in results) else 1
+
+
+def add_output_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--output", "-o", help="file to write the records to, stdout by default"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["jsonl", "csv"],
+        help="output format, by default csv for .csv files and jsonl otherwise",
+    )
+
+
+def create_parser() -> argparse.ArgumentParser:
+    # Options shared by all subcommands, given after the subcommand's name
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument(
+        "--access-token",
+        default=os.environ.get(ACCESS_TOKEN_VARIABLE),
+        help=f"API token of the user, defaults to ${ACCESS_TOKEN_VARIABLE}",
+    )
+    common_parser.add_argument(
+        "--base-url",
+        default=os.environ.get(BASE_URL_VARIABLE),
+        help=f"application URL, defaults to ${BASE_URL_VARIABLE}",
+    )
+    common_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"number of items processed at the same time, default {DEFAULT_JOBS}",
+    )
+    common_parser.add_argument(
+        "--no-progress", action="store_true", help="don't write progress to stderr"
+    )
+    common_parser.add_argument(
+        "--verbose", "-v", action="store_true", help="log requests and failures"
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="push-to-3yourmind",
+        description="Run bulk operations of the 3YOURMIND API in parallel",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    upload_parser = subparsers.add_parser(
+        "upload-dir",
+        parents=[common_parser],
+        help="create a basket line for every CAD file of a directory",
+    )
+    upload_parser.add_argument("directory")
+    upload_parser.add_argument("--product-id", type=int, required=True)
+    upload_parser.add_argument("--quantity", type=int, default=1)
+    upload_parser.add_argument(
+        "--basket-id", type=int, help="basket to add lines to, a new one by default"
+    )
+    upload_parser.add_argument(
+        "--unit",
+        choices=["mm", "inch"],
+        help="unit of the CAD files, defaults to the user's preferences",
+    )
+    upload_parser.add_argument(
+        "--pattern",
+        action="append",
+        help="glob pattern of CAD files, can be repeated, default: "
+        + " ".join(DEFAULT_CAD_FILE_PATTERNS),
+    )
+    upload_parser.add_argument(
+        "--recursive", "-r", action="store_true", help="include subdirectories"
+    )
+    upload_parser.add_argument(
+        "--inspect", action="store_true", help="check STL files before upload"
+    )
+    add_output_arguments(upload_parser)
+    upload_parser.set_defaults(run=run_upload_dir)
+
+    orders_parser = subparsers.add_parser(
+        "export-orders",
+        parents=[common_parser], help="export the orders of the user"
+    )
+    orders_parser.add_argument(
+        "--details",
+        action="store_true",
+        help="fetch the details, ex. lines, of every order",
+    )
+    orders_parser.add_argument("--page-size", type=int, default=100)
+    add_output_arguments(orders_parser)
+    orders_parser.set_defaults(run=run_export_orders)
+
+    users_parser = subparsers.add_parser(
+        "users",
+        parents=[common_parser], help="export the users of the organization"
+    )
+    users_parser.add_argument("--search", help="only users matching this text")
+    users_parser.add_argument("--page-size", type=int, default=100)
+    users_parser.add_argument(
+        "--with-preferences", action="store_true", help="fetch every user's preferences"
+    )
+    users_parser.add_argument(
+        "--with-addresses", action="store_true", help="fetch every user's addresses"
+    )
+    add_output_arguments(users_parser)
+    users_parser.set_defaults(run=run_users)
+
+    prices_parser = subparsers.add_parser(
+        "prices",
+        parents=[common_parser], help="calculate the price of many baskets"
+    )
+    prices_parser.add_argument("basket_ids", type=int, nargs="*", metavar="BASKET_ID")
+    prices_parser.add_argument(
+        "--all", action="store_true", help="price every basket of the user"
+    )
+    prices_parser.add_argument(
+        "--currency", help="defaults to the currency of the user's preferences"
+    )
+    prices_parser.add_argument("--shipping-method-id", type=int)
+    prices_parser.add_argument("--voucher-code")
+    add_output_arguments(prices_parser)
+    prices_parser.set_defaults(run=run_prices)
+
+    return parser
+
+
+def main(argv: t.Optional[t.Sequence[str]] = None) -> int:
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    if not args.access_token:
+        parser.error(f"--access-token or ${ACCESS_TOKEN_VARIABLE} is required")
+    if not args.base_url:
+        parser.error(f"--base-url or ${BASE_URL_VARIABLE} is required")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.command == "prices" and not (args.all or args.basket_ids):
+        parser.error("prices requires basket IDs or --all")
+    if args.verbose:
+        logging.basicConfig(format="%(asctime)s %(name)s %(message)s")
+        logger.setLevel(logging.DEBUG)
+
+    with create_client(args) as client:
+        return args.run(args, client)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
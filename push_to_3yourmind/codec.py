@@ -0,0 +1,126 @@
+"""
+JSON encoding and decoding of request and response bodies
+"""
+import dataclasses
+import datetime
+import decimal
+import json
+import os
+import re
+import typing as t
+
+
+__all__ = ["JSONCodec", "OrjsonCodec", "get_default_json_codec"]
+
+
+Default = t.Callable[[t.Any], t.Any]
+
+
+def encode_default(value: t.Any) -> t.Any:
+    """
+    Encode values JSON has no type for: dates as ISO 8601 strings, dataclasses
+    as objects. Decimals are encoded by the codecs, as numbers.
+    """
+
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class _DecimalEncoder:
+    """
+    Neither JSON library writes a decimal as a number without going through
+    float. Decimals are encoded as placeholder strings, unique to one `dumps`
+    call, which are then replaced by the digits of the decimals.
+    """
+
+    def __init__(self):
+        self.digits: t.List[bytes] = []
+        self.token = ""
+
+    def default(self, value: t.Any) -> t.Any:
+        if not isinstance(value, decimal.Decimal):
+            return encode_default(value)
+        if not value.is_finite():
+            raise TypeError(f"{value} can't be encoded as a JSON number")
+        if not self.token:
+            self.token = os.urandom(8).hex()
+        self.digits.append(format(value, "f").encode())
+        return f"{self.token}:{len(self.digits) - 1}"
+
+    def replace_placeholders(self, data: bytes) -> bytes:
+        if not self.digits:
+            return data
+        placeholder = re.compile(rb'"%s:(\d+)"' % self.token.encode())
+        return placeholder.sub(lambda match: self.digits[int(match.group(1))], data)
+
+
+class JSONCodec:
+    """
+    JSON codec of the standard library. Subclass it to plug in another
+    implementation, and pass an instance as `json_codec` to the client.
+
+    Decimals are encoded as numbers, with all their digits, dates and times as
+    ISO 8601 strings, dataclasses as objects. Dict keys that are numbers, booleans
+    or None are converted to strings.
+    """
+
+    def dumps(self, value: t.Any) -> bytes:
+        decimal_encoder = _DecimalEncoder()
+        data = self.encode(value, decimal_encoder.default)
+        return decimal_encoder.replace_placeholders(data)
+
+    def encode(self, value: t.Any, default: Default) -> bytes:
+        """
+        Encode a value, calling `default` for values of other than JSON types
+        """
+
+        return json.dumps(
+            value, default=default, ensure_ascii=False, separators=(",", ":")
+        ).encode()
+
+    def loads(self, data: bytes) -> t.Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Codec based on orjson, several times faster on large payloads. Install
+    it with `pip install "push-to-3yourmind[json]"`. Encodes the same values
+    as `JSONCodec`, the same way.
+    """
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError as exc:
+            raise ImportError(
+                "OrjsonCodec requires orjson, install it with "
+                '`pip install "push-to-3yourmind[json]"`'
+            ) from exc
+        self._orjson = orjson
+        # Dates and dataclasses go through `encode_default`, as with JSONCodec
+        self._options = (
+            orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+
+    def encode(self, value: t.Any, default: Default) -> bytes:
+        return self._orjson.dumps(value, default=default, option=self._options)
+
+    def loads(self, data: bytes) -> t.Any:
+        return self._orjson.loads(data)
+
+
+def get_default_json_codec() -> JSONCodec:
+    """
+    orjson codec if orjson is installed, stdlib codec otherwise
+    """
+
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return JSONCodec()
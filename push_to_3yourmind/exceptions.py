@@ -28,6 +28,10 @@ class MethodNotAllowed(BasePushTo3YourmindAPIException):
     pass
 
 
+class TooManyRequests(BasePushTo3YourmindAPIException):
+    pass
+
+
 class ServerError(BasePushTo3YourmindAPIException):
     pass
 
@@ -52,6 +56,22 @@ class FileAnalysisError(BasePushTo3YourmindAPIException):
     pass
 
 
+class FileAnalysisTimeout(FileAnalysisError):
+    pass
+
+
+class InvalidCADFile(FileAnalysisError):
+    pass
+
+
+class UnrecordedRequest(BasePushTo3YourmindAPIException):
+    pass
+
+
+class AddressTransferError(BasePushTo3YourmindAPIException):
+    pass
+
+
 class CADFileNotFoundError(BasePushTo3YourmindAPIException):
     pass
 
@@ -0,0 +1,248 @@
+"""
+Local SQLite journal of bulk jobs, so an interrupted import can be resumed
+"""
+from dataclasses import dataclass, field
+import json
+import os
+import sqlite3
+import threading
+import time
+import typing as t
+
+from push_to_3yourmind import types
+
+
+__all__ = ["JobJournal", "JournalEntry", "STAGES"]
+
+
+STAGES: t.Tuple[types.JobStage, ...] = (
+    "mapped",
+    "line_created",
+    "uploaded",
+    "analysed",
+    "line_configured",
+    "catalog_item_created",
+    "attachments_done",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_meta (
+    job_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (job_id, key)
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    item_key TEXT NOT NULL,
+    stage INTEGER,
+    data TEXT NOT NULL DEFAULT '{}',
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, item_key)
+);
+"""
+
+
+@dataclass
+class JournalEntry:
+    key: str
+    stage: t.Optional[types.JobStage] = None
+    data: t.Dict[str, t.Any] = field(default_factory=dict)
+    error: t.Optional[str] = None
+
+    def has_reached(self, stage: types.JobStage) -> bool:
+        return self.stage is not None and STAGES.index(self.stage) >= STAGES.index(stage)
+
+
+class JobJournal:
+    """
+    Records how far every item of a bulk job got, in a local SQLite database. On
+    restart, finished stages of an item can be skipped, and IDs created by earlier
+    runs (basket line, catalog item etc) are found in the item's data.
+
+    Stages of an item, in order: mapped, line_created, uploaded, analysed,
+    line_configured, catalog_item_created, attachments_done. An item never goes
+    back to an earlier stage, unless the job is reset with `reset_before`.
+
+    >>> with JobJournal("import.sqlite3", job_id="catalog.csv") as journal:
+    ...     entry = journal.get("row-12")
+    ...     if not entry.has_reached("line_created"):
+    ...         line = client.user_panel.create_basket_line(basket_id=basket_id)
+    ...         journal.record("row-12", "line_created", line_id=line["id"])
+
+    Every record is committed right away. A journal can be shared by many threads,
+    and holds many jobs told apart by `job_id`.
+    """
+
+    def __init__(self, path: t.Union[str, os.PathLike], *, job_id: str = "default"):
+        """
+        Args:
+            path: path of the SQLite database, created if it doesn't exist
+            job_id: name of the job, ex. the path of the imported file
+        """
+        self.job_id = job_id
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(os.fspath(path), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+
+    def get_meta(self, key: str, default: t.Any = None) -> t.Any:
+        """
+        Job-level value, ex. the ID of the basket used by the job
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM job_meta WHERE job_id = ? AND key = ?",
+                (self.job_id, key),
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else default
+
+    def set_meta(self, key: str, value: t.Any) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO job_meta (job_id, key, value) VALUES (?, ?, ?)",
+                (self.job_id, key, json.dumps(value)),
+            )
+
+    def get(self, key: str) -> JournalEntry:
+        """
+        Entry of an item, with no stage if nothing was recorded for it yet
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT stage, data, error FROM job_items WHERE job_id = ? AND item_key = ?",
+                (self.job_id, key),
+            ).fetchone()
+        if row is None:
+            return JournalEntry(key=key)
+        return self._get_entry(key, *row)
+
+    def record(self, key: str, stage: types.JobStage, **data: t.Any) -> JournalEntry:
+        """
+        Record that an item reached a stage, and clear its last error.
+
+        Args:
+            key: unique key of the item within the job, ex. a row number
+            stage: stage reached by the item
+            data: JSON-serializable values merged into the item's data,
+                ex. line_id=42
+        """
+
+        stage_index = STAGES.index(stage)
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT stage, data FROM job_items WHERE job_id = ? AND item_key = ?",
+                (self.job_id, key),
+            ).fetchone()
+            if row is not None:
+                current_index, current_data = row
+                if current_index is not None:
+                    stage_index = max(stage_index, current_index)
+                data = {**json.loads(current_data), **data}
+            self._connection.execute(
+                "INSERT OR REPLACE INTO job_items "
+                "(job_id, item_key, stage, data, error, updated_at) "
+                "VALUES (?, ?, ?, ?, NULL, ?)",
+                (self.job_id, key, stage_index, json.dumps(data), time.time()),
+            )
+        return JournalEntry(key=key, stage=STAGES[stage_index], data=data)
+
+    def reset_before(self, stage: types.JobStage) -> int:
+        """
+        Start over the items which haven't reached a stage: their stage, data and
+        error are cleared, ex. when the basket their lines were in is gone.
+        Returns the number of reset items.
+        """
+
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "UPDATE job_items SET stage = NULL, data = '{}', error = NULL, "
+                "updated_at = ? WHERE job_id = ? AND (stage IS NULL OR stage < ?)",
+                (time.time(), self.job_id, STAGES.index(stage)),
+            )
+        return cursor.rowcount
+
+    def record_error(self, key: str, error: t.Union[str, BaseException]) -> None:
+        """
+        Record why an item failed, its stage and data are kept
+        """
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO job_items (job_id, item_key, error, updated_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (job_id, item_key) DO UPDATE SET "
+                "error = excluded.error, updated_at = excluded.updated_at",
+                (self.job_id, key, str(error), time.time()),
+            )
+
+    def iter_entries(
+        self,
+        *,
+        stage: t.Optional[types.JobStage] = None,
+        failed: t.Optional[bool] = None,
+    ) -> t.Iterator[JournalEntry]:
+        """
+        Entries of the job, optionally only the ones at `stage`, or only
+        failed (or not failed) ones
+        """
+
+        query = "SELECT item_key, stage, data, error FROM job_items WHERE job_id = ?"
+        parameters: t.List[t.Any] = [self.job_id]
+        if stage is not None:
+            query += " AND stage = ?"
+            parameters.append(STAGES.index(stage))
+        if failed is not None:
+            query += " AND error IS NOT NULL" if failed else " AND error IS NULL"
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+        for row in rows:
+            yield self._get_entry(*row)
+
+    def get_stage_counts(self) -> t.Dict[str, int]:
+        """
+        Number of items per stage, plus "failed" items and items with no stage yet
+        under "pending"
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT stage, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY stage",
+                (self.job_id,),
+            ).fetchall()
+            failed_count = self._connection.execute(
+                "SELECT COUNT(*) FROM job_items WHERE job_id = ? AND error IS NOT NULL",
+                (self.job_id,),
+            ).fetchone()[0]
+        counts = {"pending": 0, **{stage: 0 for stage in STAGES}, "failed": failed_count}
+        for stage_index, count in rows:
+            counts["pending" if stage_index is None else STAGES[stage_index]] = count
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "JobJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @staticmethod
+    def _get_entry(
+        key: str,
+        stage_index: t.Optional[int],
+        data: str,
+        error: t.Optional[str],
+    ) -> JournalEntry:
+        return JournalEntry(
+            key=key,
+            stage=STAGES[stage_index] if stage_index is not None else None,
+            data=json.loads(data),
+            error=error,
+        )
@@ -1,11 +1,31 @@
 """
 Main class/entrypoint declaration
 """
+import typing as t
+
+from push_to_3yourmind import types
 from push_to_3yourmind.api.base import BaseAPI
-from push_to_3yourmind.api.common import CommonAPI
-from push_to_3yourmind.api.my_profile import MyProfileAPI
-from push_to_3yourmind.api.organization_panel import OrganizationPanelAPI
-from push_to_3yourmind.api.user_panel import UserPanelAPI
+from push_to_3yourmind.cache import ResponseCache
+from push_to_3yourmind.codec import JSONCodec
+from push_to_3yourmind.metrics import MetricsRegistry
+from push_to_3yourmind.namespaces import Namespace
+from push_to_3yourmind.polling import FileStatusPoller
+from push_to_3yourmind.preprocessing import UploadPreprocessor
+from push_to_3yourmind.rate_limit import RateLimiter
+from push_to_3yourmind.retry import RetryPolicy
+from push_to_3yourmind.session import (
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE,
+    LazySession,
+)
+from push_to_3yourmind.tracing import Tracer
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from push_to_3yourmind.api.common import CommonAPI
+    from push_to_3yourmind.api.my_profile import MyProfileAPI
+    from push_to_3yourmind.api.organization_panel import OrganizationPanelAPI
+    from push_to_3yourmind.api.user_panel import UserPanelAPI
+    from push_to_3yourmind.cassette import Cassette
 
 
 __all__ = ["PushTo3YourmindAPI"]
@@ -22,16 +42,118 @@ class PushTo3YourmindAPI(BaseAPI):
     API endpoints require proper user permissions, in case when an API can't be reached, an exception
     AccessDenied is raised.
 
+    All namespaces send their requests through one keep-alive connection pool, which
+    can be shared by many worker threads. Use the client as a context manager, or call
+    `close`, to release the pooled connections:
+
+    >>> with PushTo3YourmindAPI(access_token="QWERTY123456789", base_url="http://<domain-name>") as client:
+    ...     client.user_panel.get_baskets()
+
     Attributes:
         user_panel: order management-related API: create/update basket lines,
             upload CAD files, pricing
         common: common API: country, unit, material lists
         my_profile: API to manage user's preferences, profile, address list etc
+        organization_panel: API to manage users of the organization
+
+    Namespaces are created when they are first accessed, and the HTTP session
+    when the first request is sent.
     """
 
-    def __init__(self, access_token: str, base_url: str):
-        super().__init__(access_token, base_url)
-        self.user_panel = UserPanelAPI(access_token, base_url)
-        self.common = CommonAPI(access_token, base_url)
-        self.my_profile = MyProfileAPI(access_token, base_url)
-        self.organization_panel = OrganizationPanelAPI(access_token, base_url)
+    user_panel: "Namespace[UserPanelAPI]" = Namespace(
+        "push_to_3yourmind.api.user_panel", "UserPanelAPI"
+    )
+    common: "Namespace[CommonAPI]" = Namespace(
+        "push_to_3yourmind.api.common", "CommonAPI"
+    )
+    my_profile: "Namespace[MyProfileAPI]" = Namespace(
+        "push_to_3yourmind.api.my_profile", "MyProfileAPI"
+    )
+    organization_panel: "Namespace[OrganizationPanelAPI]" = Namespace(
+        "push_to_3yourmind.api.organization_panel", "OrganizationPanelAPI"
+    )
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str,
+        *,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        pool_block: bool = False,
+        retry_policy: t.Union[RetryPolicy, None, types.NoValueType] = types.NoValue,
+        rate_limiter: t.Optional[RateLimiter] = None,
+        response_cache: t.Optional[ResponseCache] = None,
+        file_status_poller: t.Optional[FileStatusPoller] = None,
+        upload_preprocessor: t.Optional[UploadPreprocessor] = None,
+        json_codec: t.Optional[JSONCodec] = None,
+        metrics: t.Optional[MetricsRegistry] = None,
+        tracer: t.Optional[Tracer] = None,
+        cassette: t.Optional["Cassette"] = None,
+    ):
+        """
+        Args:
+            access_token: API token of the user
+            base_url: application URL, ex. https://app.3yourmind.com
+            pool_connections: number of per-host connection pools to keep
+            pool_maxsize: maximum number of connections kept open per host,
+                should be at least the number of threads using the client
+            pool_block: wait for a free connection instead of opening a
+                throwaway one when `pool_maxsize` is reached
+            retry_policy: when and how to retry failed requests. By default, idempotent
+                requests are retried up to 3 times, pass None to disable retries.
+            rate_limiter: caps the number of requests per second sent by all
+                namespaces and threads of the client, unlimited by default
+            response_cache: keeps reference data of the `common` namespace
+                between calls, disabled by default
+            file_status_poller: waits for the analysis of uploaded CAD files,
+                closed together with the client
+            upload_preprocessor: converts or compresses CAD files before
+                upload, see `UploadPreprocessor`. Files are sent unchanged
+                by default.
+            json_codec: encodes request bodies and decodes responses. Defaults
+                to orjson if it is installed, to the standard library otherwise.
+            metrics: records latency, sizes, status codes, exceptions and
+                retries of every request, see `MetricsRegistry`. Disabled
+                by default.
+            tracer: receives nested spans of composite methods and of
+                every request, see `push_to_3yourmind.tracing`. Disabled
+                by default.
+            cassette: record every request to, or replay it from, a cassette
+                file, see `push_to_3yourmind.cassette.Cassette`
+        """
+        session = LazySession(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            cassette=cassette,
+        )
+        if retry_policy is types.NoValue:
+            retry_policy = RetryPolicy()
+        super().__init__(
+            access_token,
+            base_url,
+            session=session,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            response_cache=response_cache,
+            file_status_poller=file_status_poller,
+            upload_preprocessor=upload_preprocessor,
+            json_codec=json_codec,
+            metrics=metrics,
+            tracer=tracer,
+        )
+
+    def close(self) -> None:
+        """
+        Close all pooled connections and stop polling file analysis statuses.
+        The client should not be used afterwards.
+        """
+        self._file_status_poller.close()
+        self._session.close()
+
+    def __enter__(self) -> "PushTo3YourmindAPI":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
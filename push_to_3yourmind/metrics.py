@@ -0,0 +1,258 @@
+"""
+In-process metrics of the requests sent to the API, with a Prometheus text exporter
+"""
+import bisect
+import collections
+from dataclasses import dataclass, field
+import math
+import re
+import threading
+import typing as t
+
+
+__all__ = ["MetricsRegistry", "get_path_template"]
+
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+ID_SEGMENT = re.compile(
+    r"^(\d+|[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12})$",
+    re.IGNORECASE,
+)
+
+
+def get_path_template(sub_path: str) -> str:
+    """
+    Group sub paths by replacing IDs with a placeholder:
+    "user-panel/baskets/12/lines/" -> "user-panel/baskets/{id}/lines/"
+    """
+
+    path = sub_path.split("?", 1)[0]
+    return "/".join(
+        "{id}" if ID_SEGMENT.match(segment) else segment for segment in path.split("/")
+    )
+
+
+def get_body_length(
+    request_kwargs: t.Mapping[str, t.Any], headers: t.Mapping[str, str]
+) -> int:
+    """
+    Size of the request body if it can be told without reading it, 0 otherwise
+    """
+
+    body = request_kwargs.get("data", request_kwargs.get("content"))
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    length = getattr(body, "len", None)
+    if length is None and "Content-Length" in headers:
+        length = int(headers["Content-Length"])
+    return length or 0
+
+
+class Histogram:
+    def __init__(self, buckets: t.Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_cumulative_counts(self) -> t.List[t.Tuple[float, int]]:
+        cumulative_counts = []
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            cumulative_counts.append((bound, total))
+        return cumulative_counts
+
+
+@dataclass
+class EndpointMetrics:
+    latency: Histogram
+    requests: int = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    retries: int = 0
+    statuses: t.Counter[int] = field(default_factory=collections.Counter)
+    exceptions: t.Counter[str] = field(default_factory=collections.Counter)
+
+
+class MetricsRegistry:
+    """
+    Collects metrics of every request sent by a client, grouped by HTTP method and
+    endpoint path template, ex. `user-panel/baskets/{id}/lines/`:
+
+    - latency histogram, in seconds, retries included
+    - request and response bytes
+    - number of responses per status code
+    - number of exceptions per class, both network errors and exceptions
+      raised for error responses
+    - number of retries
+
+    >>> metrics = MetricsRegistry()
+    >>> client = PushTo3YourmindAPI(
+    ...     access_token="QWERTY123456789",
+    ...     base_url="http://<domain-name>",
+    ...     metrics=metrics,
+    ... )
+    >>> client.user_panel.get_baskets()
+    >>> print(metrics.to_prometheus())
+
+    Thread-safe, one registry can be shared by several clients.
+    """
+
+    def __init__(self, *, buckets: t.Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets: upper bounds of the latency histogram buckets, in seconds
+        """
+        self._buckets = tuple(sorted(buckets))
+        self._endpoints: t.Dict[t.Tuple[str, str], EndpointMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _get_endpoint(self, method: str, sub_path: str) -> EndpointMetrics:
+        key = (method, get_path_template(sub_path))
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = EndpointMetrics(Histogram(self._buckets))
+        return endpoint
+
+    def observe_request(
+        self,
+        method: str,
+        sub_path: str,
+        *,
+        duration: float,
+        status_code: t.Optional[int] = None,
+        exception: t.Optional[BaseException] = None,
+        request_bytes: int = 0,
+        response_bytes: int = 0,
+        retries: int = 0,
+    ) -> None:
+        """
+        Record a call, with the final response or the exception it ended with
+        """
+
+        with self._lock:
+            endpoint = self._get_endpoint(method, sub_path)
+            endpoint.requests += 1
+            endpoint.latency.observe(duration)
+            endpoint.request_bytes += request_bytes
+            endpoint.response_bytes += response_bytes
+            endpoint.retries += retries
+            if status_code is not None:
+                endpoint.statuses[status_code] += 1
+            if exception is not None:
+                endpoint.exceptions[type(exception).__name__] += 1
+
+    def observe_exception(
+        self, method: str, sub_path: str, exception: BaseException
+    ) -> None:
+        """
+        Record an exception raised after the response was received, ex. for an
+        error status code
+        """
+
+        with self._lock:
+            endpoint = self._get_endpoint(method, sub_path)
+            endpoint.exceptions[type(exception).__name__] += 1
+
+    def get_snapshot(self) -> t.Dict[t.Tuple[str, str], t.Dict[str, t.Any]]:
+        """
+        Current values, keyed by (method, path template)
+        """
+
+        with self._lock:
+            return {
+                key: {
+                    "requests": endpoint.requests,
+                    "latency_sum": endpoint.latency.sum,
+                    "latency_buckets": endpoint.latency.get_cumulative_counts(),
+                    "request_bytes": endpoint.request_bytes,
+                    "response_bytes": endpoint.response_bytes,
+                    "retries": endpoint.retries,
+                    "statuses": dict(endpoint.statuses),
+                    "exceptions": dict(endpoint.exceptions),
+                }
+                for key, endpoint in self._endpoints.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+
+    def to_prometheus(self, prefix: str = "push_to_3yourmind") -> str:
+        """
+        All metrics in the Prometheus text exposition format
+        """
+
+        snapshot = self.get_snapshot()
+        lines = []
+
+        def add_header(name: str, metric_type: str, description: str) -> str:
+            metric_name = f"{prefix}_{name}"
+            lines.append(f"# HELP {metric_name} {description}")
+            lines.append(f"# TYPE {metric_name} {metric_type}")
+            return metric_name
+
+        name = add_header(
+            "request_duration_seconds",
+            "histogram",
+            "Duration of API calls, retries included",
+        )
+        for (method, endpoint), values in snapshot.items():
+            labels = _format_labels(method=method, endpoint=endpoint)
+            for bound, count in values["latency_buckets"]:
+                bucket_labels = _format_labels(
+                    method=method, endpoint=endpoint, le=_format_bound(bound)
+                )
+                lines.append(f"{name}_bucket{bucket_labels} {count}")
+            lines.append(f"{name}_sum{labels} {values['latency_sum']}")
+            lines.append(f"{name}_count{labels} {values['requests']}")
+
+        for key, description in (
+            ("request_bytes", "Bytes sent in request bodies"),
+            ("response_bytes", "Bytes received in response bodies"),
+            ("retries", "Retried requests"),
+        ):
+            name = add_header(f"{key}_total", "counter", description)
+            for (method, endpoint), values in snapshot.items():
+                labels = _format_labels(method=method, endpoint=endpoint)
+                lines.append(f"{name}{labels} {values[key]}")
+
+        name = add_header("responses_total", "counter", "Responses by status code")
+        for (method, endpoint), values in snapshot.items():
+            for status_code, count in sorted(values["statuses"].items()):
+                labels = _format_labels(
+                    method=method, endpoint=endpoint, status=str(status_code)
+                )
+                lines.append(f"{name}{labels} {count}")
+
+        name = add_header("exceptions_total", "counter", "Exceptions by class")
+        for (method, endpoint), values in snapshot.items():
+            for exception, count in sorted(values["exceptions"].items()):
+                labels = _format_labels(
+                    method=method, endpoint=endpoint, exception=exception
+                )
+                lines.append(f"{name}{labels} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+def _format_labels(**labels: str) -> str:
+    formatted = ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+        )
+        for name, value in labels.items()
+    )
+    return f"{{{formatted}}}"
@@ -0,0 +1,304 @@
+"""
+Compact response models, an opt-in alternative to the dicts returned by the API
+methods for holding many records in memory
+"""
+import typing as t
+
+from push_to_3yourmind import types
+from push_to_3yourmind.codec import get_default_json_codec
+
+
+__all__ = [
+    "Address",
+    "Basket",
+    "BasketLine",
+    "Model",
+    "Order",
+    "Quote",
+    "User",
+    "from_list",
+]
+
+
+ModelType = t.TypeVar("ModelType", bound="Model")
+
+_codec = get_default_json_codec()
+
+
+def _to_camel_case(name: str) -> str:
+    first, *rest = name.split("_")
+    return first + "".join(word.capitalize() for word in rest)
+
+
+class _Encoded(bytes):
+    """
+    Nested value kept as encoded JSON until it is accessed
+    """
+
+    __slots__ = ()
+
+
+class LazyField:
+    """
+    Attribute of a model holding a nested object, or a list of them. The value is
+    stored encoded, and decoded (into `model` instances, if given) on first access.
+    """
+
+    def __init__(self, model: t.Optional[t.Type["Model"]] = None):
+        self.model = model
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+        self.slot_name = f"_{name}"
+
+    def __get__(self, instance: t.Optional["Model"], owner: type) -> t.Any:
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot_name)
+        if isinstance(value, _Encoded):
+            value = self.decode(_codec.loads(bytes(value)))
+            setattr(instance, self.slot_name, value)
+        return value
+
+    def __set__(self, instance: "Model", value: t.Any) -> None:
+        setattr(instance, self.slot_name, value)
+
+    def encode(self, value: t.Any) -> t.Any:
+        if isinstance(value, (dict, list)):
+            return _Encoded(_codec.dumps(value))
+        return value
+
+    def decode(self, value: t.Any) -> t.Any:
+        if self.model is None:
+            return value
+        if isinstance(value, list):
+            return [self.model.from_dict(item) for item in value]
+        if isinstance(value, dict):
+            return self.model.from_dict(value)
+        return value
+
+
+class Model:
+    """
+    Base class of response models. Subclasses list their attributes in `__slots__`,
+    so instances have no `__dict__`. Attributes are the snake_case versions of the
+    API's camelCase keys, attributes of missing keys are None. Keys a model doesn't
+    know are kept in `extra`.
+
+    Nested objects are declared as `LazyField` class attributes, with a slot of the
+    same name prefixed by an underscore. They are stored as encoded JSON, which is
+    several times smaller than nested dicts, and decoded when first accessed.
+
+    `raw` rebuilds the dict the model was created from.
+    """
+
+    __slots__ = ("extra",)
+
+    _keys: t.ClassVar[t.Dict[str, str]] = {}
+    _lazy_fields: t.ClassVar[t.Dict[str, LazyField]] = {}
+    _slot_names: t.ClassVar[t.Dict[str, str]] = {}
+
+    def __init_subclass__(cls, **kwargs: t.Any) -> None:
+        super().__init_subclass__(**kwargs)
+        lazy_fields = {
+            name: value for name, value in vars(cls).items() if isinstance(value, LazyField)
+        }
+        cls._lazy_fields = {**cls._lazy_fields, **lazy_fields}
+        attributes = [name for name in cls.__slots__ if not name.startswith("_")]
+        cls._keys = {
+            **cls._keys,
+            **{_to_camel_case(name): name for name in attributes + list(lazy_fields)},
+        }
+        cls._slot_names = {
+            name: cls._lazy_fields[name].slot_name if name in cls._lazy_fields else name
+            for name in cls._keys.values()
+        }
+
+    @classmethod
+    def from_dict(cls: t.Type[ModelType], data: types.ResponseDict) -> ModelType:
+        instance = cls.__new__(cls)
+        extra = None
+        for key, value in data.items():
+            name = cls._keys.get(key)
+            if name is None:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+                continue
+            lazy_field = cls._lazy_fields.get(name)
+            if lazy_field is not None:
+                value = lazy_field.encode(value)
+            object.__setattr__(instance, name, value)
+        instance.extra = extra
+        return instance
+
+    def __getattr__(self, name: str) -> t.Any:
+        """
+        Slots of keys missing from the response are left unset, and read as None
+        """
+
+        if name in self._slot_names or name in self._slot_names.values():
+            return None
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    @property
+    def raw(self) -> types.ResponseDict:
+        raw = {}
+        for key, name in self._keys.items():
+            try:
+                value = object.__getattribute__(self, self._slot_names[name])
+            except AttributeError:
+                continue
+            if name in self._lazy_fields:
+                value = (
+                    _codec.loads(bytes(value))
+                    if isinstance(value, _Encoded)
+                    else _get_raw(value)
+                )
+            raw[key] = value
+        raw.update(self.extra or {})
+        return raw
+
+    def __eq__(self, other: t.Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.raw == other.raw
+
+    def __repr__(self) -> str:
+        attributes = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in self._keys.values()
+            if name not in self._lazy_fields
+        )
+        return f"{type(self).__name__}({attributes})"
+
+
+def _get_raw(value: t.Any) -> t.Any:
+    if isinstance(value, Model):
+        return value.raw
+    if isinstance(value, list):
+        return [_get_raw(item) for item in value]
+    return value
+
+
+def from_list(
+    model: t.Type[ModelType], records: t.Iterable[types.ResponseDict]
+) -> t.List[ModelType]:
+    """
+    Convert a list of records, ex. the results of a page
+    """
+
+    return [model.from_dict(record) for record in records]
+
+
+class Address(Model):
+    __slots__ = (
+        "id",
+        "title",
+        "first_name",
+        "last_name",
+        "company_name",
+        "department",
+        "vat_id",
+        "line1",
+        "line2",
+        "zip_code",
+        "city",
+        "state",
+        "country",
+        "phone_number",
+    )
+
+
+class User(Model):
+    __slots__ = (
+        "id",
+        "email",
+        "first_name",
+        "last_name",
+        "full_name",
+        "is_active",
+        "date_joined",
+        "last_login",
+        "_user_profile",
+    )
+
+    user_profile = LazyField()
+
+
+class BasketLine(Model):
+    __slots__ = (
+        "id",
+        "name",
+        "quantity",
+        "unit",
+        "file_status",
+        "preferred_due_date",
+        "_product",
+        "_post_processings",
+        "_price",
+        "_stl_file",
+    )
+
+    product = LazyField()
+    post_processings = LazyField()
+    price = LazyField()
+    stl_file = LazyField()
+
+
+class Basket(Model):
+    __slots__ = (
+        "id",
+        "title",
+        "created",
+        "updated",
+        "number_of_lines",
+        "_lines",
+        "_price",
+    )
+
+    lines = LazyField(BasketLine)
+    price = LazyField()
+
+
+class Quote(Model):
+    __slots__ = (
+        "id",
+        "number",
+        "status",
+        "currency",
+        "created",
+        "valid_until",
+        "_partner",
+        "_lines",
+        "_total_price",
+        "_shipping_address",
+        "_billing_address",
+    )
+
+    partner = LazyField()
+    lines = LazyField(BasketLine)
+    total_price = LazyField()
+    shipping_address = LazyField(Address)
+    billing_address = LazyField(Address)
+
+
+class Order(Model):
+    __slots__ = (
+        "id",
+        "number",
+        "status",
+        "currency",
+        "created",
+        "_partner",
+        "_lines",
+        "_total_price",
+        "_shipping_address",
+        "_billing_address",
+    )
+
+    partner = LazyField()
+    lines = LazyField(BasketLine)
+    total_price = LazyField()
+    shipping_address = LazyField(Address)
+    billing_address = LazyField(Address)
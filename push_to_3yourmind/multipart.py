@@ -0,0 +1,231 @@
+"""
+Streaming multipart/form-data encoder used to upload files without loading
+them into memory
+"""
+import io
+import os
+import typing as t
+
+
+__all__ = ["MultipartEncoder"]
+
+
+CHUNK_SIZE = 64 * 1024
+
+FilePart = t.Tuple[str, t.Union[t.IO[bytes], t.AsyncIterable[bytes]]]
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', "%22").replace("\r\n", "%0D%0A")
+
+
+def get_stream_length(stream: t.IO[bytes]) -> t.Optional[int]:
+    """
+    Number of bytes left in the stream, or None if it can't be told without
+    reading it. Streams may tell their length with a `len` attribute.
+    """
+
+    if hasattr(stream, "len"):
+        return stream.len
+    try:
+        position = stream.tell()
+    except (AttributeError, OSError):
+        return None
+    try:
+        return os.fstat(stream.fileno()).st_size - position
+    except (AttributeError, OSError):
+        pass
+    try:
+        end = stream.seek(0, io.SEEK_END)
+        stream.seek(position)
+    except (AttributeError, OSError):
+        return None
+    return end - position
+
+
+class MultipartEncoder:
+    """
+    File-like multipart/form-data body. Files are read in chunks of `CHUNK_SIZE`
+    bytes while the body is being sent, so memory use doesn't depend on file size.
+
+    Pass it as `data` together with its `content_type`:
+
+    >>> encoder = MultipartEncoder(fields={"unit": "mm"}, files={"file": ("cube.stl", f)})
+    >>> session.post(url, data=encoder, headers={"Content-Type": encoder.content_type})
+
+    `len` is the size of the body, or None when a file has unknown length, in which
+    case the body is sent with chunked transfer encoding. The encoder can be rewound
+    with `seek(0)` if all its files are seekable.
+    """
+
+    def __init__(
+        self,
+        *,
+        fields: t.Optional[t.Mapping[str, t.Any]] = None,
+        files: t.Optional[t.Mapping[str, FilePart]] = None,
+    ):
+        """
+        Args:
+            fields: form fields, values are converted to strings
+            files: file fields, mapping field name to (file name, binary stream).
+                Async iterables of bytes are accepted too, to be sent with
+                `async_stream`.
+        """
+        self.boundary = os.urandom(16).hex()
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+
+        self._parts: t.List[t.Union[bytes, t.IO[bytes]]] = []
+        for name, value in (fields or {}).items():
+            self._parts.append(
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+                f"{value}\r\n".encode()
+            )
+        self._stream_positions = []
+        for name, (filename, stream) in (files or {}).items():
+            self._parts.append(
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote(name)}"; '
+                f'filename="{_quote(filename)}"\r\n'
+                f"Content-Type: application/octet-stream\r\n\r\n".encode()
+            )
+            self._parts.append(stream)
+            self._parts.append(b"\r\n")
+            try:
+                self._stream_positions.append((stream, stream.tell()))
+            except (AttributeError, OSError):
+                self._stream_positions.append((stream, None))
+        self._is_async_iterated = False
+        self._parts.append(f"--{self.boundary}--\r\n".encode())
+
+        self.len = self._get_length()
+        self._chunks = self._iter_chunks()
+        self._buffer = b""
+        self._position = 0
+
+    def _get_length(self) -> t.Optional[int]:
+        length = 0
+        for part in self._parts:
+            if isinstance(part, bytes):
+                length += len(part)
+                continue
+            stream_length = get_stream_length(part)
+            if stream_length is None:
+                return None
+            length += stream_length
+        return length
+
+    def _iter_chunks(self) -> t.Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+            while True:
+                chunk = part.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, b"")
+            if not chunk:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self._position += len(data)
+        return data
+
+    def __iter__(self) -> t.Iterator[bytes]:
+        while True:
+            chunk = self.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    async def _aiter_chunks(self) -> t.AsyncIterator[bytes]:
+        """
+        Files are read in a worker thread, so the event loop is not blocked by disk I/O
+        """
+
+        # Imported here, so the sync client doesn't load asyncio
+        import asyncio
+
+        if self._is_async_iterated:
+            self._rewind_streams()
+        self._is_async_iterated = True
+
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+            elif hasattr(part, "__aiter__"):
+                async for chunk in part:
+                    yield chunk
+            else:
+                while True:
+                    chunk = await asyncio.to_thread(part.read, CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """
+        Only rewinding to the start, or seeking to the current position, is supported
+        """
+
+        if whence == io.SEEK_SET and offset == self._position:
+            return self._position
+        if whence != io.SEEK_SET or offset != 0:
+            raise io.UnsupportedOperation("MultipartEncoder can only be rewound")
+        self._rewind_streams()
+        self._chunks = self._iter_chunks()
+        self._buffer = b""
+        self._position = 0
+        return 0
+
+    def seekable(self) -> bool:
+        """
+        Whether the body can be rewound, ex. to retry the request
+        """
+
+        return all(
+            position is not None
+            and getattr(stream, "seekable", lambda: True)()
+            for stream, position in self._stream_positions
+        )
+
+    def _rewind_streams(self) -> None:
+        for stream, position in self._stream_positions:
+            if position is None:
+                raise io.UnsupportedOperation("file stream can't be rewound")
+            stream.seek(position)
+
+    def async_stream(self) -> "AsyncMultipartStream":
+        """
+        Body for `httpx.AsyncClient`, which needs an async iterable
+        """
+
+        return AsyncMultipartStream(self)
+
+
+class AsyncMultipartStream:
+    """
+    Async-only view of a `MultipartEncoder`. Every iteration starts from
+    the beginning of the body, so the request can be retried.
+    """
+
+    def __init__(self, encoder: MultipartEncoder):
+        self._encoder = encoder
+        self.len = encoder.len
+
+    def seekable(self) -> bool:
+        return self._encoder.seekable()
+
+    def __aiter__(self) -> t.AsyncIterator[bytes]:
+        return self._encoder._aiter_chunks()
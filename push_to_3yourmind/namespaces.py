@@ -0,0 +1,52 @@
+"""
+Lazily created API namespaces of the clients
+"""
+import importlib
+import typing as t
+
+
+__all__ = ["Namespace"]
+
+
+NamespaceType = t.TypeVar("NamespaceType")
+
+
+class Namespace(t.Generic[NamespaceType]):
+    """
+    Client attribute holding an API namespace. The namespace, and the module
+    defining it, are only loaded when the attribute is first accessed, so a job
+    using one namespace doesn't pay for the others.
+
+    The namespace gets the access token, base URL and shared options of the client,
+    and is cached in the client's `__dict__`, which takes precedence over this
+    descriptor afterwards.
+    """
+
+    def __init__(self, module_name: str, class_name: str):
+        self.module_name = module_name
+        self.class_name = class_name
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    @t.overload
+    def __get__(self, instance: None, owner: type) -> "Namespace[NamespaceType]":
+        ...
+
+    @t.overload
+    def __get__(self, instance: object, owner: type) -> NamespaceType:
+        ...
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        namespace_class = getattr(
+            importlib.import_module(self.module_name), self.class_name
+        )
+        namespace = namespace_class(
+            instance._access_token,
+            instance._base_url,
+            **instance._get_shared_options(),
+        )
+        # Threads racing on the first access all get the namespace stored first
+        return instance.__dict__.setdefault(self.name, namespace)
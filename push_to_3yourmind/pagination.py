@@ -0,0 +1,206 @@
+"""
+Helpers to walk through paginated API responses
+"""
+import collections
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import typing as t
+
+from push_to_3yourmind import types
+
+
+__all__ = ["iter_records", "aiter_records", "fetch_all_records", "afetch_all_records"]
+
+
+PageGetter = t.Callable[[int], types.ResponseDict]
+AsyncPageGetter = t.Callable[[int], t.Awaitable[types.ResponseDict]]
+RecordConverter = t.Optional[t.Callable[[types.ResponseDict], t.Any]]
+
+
+def has_next_page(page: types.ResponseDict) -> bool:
+    return page.get("currentPage", 0) < page.get("totalPages", 0)
+
+
+def get_records(page: types.ResponseDict, convert: RecordConverter) -> t.List[t.Any]:
+    if convert is None:
+        return page["results"]
+    return [convert(record) for record in page["results"]]
+
+
+def iter_records(
+    get_page: PageGetter,
+    *,
+    prefetch: bool = True,
+    convert: RecordConverter = None,
+) -> t.Iterator[types.ResponseDict]:
+    """
+    Lazily yield records of all pages, starting with page 1. Only one page is held
+    in memory at a time, plus the next one when `prefetch` is enabled: page N+1 is
+    requested in a background thread while the caller processes page N.
+
+    Args:
+        get_page: function returning the page with the given number
+        prefetch: request the next page in the background
+        convert: function applied to every record, ex. `User.from_dict`
+    """
+
+    executor = (
+        ThreadPoolExecutor(max_workers=1, thread_name_prefix="push_to_3yourmind-prefetch")
+        if prefetch
+        else None
+    )
+    try:
+        page_number = 1
+        page = get_page(page_number)
+        while True:
+            next_page = None
+            if executor is not None and has_next_page(page):
+                next_page = executor.submit(get_page, page_number + 1)
+
+            yield from get_records(page, convert)
+
+            if not has_next_page(page):
+                return
+            page_number += 1
+            page = next_page.result() if next_page is not None else get_page(page_number)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def aiter_records(
+    get_page: AsyncPageGetter,
+    *,
+    prefetch: bool = True,
+    convert: RecordConverter = None,
+) -> t.AsyncIterator[types.ResponseDict]:
+    """
+    Asyncio version of `iter_records`, the next page is requested in a task
+    """
+
+    import asyncio
+
+    next_page = None
+    try:
+        page_number = 1
+        page = await get_page(page_number)
+        while True:
+            if prefetch and has_next_page(page):
+                next_page = asyncio.ensure_future(get_page(page_number + 1))
+
+            for record in get_records(page, convert):
+                yield record
+
+            if not has_next_page(page):
+                return
+            page_number += 1
+            if next_page is not None:
+                page, next_page = await next_page, None
+            else:
+                page = await get_page(page_number)
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+
+
+def fetch_all_records(
+    get_page: PageGetter,
+    *,
+    max_workers: int = 8,
+    ordered: bool = True,
+    convert: RecordConverter = None,
+) -> t.Iterator[types.ResponseDict]:
+    """
+    Yield records of all pages. The first page is requested alone to learn the total
+    number of pages, the remaining ones are requested concurrently by up to
+    `max_workers` threads. At most `2 * max_workers` pages are requested ahead of
+    the caller.
+
+    Args:
+        get_page: function returning the page with the given number
+        max_workers: number of pages requested at the same time
+        ordered: yield records in page order. Otherwise, pages are yielded as soon
+            as they arrive.
+        convert: function applied to every record, ex. `User.from_dict`
+    """
+
+    first_page = get_page(1)
+    total_pages = first_page.get("totalPages", 0)
+    pending_page_numbers = iter(range(2, total_pages + 1))
+    max_pending = 2 * max_workers
+
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="push_to_3yourmind-fetch-all"
+    )
+    pending = collections.deque()
+
+    def submit_pages() -> None:
+        while len(pending) < max_pending:
+            page_number = next(pending_page_numbers, None)
+            if page_number is None:
+                return
+            pending.append(executor.submit(get_page, page_number))
+
+    try:
+        submit_pages()
+        yield from get_records(first_page, convert)
+
+        while pending:
+            if ordered:
+                done_future = pending.popleft()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done_future = done.pop()
+                pending.remove(done_future)
+            page = done_future.result()
+            submit_pages()
+            yield from get_records(page, convert)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def afetch_all_records(
+    get_page: AsyncPageGetter,
+    *,
+    max_workers: int = 8,
+    ordered: bool = True,
+    convert: RecordConverter = None,
+) -> t.AsyncIterator[types.ResponseDict]:
+    """
+    Asyncio version of `fetch_all_records`, pages are requested by up to
+    `max_workers` concurrent tasks
+    """
+
+    import asyncio
+
+    first_page = await get_page(1)
+    total_pages = first_page.get("totalPages", 0)
+    pending_page_numbers = iter(range(2, total_pages + 1))
+
+    pending = collections.deque()
+
+    def submit_pages() -> None:
+        while len(pending) < max_workers:
+            page_number = next(pending_page_numbers, None)
+            if page_number is None:
+                return
+            pending.append(asyncio.ensure_future(get_page(page_number)))
+
+    try:
+        submit_pages()
+        for record in get_records(first_page, convert):
+            yield record
+
+        while pending:
+            if ordered:
+                done_task = pending.popleft()
+            else:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                done_task = done.pop()
+                pending.remove(done_task)
+            page = await done_task
+            submit_pages()
+            for record in get_records(page, convert):
+                yield record
+    finally:
+        for task in pending:
+            task.cancel()
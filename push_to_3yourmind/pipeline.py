@@ -0,0 +1,302 @@
+"""
+Pipeline of stages for bulk jobs. Every stage has its own pool of worker
+threads and a bounded input queue, so a slow stage holds back the stages
+feeding it instead of letting items pile up in memory.
+"""
+from dataclasses import dataclass, field
+import queue
+import threading
+import time
+import typing as t
+
+from push_to_3yourmind import exceptions
+from push_to_3yourmind.logger import logger
+from push_to_3yourmind.tracing import bind_context
+
+
+__all__ = ["Pipeline", "PipelineError", "PipelineReport", "Stage", "StageReport"]
+
+
+# Put in the queue of a stage once per worker, when no more items will come
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    Attributes:
+        name: name of the stage in reports and errors
+        function: processes an item, and returns the item passed to the next
+            stage. An exception fails the item, which leaves the pipeline.
+        workers: number of threads running `function`
+        queue_size: number of items waiting for a worker, at most. Defaults to
+            twice the number of workers.
+        waiting: the stage mostly waits for something else, ex. a poller, so
+            its busy time doesn't say how much work it does. It is never
+            reported as the bottleneck.
+    """
+
+    name: str
+    function: t.Callable[[t.Any], t.Any]
+    workers: int = 4
+    queue_size: t.Optional[int] = None
+    waiting: bool = False
+
+
+@dataclass
+class StageReport:
+    """
+    Attributes:
+        processed: number of items the stage was done with, failed or not
+        failed: number of items failing in the stage
+        busy_seconds: time spent in the stage's function, summed over workers,
+            including time spent blocked, ex. waiting for a response
+        max_queue_depth: largest number of items seen waiting for a worker
+        utilization: share of the run the workers were busy. The stage with
+            the highest utilization limits the throughput of the pipeline.
+    """
+
+    name: str
+    workers: int
+    waiting: bool = False
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+    utilization: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.busy_seconds / self.processed if self.processed else 0.0
+
+
+@dataclass
+class PipelineError:
+    item: t.Any
+    stage: str
+    error: Exception
+
+
+@dataclass
+class PipelineReport:
+    """
+    Attributes:
+        items: number of items fed to the pipeline
+        completed: number of items that went through all stages
+        duration: seconds from the first item fed to the last one done
+        errors: items that failed, with their stage and exception
+    """
+
+    items: int = 0
+    completed: int = 0
+    duration: float = 0.0
+    stages: t.List[StageReport] = field(default_factory=list)
+    errors: t.List[PipelineError] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    @property
+    def items_per_minute(self) -> float:
+        return self.completed / self.duration * 60 if self.duration else 0.0
+
+    @property
+    def bottleneck(self) -> t.Optional[str]:
+        """
+        Name of the stage whose workers were busy the longest share of the run,
+        leaving out waiting stages
+        """
+
+        working_stages = [stage for stage in self.stages if not stage.waiting]
+        busiest = max(working_stages, key=lambda stage: stage.utilization, default=None)
+        if busiest is None or not busiest.utilization:
+            return None
+        return busiest.name
+
+    def format(self) -> str:
+        lines = [
+            f"{self.completed} of {self.items} items done, {self.failed} failed "
+            f"in {self.duration:.1f}s ({self.items_per_minute:.0f} items/min)",
+            f"{'stage':<16} {'workers':>7} {'done':>7} {'failed':>7} "
+            f"{'mean':>9} {'busy':>6} {'queue':>6}",
+        ]
+        for stage in self.stages:
+            lines.append(
+                f"{stage.name:<16} {stage.workers:>7} {stage.processed:>7} "
+                f"{stage.failed:>7} {stage.mean_seconds * 1000:>7.0f}ms "
+                f"{stage.utilization:>6.0%} {stage.max_queue_depth:>6}"
+            )
+        if self.bottleneck is not None:
+            lines.append(f"bottleneck: {self.bottleneck}")
+        return "\n".join(lines)
+
+
+class Pipeline:
+    """
+    Runs items through stages, each in its own thread pool:
+
+    >>> pipeline = Pipeline(
+    ...     [
+    ...         Stage("line", create_line, workers=4),
+    ...         Stage("upload", upload_file, workers=8),
+    ...     ]
+    ... )
+    >>> report = pipeline.run(rows)
+    >>> print(report.format())
+
+    Items are read from the iterable only when the first stage has room for
+    them. A failing item is reported and dropped, the others go on. Items
+    finish in no particular order.
+    """
+
+    def __init__(
+        self,
+        stages: t.Sequence[Stage],
+        *,
+        on_done: t.Optional[t.Callable[[t.Any], None]] = None,
+        on_error: t.Optional[t.Callable[[PipelineError], None]] = None,
+    ):
+        """
+        Args:
+            stages: stages every item goes through, in order
+            on_done: called with the result of the last stage of every item
+            on_error: called with every failed item
+        Callbacks are called from worker threads.
+        """
+        if not stages:
+            raise exceptions.BadArgument("A pipeline needs at least one stage")
+        self.stages = list(stages)
+        self.on_done = on_done
+        self.on_error = on_error
+
+    def run(self, items: t.Iterable[t.Any]) -> PipelineReport:
+        """
+        Feed items to the pipeline from the calling thread, and return once all
+        of them went through or failed. If the calling thread is interrupted,
+        items in flight are dropped, and the workers stop after their current item.
+        """
+
+        run = _PipelineRun(self)
+        return run.run(items)
+
+
+class _PipelineRun:
+    def __init__(self, pipeline: Pipeline):
+        self.pipeline = pipeline
+        self.stages = pipeline.stages
+        self.queues: t.List[queue.Queue] = [
+            queue.Queue(maxsize=stage.queue_size or stage.workers * 2)
+            for stage in self.stages
+        ]
+        self.report = PipelineReport(
+            stages=[
+                StageReport(stage.name, stage.workers, waiting=stage.waiting)
+                for stage in self.stages
+            ]
+        )
+        self.running_workers = [stage.workers for stage in self.stages]
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+
+    def run(self, items: t.Iterable[t.Any]) -> PipelineReport:
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(
+                target=bind_context(self.work),
+                args=(index,),
+                name=f"push_to_3yourmind-{stage.name}-{number}",
+                daemon=True,
+            )
+            for index, stage in enumerate(self.stages)
+            for number in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for item in items:
+                self.queues[0].put(item)
+                self.report.items += 1
+        except BaseException:
+            self.stopped.set()
+            raise
+        finally:
+            for _ in range(self.stages[0].workers):
+                self.queues[0].put(_DONE)
+            if not self.stopped.is_set():
+                for thread in threads:
+                    thread.join()
+
+        self.report.duration = time.perf_counter() - started
+        for stage_report in self.report.stages:
+            capacity = stage_report.workers * self.report.duration
+            stage_report.utilization = (
+                stage_report.busy_seconds / capacity if capacity else 0.0
+            )
+        return self.report
+
+    def work(self, index: int) -> None:
+        stage = self.stages[index]
+        stage_report = self.report.stages[index]
+        input_queue = self.queues[index]
+        output_queue = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        try:
+            while True:
+                depth = input_queue.qsize()
+                item = input_queue.get()
+                if item is _DONE:
+                    return
+                if self.stopped.is_set():
+                    continue
+
+                started = time.perf_counter()
+                try:
+                    result = stage.function(item)
+                except Exception as exc:
+                    self.record(stage_report, started, depth, failed=True)
+                    self.fail(PipelineError(item=item, stage=stage.name, error=exc))
+                    continue
+                self.record(stage_report, started, depth, failed=False)
+
+                if output_queue is not None:
+                    output_queue.put(result)
+                else:
+                    self.finish(result)
+        finally:
+            with self.lock:
+                self.running_workers[index] -= 1
+                is_last_worker = self.running_workers[index] == 0
+            if is_last_worker and output_queue is not None:
+                for _ in range(self.stages[index + 1].workers):
+                    output_queue.put(_DONE)
+
+    def record(
+        self, stage_report: StageReport, started: float, depth: int, *, failed: bool
+    ) -> None:
+        duration = time.perf_counter() - started
+        with self.lock:
+            stage_report.processed += 1
+            stage_report.busy_seconds += duration
+            stage_report.max_queue_depth = max(stage_report.max_queue_depth, depth)
+            if failed:
+                stage_report.failed += 1
+
+    def fail(self, error: PipelineError) -> None:
+        logger.debug(f"Item failed in stage {error.stage}: {error.error!r}")
+        with self.lock:
+            self.report.errors.append(error)
+        if self.pipeline.on_error is not None:
+            self._call(self.pipeline.on_error, error)
+
+    def finish(self, result: t.Any) -> None:
+        with self.lock:
+            self.report.completed += 1
+        if self.pipeline.on_done is not None:
+            self._call(self.pipeline.on_done, result)
+
+    @staticmethod
+    def _call(callback: t.Callable[[t.Any], None], argument: t.Any) -> None:
+        try:
+            callback(argument)
+        except Exception:
+            logger.exception("Pipeline callback failed")
@@ -0,0 +1,224 @@
+"""
+Polling of the CAD file analysis status after an upload
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+import heapq
+import itertools
+import threading
+import time
+import typing as t
+
+from push_to_3yourmind import exceptions
+from push_to_3yourmind.logger import logger
+
+
+__all__ = ["FileStatusPoller"]
+
+
+MEGABYTE = 1024 * 1024
+
+StatusGetter = t.Callable[[], t.Optional[str]]
+
+
+@dataclass(order=True)
+class PendingAnalysis:
+    due_at: float
+    sequence: int
+    get_status: StatusGetter = field(compare=False)
+    future: Future = field(compare=False)
+    deadline: float = field(compare=False)
+    file_size: t.Optional[int] = field(compare=False, default=None)
+    attempt: int = field(compare=False, default=0)
+
+
+class FileStatusPoller:
+    """
+    Waits for the analysis of many uploaded CAD files from one scheduler thread,
+    so no thread is blocked per upload.
+
+    Big files take longer to analyse, so they are checked less often: the interval
+    between two checks of a file starts at `min_interval` plus `seconds_per_megabyte`
+    per megabyte of the file, and grows by `backoff_factor` after every check, up to
+    `max_interval`. Instead of a fixed number of attempts, every file has a deadline
+    of `timeout` seconds plus `timeout_per_megabyte` per megabyte.
+
+    >>> poller = FileStatusPoller(max_interval=5, timeout=120)
+    >>> client = PushTo3YourmindAPI(
+    ...     access_token="QWERTY123456789",
+    ...     base_url="http://<domain-name>",
+    ...     file_status_poller=poller,
+    ... )
+    >>> future = client.user_panel.wait_for_file_analysis(basket_id=4, line_id=8)
+    >>> future.result()
+
+    Checks that are due are sent by a pool of `max_workers` threads, which also
+    caps the number of status requests in flight. The threads are started on the
+    first `submit` and stopped by `close`.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_interval: float = 0.5,
+        max_interval: float = 10.0,
+        backoff_factor: float = 1.5,
+        seconds_per_megabyte: float = 0.1,
+        timeout: float = 60.0,
+        timeout_per_megabyte: float = 5.0,
+        max_workers: int = 4,
+    ):
+        """
+        Args:
+            min_interval: seconds between upload and the first check of an empty file
+            max_interval: max seconds between two checks of a file
+            backoff_factor: multiplier of the interval after every check
+            seconds_per_megabyte: extra interval per megabyte of the file
+            timeout: seconds to wait for the analysis of an empty file
+            timeout_per_megabyte: extra seconds to wait per megabyte of the file
+            max_workers: max number of status requests sent at the same time
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.seconds_per_megabyte = seconds_per_megabyte
+        self.timeout = timeout
+        self.timeout_per_megabyte = timeout_per_megabyte
+        self.max_workers = max_workers
+
+        self._pending: t.List[PendingAnalysis] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: t.Optional[threading.Thread] = None
+        self._executor: t.Optional[ThreadPoolExecutor] = None
+        self._is_closed = False
+
+    def get_interval(self, attempt: int, file_size: t.Optional[int] = None) -> float:
+        """
+        Seconds to wait before check number `attempt` (starting at 0) of a file
+        """
+
+        interval = self.min_interval + self.seconds_per_megabyte * (file_size or 0) / MEGABYTE
+        return min(self.max_interval, interval * self.backoff_factor ** attempt)
+
+    def get_timeout(self, file_size: t.Optional[int] = None) -> float:
+        return self.timeout + self.timeout_per_megabyte * (file_size or 0) / MEGABYTE
+
+    def submit(
+        self,
+        get_status: StatusGetter,
+        *,
+        file_size: t.Optional[int] = None,
+        timeout: t.Optional[float] = None,
+    ) -> "Future[None]":
+        """
+        Start polling the analysis status of a file.
+
+        Args:
+            get_status: function requesting the analysis status, "analysing"
+                while the analysis is running and "finished" once it is done
+            file_size: size of the uploaded file in bytes, if known
+            timeout: seconds to wait for the analysis, overrides the
+                size-based default
+        Returns:
+            future resolved when the analysis is finished. It fails with
+            `FileAnalysisError` if the analysis failed, `FileAnalysisTimeout`
+            after the deadline, or the exception raised by `get_status`.
+        """
+
+        now = time.monotonic()
+        if timeout is None:
+            timeout = self.get_timeout(file_size)
+        pending = PendingAnalysis(
+            due_at=now + self.get_interval(0, file_size),
+            sequence=next(self._sequence),
+            get_status=get_status,
+            future=Future(),
+            deadline=now + timeout,
+            file_size=file_size,
+        )
+        with self._condition:
+            if self._is_closed:
+                raise RuntimeError("FileStatusPoller is closed")
+            heapq.heappush(self._pending, pending)
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="push_to_3yourmind-file-status-check",
+                )
+                self._thread = threading.Thread(
+                    target=self._run, name="push_to_3yourmind-file-status", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+        return pending.future
+
+    def close(self) -> None:
+        """
+        Stop the scheduler and cancel files still being polled
+        """
+
+        with self._condition:
+            self._is_closed = True
+            pending, self._pending = self._pending, []
+            thread, executor = self._thread, self._executor
+            self._condition.notify()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for analysis in pending:
+            analysis.future.cancel()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._is_closed:
+                    if not self._pending:
+                        self._condition.wait()
+                        continue
+                    delay = self._pending[0].due_at - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                if self._is_closed:
+                    return
+                analysis = heapq.heappop(self._pending)
+
+            if analysis.future.cancelled():
+                continue
+            check = self._executor.submit(self._check, analysis)
+            check.add_done_callback(
+                lambda check, future=analysis.future: check.cancelled() and future.cancel()
+            )
+
+    def _check(self, analysis: PendingAnalysis) -> None:
+        logger.debug(f"Checking file status, attempt {analysis.attempt}")
+        try:
+            status = analysis.get_status()
+        except Exception as exc:
+            analysis.future.set_exception(exc)
+            return
+
+        if status == "finished":
+            logger.debug("File analysis done")
+            analysis.future.set_result(None)
+            return
+        if status != "analysing":
+            analysis.future.set_exception(exceptions.FileAnalysisError(status))
+            return
+
+        now = time.monotonic()
+        if now >= analysis.deadline:
+            analysis.future.set_exception(exceptions.FileAnalysisTimeout())
+            return
+        analysis.attempt += 1
+        interval = self.get_interval(analysis.attempt, analysis.file_size)
+        analysis.due_at = min(now + interval, analysis.deadline)
+        analysis.sequence = next(self._sequence)
+        with self._condition:
+            if self._is_closed:
+                analysis.future.cancel()
+                return
+            heapq.heappush(self._pending, analysis)
+            self._condition.notify()
@@ -0,0 +1,126 @@
+"""
+Client-side rate limiting of requests sent to the API
+"""
+import threading
+import time
+import typing as t
+
+
+__all__ = ["RateLimiter", "TokenBucket"]
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens are refilled continuously at `rate` per second,
+    up to `burst` tokens.
+
+    Instead of blocking, `reserve` takes a token right away and returns how long the
+    caller has to wait before it may use it, so the same bucket can pace both threads
+    and coroutines. Callers queue up in the order they reserved.
+    """
+
+    def __init__(self, rate: float, burst: t.Optional[float] = None):
+        """
+        Args:
+            rate: number of requests per second
+            burst: max number of requests sent at once after an idle period,
+                defaults to `rate` (but at least 1)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token and return delay, in seconds, before it becomes available
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated_at
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Caps the number of requests per second sent by a client, optionally per group
+    of endpoints. Groups are matched by the longest prefix of the API sub path;
+    a request has to wait for both the global limit and the limit of its group.
+
+    >>> rate_limiter = RateLimiter(
+    ...     20,
+    ...     groups={"upload/": 2, "organization-panel/": (5, 10)},
+    ... )
+    >>> client = PushTo3YourmindAPI(
+    ...     access_token="QWERTY123456789",
+    ...     base_url="http://<domain-name>",
+    ...     rate_limiter=rate_limiter,
+    ... )
+
+    One limiter is shared by all namespaces and threads of a client.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: t.Optional[float] = None,
+        *,
+        burst: t.Optional[float] = None,
+        groups: t.Optional[
+            t.Mapping[str, t.Union[float, t.Tuple[float, t.Optional[float]]]]
+        ] = None,
+    ):
+        """
+        Args:
+            requests_per_second: global limit, None means unlimited
+            burst: size of the global bucket, see `TokenBucket`
+            groups: limits per endpoint group, keyed by sub path prefix, ex.
+                "user-panel/". A value is either a rate or a (rate, burst) tuple.
+        """
+        self._bucket = (
+            TokenBucket(requests_per_second, burst)
+            if requests_per_second is not None
+            else None
+        )
+        self._group_buckets = {}
+        for prefix, limit in (groups or {}).items():
+            rate, group_burst = limit if isinstance(limit, tuple) else (limit, None)
+            self._group_buckets[prefix.lstrip("/")] = TokenBucket(rate, group_burst)
+        self._prefixes = sorted(self._group_buckets, key=len, reverse=True)
+
+    def _get_group_bucket(self, sub_path: str) -> t.Optional[TokenBucket]:
+        sub_path = sub_path.lstrip("/")
+        for prefix in self._prefixes:
+            if sub_path.startswith(prefix):
+                return self._group_buckets[prefix]
+        return None
+
+    def reserve(self, sub_path: str) -> float:
+        """
+        Reserve a request to the given sub path, returns delay in seconds
+        """
+
+        delay = 0.0
+        if self._bucket is not None:
+            delay = self._bucket.reserve()
+        group_bucket = self._get_group_bucket(sub_path)
+        if group_bucket is not None:
+            delay = max(delay, group_bucket.reserve())
+        return delay
+
+    def acquire(self, sub_path: str) -> None:
+        """
+        Block the current thread until a request to the given sub path may be sent
+        """
+
+        delay = self.reserve(sub_path)
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,188 @@
+"""
+Retry policy applied to every request sent by the client
+"""
+from dataclasses import dataclass
+import datetime
+import email.utils
+import random
+import typing as t
+
+
+__all__ = ["RetryPolicy", "RetryState"]
+
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Describes when and how long to wait before a failed request is sent again.
+
+    A request is retried when the API answers with one of `retry_statuses` or when
+    the connection fails. The n-th retry waits a random time between 0 and
+    `backoff_factor * 2 ** (n - 1)` seconds, capped by `backoff_max` ("full jitter").
+    When the API sends a `Retry-After` header, its value is used instead.
+
+    >>> client = PushTo3YourmindAPI(
+    ...     access_token="QWERTY123456789",
+    ...     base_url="http://<domain-name>",
+    ...     retry_policy=RetryPolicy(idempotent_retries=5, retry_budget=120),
+    ... )
+
+    Attributes:
+        idempotent_retries: max number of retries of GET, HEAD, OPTIONS, PUT
+            and DELETE requests
+        non_idempotent_retries: max number of retries of POST and PATCH requests.
+            Disabled by default, since the API might have processed the first request.
+        backoff_factor: base delay, in seconds
+        backoff_max: max delay between two attempts, in seconds
+        jitter: randomize delays, so that parallel workers don't retry in lockstep
+        retry_statuses: response status codes that are retried
+        respect_retry_after: wait as long as the `Retry-After` response header says
+        retry_budget: max total time, in seconds, one call may spend waiting
+            between attempts. A retry that would exceed it is not made.
+    """
+
+    idempotent_retries: int = 3
+    non_idempotent_retries: int = 0
+    backoff_factor: float = 0.5
+    backoff_max: float = 30.0
+    jitter: bool = True
+    retry_statuses: t.FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+    respect_retry_after: bool = True
+    retry_budget: float = 60.0
+
+    def get_max_retries(self, method: str) -> int:
+        if method.upper() in IDEMPOTENT_METHODS:
+            return self.idempotent_retries
+        return self.non_idempotent_retries
+
+    def get_backoff(self, retry_number: int) -> float:
+        """
+        Delay before the given retry (starting from 1), without `Retry-After`
+        """
+
+        delay = min(self.backoff_max, self.backoff_factor * 2 ** (retry_number - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def get_retry_after(self, value: t.Optional[str]) -> t.Optional[float]:
+        """
+        Parse `Retry-After` header, either delay in seconds or an HTTP date
+        """
+
+        if not value or not self.respect_retry_after:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return max(0.0, (retry_at - now).total_seconds())
+
+
+class RetryState:
+    """
+    Retries made so far for a single call of `BaseAPI._request`
+    """
+
+    def __init__(
+        self, policy: t.Optional[RetryPolicy], method: str, *, rewindable: bool = True
+    ):
+        """
+        Args:
+            policy: retry policy of the client, None to never retry
+            method: HTTP method of the request
+            rewindable: whether the body of the request can be sent again,
+                see `is_rewindable`. Requests with a consumed body are not retried.
+        """
+        self._policy = policy
+        self._max_retries = (
+            policy.get_max_retries(method) if policy and rewindable else 0
+        )
+        self.retries = 0
+        self.total_delay = 0.0
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        return self._policy is not None and status_code in self._policy.retry_statuses
+
+    def get_next_delay(self, retry_after: t.Optional[str] = None) -> t.Optional[float]:
+        """
+        Register a failed attempt. Returns how long to wait before the next one,
+        or None if the call should not be retried anymore.
+        """
+
+        if self.retries >= self._max_retries:
+            return None
+
+        delay = self._policy.get_retry_after(retry_after)
+        if delay is None:
+            delay = self._policy.get_backoff(self.retries + 1)
+        if self.total_delay + delay > self._policy.retry_budget:
+            return None
+
+        self.retries += 1
+        self.total_delay += delay
+        return delay
+
+
+def _iter_body_streams(request_kwargs: t.Dict[str, t.Any]) -> t.Iterator[t.Any]:
+    files = request_kwargs.get("files") or {}
+    bodies = [*(files.values() if isinstance(files, dict) else files)]
+    bodies.extend((request_kwargs.get("data"), request_kwargs.get("content")))
+    for body in bodies:
+        if isinstance(body, tuple):
+            body = body[1] if len(body) > 1 else None
+        if body is not None and not isinstance(body, (bytes, bytearray, str, dict)):
+            yield body
+
+
+def _is_seekable(stream: t.Any) -> bool:
+    seekable = getattr(stream, "seekable", None)
+    if seekable is None:
+        return hasattr(stream, "seek") and hasattr(stream, "tell")
+    try:
+        return seekable()
+    except (OSError, ValueError):
+        return False
+
+
+def is_rewindable(request_kwargs: t.Dict[str, t.Any]) -> bool:
+    """
+    Whether the body of a request can be sent again. Bodies read from streams
+    that can't seek, ex. downloaded files or generators, are consumed by the
+    first attempt.
+    """
+
+    return all(_is_seekable(stream) for stream in _iter_body_streams(request_kwargs))
+
+
+def get_stream_positions(
+    request_kwargs: t.Dict[str, t.Any]
+) -> t.List[t.Tuple[t.IO, int]]:
+    """
+    Remember positions of file objects sent with a request, so that they can
+    be rewound before the request is retried
+    """
+
+    positions = []
+    for stream in _iter_body_streams(request_kwargs):
+        if hasattr(stream, "seek") and hasattr(stream, "tell"):
+            try:
+                positions.append((stream, stream.tell()))
+            except (OSError, ValueError):
+                pass
+    return positions
+
+
+def rewind_streams(positions: t.List[t.Tuple[t.IO, int]]) -> None:
+    for stream, position in positions:
+        stream.seek(position)
@@ -0,0 +1,89 @@
+"""
+HTTP session factory shared by all API namespaces of a client. `requests` is
+imported when the first session is created, not with the package.
+"""
+import threading
+import typing as t
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+    from push_to_3yourmind.cassette import Cassette
+
+
+__all__ = ["LazySession", "create_session"]
+
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+
+def create_session(
+    *,
+    pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    pool_block: bool = False,
+    cassette: t.Optional["Cassette"] = None,
+) -> "requests.Session":
+    """
+    Create a `requests.Session` with a keep-alive connection pool mounted for
+    both http:// and https:// URLs.
+
+    The session keeps TCP/TLS connections open between calls, so only the first
+    request to a host pays for the handshake. Sending requests through one session
+    from several threads is safe: every call builds its own request object and
+    connections are checked in and out of a thread-safe pool.
+
+    Args:
+        pool_connections: number of per-host connection pools to keep
+        pool_maxsize: maximum number of connections kept open per host
+        pool_block: when True, a thread waits for a free connection once
+            `pool_maxsize` connections to a host are in use, instead of opening
+            an extra connection that is discarded afterwards
+        cassette: record requests to, or replay them from, this cassette
+    """
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    if cassette is not None:
+        from push_to_3yourmind.cassette import CassetteAdapter
+
+        adapter = CassetteAdapter(cassette, adapter)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class LazySession:
+    """
+    Stands in for the session of a client until it is first used, so creating
+    a client is cheap and doesn't load `requests`. Attributes are looked up on
+    the session, which is created on first access with the options of
+    `create_session`.
+    """
+
+    def __init__(self, **options: t.Any):
+        self._options = options
+        self._session: t.Optional["requests.Session"] = None
+        self._lock = threading.Lock()
+
+    def get_session(self) -> "requests.Session":
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = create_session(**self._options)
+        return self._session
+
+    def __getattr__(self, name: str) -> t.Any:
+        return getattr(self.get_session(), name)
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
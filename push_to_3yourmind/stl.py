@@ -0,0 +1,437 @@
+"""
+Helpers to read, convert and inspect STL files. Inspection requires numpy,
+install it with `pip install "push-to-3yourmind[stl]"`.
+"""
+from dataclasses import dataclass, field
+from io import BytesIO, IOBase
+import os
+import re
+import struct
+import typing as t
+
+from push_to_3yourmind import types
+from push_to_3yourmind.multipart import CHUNK_SIZE
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
+
+
+__all__ = [
+    "MeshReport",
+    "convert_ascii_stl_to_binary",
+    "get_plausible_units",
+    "inspect_cad_file",
+    "inspect_stl",
+    "inspect_stl_file",
+    "is_ascii_stl",
+    "iter_stl_triangles",
+    "read_stl_triangles",
+]
+
+
+BINARY_HEADER_SIZE = 80
+BINARY_HEADER = b"binary STL converted from ASCII".ljust(BINARY_HEADER_SIZE, b" ")
+BINARY_FACET = struct.Struct("<12fH")
+SNIFF_SIZE = 512
+ASCII_VERTEX = re.compile(rb"vertex\s+(\S+\s+\S+\s+\S+)")
+# Facets read at a time when inspecting a file, and the bytes an ASCII facet
+# takes, roughly
+TRIANGLES_PER_CHUNK = 16 * 1024
+ASCII_FACET_SIZE = 256
+
+INCH = 25.4  # mm
+# Largest dimension, in mm, of a part that is likely to be printed
+MIN_PART_SIZE = 5.0
+MAX_PART_SIZE = 2000.0
+# Facets whose area is below this share of their squared longest edge, and meshes
+# whose volume is below this share of their cubed bounding box diagonal
+DEGENERATE_AREA_RATIO = 1e-12
+MAX_DEGENERATE_SHARE = 0.1
+
+
+def is_ascii_stl(head: bytes) -> bool:
+    """
+    Tell an ASCII STL from a binary one by the first bytes of the file. Binary
+    files may start with "solid" too, so the rest of the head has to be text
+    with a facet (or the end of an empty solid) in it.
+    """
+
+    if not head.lstrip().startswith(b"solid"):
+        return False
+    try:
+        text = head.decode("ascii")
+    except UnicodeDecodeError:
+        return False
+    return "facet" in text or "endsolid" in text
+
+
+def _iter_lines(chunks: t.Iterable[bytes]) -> t.Iterator[bytes]:
+    rest = b""
+    for chunk in chunks:
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+
+def convert_ascii_stl_to_binary(
+    head: bytes,
+    source: t.IO[bytes],
+    target: t.IO[bytes],
+) -> int:
+    """
+    Convert an ASCII STL file to a binary one, reading the source in chunks.
+    Coordinates are stored as 32-bit floats, as in every binary STL.
+
+    Args:
+        head: bytes already read from the start of the source
+        source: rest of the ASCII file
+        target: seekable binary stream, written from its current position
+    Returns:
+        number of facets
+    Raises:
+        ValueError: if the source is not a valid ASCII STL
+    """
+
+    start = target.tell()
+    target.write(BINARY_HEADER + b"\0\0\0\0")
+
+    chunks = iter(lambda: source.read(CHUNK_SIZE), b"")
+    facet_count = 0
+    normal: t.List[float] = []
+    vertices: t.List[float] = []
+    for line in _iter_lines(_chain(head, chunks)):
+        tokens = line.split()
+        if not tokens:
+            continue
+        keyword = tokens[0]
+        if keyword == b"facet":
+            if len(tokens) != 5 or tokens[1] != b"normal":
+                raise ValueError(f"Invalid facet line: {line!r}")
+            normal = [float(value) for value in tokens[2:]]
+            vertices = []
+        elif keyword == b"vertex":
+            if len(tokens) != 4:
+                raise ValueError(f"Invalid vertex line: {line!r}")
+            vertices.extend(float(value) for value in tokens[1:])
+        elif keyword == b"endfacet":
+            if len(normal) != 3 or len(vertices) != 9:
+                raise ValueError(f"Facet {facet_count} doesn't have 3 vertices")
+            target.write(BINARY_FACET.pack(*normal, *vertices, 0))
+            facet_count += 1
+            normal = []
+        elif keyword not in (b"solid", b"outer", b"endloop", b"endsolid"):
+            raise ValueError(f"Unexpected line: {line!r}")
+
+    end = target.tell()
+    target.seek(start + BINARY_HEADER_SIZE)
+    target.write(struct.pack("<I", facet_count))
+    target.seek(end)
+    return facet_count
+
+
+def _chain(head: bytes, chunks: t.Iterator[bytes]) -> t.Iterator[bytes]:
+    if head:
+        yield head
+    yield from chunks
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as exc:  # pragma: no cover
+        raise ImportError(
+            "STL inspection requires numpy, install it with "
+            '`pip install "push-to-3yourmind[stl]"`'
+        ) from exc
+    return numpy
+
+
+@dataclass
+class MeshReport:
+    """
+    Geometry of an STL file, in the units of the file
+
+    Attributes:
+        triangle_count: number of facets
+        bounding_box: min and max corner
+        volume: enclosed volume, only meaningful for closed meshes
+        degenerate_facets: number of facets with (almost) no area or with
+            coordinates that are not finite
+        plausible_units: units in which the part size is plausible, none, one or both
+        suggested_unit: the only plausible unit, None if both or neither are
+        problems: reasons why the file would be rejected by the file analysis
+        warnings: oddities that don't prevent an upload, ex. a part size that is
+            unusual in mm and inch
+    """
+
+    triangle_count: int
+    bounding_box: t.Tuple[t.Tuple[float, float, float], t.Tuple[float, float, float]]
+    volume: float
+    surface_area: float
+    degenerate_facets: int
+    plausible_units: t.List[types.Unit] = field(default_factory=list)
+    suggested_unit: t.Optional[types.Unit] = None
+    problems: t.List[str] = field(default_factory=list)
+    warnings: t.List[str] = field(default_factory=list)
+
+    @property
+    def size(self) -> t.Tuple[float, float, float]:
+        low, high = self.bounding_box
+        return tuple(high[axis] - low[axis] for axis in range(3))
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.problems
+
+
+def iter_stl_triangles(
+    file: t.IO[bytes], chunk_size: int = TRIANGLES_PER_CHUNK
+) -> t.Iterator["np.ndarray"]:
+    """
+    Vertices of the facets of a binary or ASCII STL file, read from its
+    current position, as arrays of shape (triangle count, 3, 3) of at most
+    `chunk_size` facets. Only one chunk of the file is in memory at a time.
+
+    Raises:
+        ValueError: if the file is not an STL file
+    """
+
+    numpy = _import_numpy()
+    head = file.read(SNIFF_SIZE)
+    if is_ascii_stl(head):
+        return _iter_ascii_triangles(numpy, head, file, chunk_size)
+    return _iter_binary_triangles(numpy, head, file, chunk_size)
+
+
+def _iter_binary_triangles(
+    numpy, head: bytes, file: t.IO[bytes], chunk_size: int
+) -> t.Iterator["np.ndarray"]:
+    if len(head) < BINARY_HEADER_SIZE + 4:
+        raise ValueError("File is too short for a binary STL")
+    (triangle_count,) = struct.unpack_from("<I", head, BINARY_HEADER_SIZE)
+    facet_type = numpy.dtype(
+        [("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attributes", "<u2")]
+    )
+    buffer = head[BINARY_HEADER_SIZE + 4 :]
+    read_count = 0
+    while read_count < triangle_count:
+        size = min(triangle_count - read_count, chunk_size) * facet_type.itemsize
+        if len(buffer) < size:
+            buffer += file.read(size - len(buffer))
+        data, buffer = buffer[:size], buffer[size:]
+        if len(data) < size:
+            read_count += len(data) // facet_type.itemsize
+            raise ValueError(
+                f"File ends after {read_count} facets, header says {triangle_count}"
+            )
+        facets = numpy.frombuffer(data, dtype=facet_type)
+        read_count += len(facets)
+        yield facets["vertices"].astype(numpy.float64)
+
+
+def _iter_ascii_triangles(
+    numpy, head: bytes, file: t.IO[bytes], chunk_size: int
+) -> t.Iterator["np.ndarray"]:
+    rest = head
+    # Coordinates of the vertices of a facet whose last vertex is in the next block
+    pending = numpy.empty(0)
+    while True:
+        block = file.read(chunk_size * ASCII_FACET_SIZE)
+        data = rest + block
+        if block:
+            # Vertex lines are matched in complete lines only
+            end = data.rfind(b"\n") + 1
+            data, rest = data[:end], data[end:]
+        matches = ASCII_VERTEX.findall(data)
+        if matches:
+            coordinates = numpy.fromstring(b" ".join(matches).decode("ascii"), sep=" ")
+            if len(coordinates) != 3 * len(matches):
+                raise ValueError("Invalid vertex coordinates")
+            coordinates = numpy.concatenate((pending, coordinates))
+            end = len(coordinates) - len(coordinates) % 9
+            pending = coordinates[end:]
+            # The first block comes with the sniffed head, it can hold more facets
+            triangles = coordinates[:end].reshape(-1, 3, 3)
+            for start in range(0, len(triangles), chunk_size):
+                yield triangles[start : start + chunk_size]
+        if not block:
+            break
+    if len(pending):
+        raise ValueError("Number of vertices is not a multiple of 3")
+
+
+def read_stl_triangles(data: bytes) -> "np.ndarray":
+    """
+    Vertices of all facets of a binary or ASCII STL file, as an array of shape
+    (triangle count, 3, 3). Holds all of them in memory, see `iter_stl_triangles`
+    to read a large file.
+
+    Raises:
+        ValueError: if the data is not an STL file
+    """
+
+    numpy = _import_numpy()
+    chunks = list(iter_stl_triangles(BytesIO(data)))
+    if not chunks:
+        return numpy.empty((0, 3, 3))
+    return numpy.concatenate(chunks)
+
+
+class _MeshTotals:
+    """
+    Bounding box, area and volume of a mesh, summed over chunks of its facets
+    """
+
+    def __init__(self, numpy):
+        self.numpy = numpy
+        self.triangle_count = 0
+        self.low = numpy.full(3, numpy.inf)
+        self.high = numpy.full(3, -numpy.inf)
+        self.surface_area = 0.0
+        self.signed_volume = 0.0
+        self.degenerate_facets = 0
+
+    def add(self, triangles: "np.ndarray") -> None:
+        numpy = self.numpy
+        self.triangle_count += len(triangles)
+        finite = numpy.isfinite(triangles).all(axis=(1, 2))
+        self.degenerate_facets += int((~finite).sum())
+        triangles = triangles[finite]
+        if not len(triangles):
+            return
+        self.low = numpy.minimum(self.low, triangles.min(axis=(0, 1)))
+        self.high = numpy.maximum(self.high, triangles.max(axis=(0, 1)))
+
+        first, second, third = (triangles[:, corner] for corner in range(3))
+        edges = (second - first, third - first, third - second)
+        longest_edges = numpy.max([(edge**2).sum(axis=1) for edge in edges], axis=0)
+        areas = 0.5 * numpy.linalg.norm(numpy.cross(edges[0], edges[1]), axis=1)
+        self.degenerate_facets += int(
+            (areas <= DEGENERATE_AREA_RATIO * longest_edges).sum()
+        )
+        self.surface_area += float(areas.sum())
+        # Sum of signed volumes of the tetrahedra between the origin and every facet
+        self.signed_volume += float(
+            numpy.einsum("ij,ij->i", first, numpy.cross(second, third)).sum()
+        )
+
+
+def inspect_stl(data: bytes) -> MeshReport:
+    """
+    Compute triangle count, bounding box, volume and degenerate facets of
+    an STL file, and check them for obvious problems
+    """
+
+    return inspect_stl_file(BytesIO(data))
+
+
+def inspect_stl_file(file: t.IO[bytes]) -> MeshReport:
+    """
+    Version of `inspect_stl` reading a file from its current position, a chunk
+    of facets at a time
+    """
+
+    numpy = _import_numpy()
+    totals = _MeshTotals(numpy)
+    try:
+        for triangles in iter_stl_triangles(file):
+            totals.add(triangles)
+    except ValueError as exc:
+        return MeshReport(
+            triangle_count=0,
+            bounding_box=((0.0, 0.0, 0.0), (0.0, 0.0, 0.0)),
+            volume=0.0,
+            surface_area=0.0,
+            degenerate_facets=0,
+            problems=[f"not an STL file: {exc}"],
+        )
+
+    if numpy.isfinite(totals.low).all():
+        low, high = totals.low, totals.high
+    else:
+        low = high = numpy.zeros(3)
+    diagonal = float(numpy.linalg.norm(high - low))
+    volume = abs(totals.signed_volume) / 6
+    report = MeshReport(
+        triangle_count=totals.triangle_count,
+        bounding_box=(tuple(low.tolist()), tuple(high.tolist())),
+        volume=volume,
+        surface_area=totals.surface_area,
+        degenerate_facets=totals.degenerate_facets,
+    )
+    largest_dimension = max(report.size)
+    report.plausible_units = get_plausible_units(largest_dimension)
+    report.suggested_unit = suggest_unit(largest_dimension)
+
+    triangle_count = report.triangle_count
+    if not triangle_count:
+        report.problems.append("mesh has no facets")
+    elif report.degenerate_facets > MAX_DEGENERATE_SHARE * triangle_count:
+        report.problems.append(
+            f"{report.degenerate_facets} of {triangle_count} facets are degenerate"
+        )
+    if triangle_count and volume <= DEGENERATE_AREA_RATIO * diagonal**3:
+        report.problems.append("mesh encloses no volume")
+    # Parts of any size can be printed, the size only hints at the unit
+    if triangle_count and not report.plausible_units:
+        report.warnings.append(
+            f"largest dimension {largest_dimension:g} is unusual in mm and inch"
+        )
+    return report
+
+
+def get_plausible_units(largest_dimension: float) -> t.List[types.Unit]:
+    """
+    Units in which a part of this largest dimension has a printable size.
+    Parts from 5 to about 78 units across are plausible in both.
+    """
+
+    units: t.List[types.Unit] = []
+    if MIN_PART_SIZE <= largest_dimension <= MAX_PART_SIZE:
+        units.append("mm")
+    if MIN_PART_SIZE <= largest_dimension * INCH <= MAX_PART_SIZE:
+        units.append("inch")
+    return units
+
+
+def suggest_unit(largest_dimension: float) -> t.Optional[types.Unit]:
+    """
+    The unit of a part of this largest dimension, if only one is plausible
+    """
+
+    units = get_plausible_units(largest_dimension)
+    return units[0] if len(units) == 1 else None
+
+
+def inspect_cad_file(file: types.CadFileSpecifier) -> t.Optional[MeshReport]:
+    """
+    Inspect a CAD file before it is uploaded, reading it in chunks. Returns None
+    for files that can't be inspected: other formats than STL, URLs, and
+    streams that have no ".stl" name or can't be rewound. Streams are rewound
+    to where they were.
+    """
+
+    if isinstance(file, str) and file.startswith("http"):
+        return None
+    if isinstance(file, str):
+        if os.path.splitext(file)[1].lower() != ".stl":
+            return None
+        try:
+            with open(file, "rb") as file_obj:
+                return inspect_stl_file(file_obj)
+        except OSError:
+            return None
+    if isinstance(file, IOBase):
+        name = getattr(file, "name", None)
+        if not isinstance(name, str) or os.path.splitext(name)[1].lower() != ".stl":
+            return None
+        try:
+            position = file.tell()
+            report = inspect_stl_file(file)
+            file.seek(position)
+        except OSError:
+            return None
+        return report
+    return None
@@ -0,0 +1,261 @@
+"""
+Nested timing spans of API calls, to find out which step of a composite method
+is slow. Spans are passed to a pluggable exporter, there is no dependency on a
+tracing library.
+"""
+import abc
+import contextlib
+import contextvars
+from dataclasses import dataclass, field
+import functools
+import inspect
+import os
+import threading
+import time
+import typing as t
+
+from push_to_3yourmind.logger import logger
+
+
+__all__ = [
+    "InMemoryExporter",
+    "LoggingExporter",
+    "Span",
+    "SpanExporter",
+    "Tracer",
+    "bind_context",
+    "get_current_span",
+    "traced",
+]
+
+
+_current_span: "contextvars.ContextVar[t.Optional[Span]]" = contextvars.ContextVar(
+    "push_to_3yourmind_span", default=None
+)
+
+AttributeValue = t.Union[str, int, float, bool, None]
+
+
+@dataclass
+class Span:
+    """
+    Attributes:
+        name: method name for composite methods, "<METHOD> <path template>"
+            for requests
+        trace_id: shared by all spans of one top-level call
+        parent_id: span_id of the enclosing span, None for top-level spans
+        start_time: Unix timestamp
+        duration: seconds, None while the span is open
+        error: class name of the exception the span ended with
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: t.Optional[str]
+    start_time: float
+    duration: t.Optional[float] = None
+    attributes: t.Dict[str, AttributeValue] = field(default_factory=dict)
+    error: t.Optional[str] = None
+
+
+class SpanExporter(abc.ABC):
+    """
+    Receives finished spans. Children finish, and so are exported, before their
+    parent. Subclass it to forward spans to a tracing backend, ex. OpenTelemetry.
+    Spans are exported from the thread that finished them.
+    """
+
+    @abc.abstractmethod
+    def export(self, span: Span) -> None:
+        """
+        Handle a finished span
+        """
+
+
+class LoggingExporter(SpanExporter):
+    def export(self, span: Span) -> None:
+        logger.info(
+            f"Span {span.name} took {span.duration * 1000:.1f}ms"
+            + (f", failed with {span.error}" if span.error else "")
+        )
+
+
+class InMemoryExporter(SpanExporter):
+    """
+    Keeps finished spans in memory
+
+    >>> exporter = InMemoryExporter()
+    >>> client = PushTo3YourmindAPI(..., tracer=Tracer(exporter))
+    >>> client.user_panel.quick_order_quote(quote_id=3)
+    >>> print(exporter.format_tree())
+    quick_order_quote 1840.2ms
+      GET user-panel/quotes/{id}/ 95.1ms
+      ...
+    """
+
+    def __init__(self):
+        self.spans: t.List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+    def format_tree(self) -> str:
+        """
+        Spans indented under their parent, in start order
+        """
+
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_time)
+        span_ids = {span.span_id for span in spans}
+        children: t.Dict[t.Optional[str], t.List[Span]] = {}
+        for span in spans:
+            parent_id = span.parent_id if span.parent_id in span_ids else None
+            children.setdefault(parent_id, []).append(span)
+
+        lines = []
+
+        def add_lines(parent_id: t.Optional[str], depth: int) -> None:
+            for span in children.get(parent_id, []):
+                line = f"{'  ' * depth}{span.name} {span.duration * 1000:.1f}ms"
+                if span.error:
+                    line += f" ({span.error})"
+                lines.append(line)
+                add_lines(span.span_id, depth + 1)
+
+        add_lines(None, 0)
+        return "\n".join(lines)
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+def get_current_span() -> t.Optional[Span]:
+    return _current_span.get()
+
+
+class Tracer:
+    """
+    Creates spans and sends them to an exporter. The current span is kept in
+    a context variable, so spans nest across function calls and asyncio tasks.
+    Functions run in other threads see it when wrapped with `bind_context`.
+    """
+
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+
+    def _create_span(
+        self, name: str, start_time: float, attributes: t.Dict[str, AttributeValue]
+    ) -> Span:
+        parent = _current_span.get()
+        return Span(
+            name=name,
+            trace_id=parent.trace_id if parent is not None else _new_id(16),
+            span_id=_new_id(8),
+            parent_id=parent.span_id if parent is not None else None,
+            start_time=start_time,
+            attributes=attributes,
+        )
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: AttributeValue) -> t.Iterator[Span]:
+        """
+        Open a span, the child of the current one, for the duration of the block
+        """
+
+        span = self._create_span(name, time.time(), attributes)
+        started = time.perf_counter()
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.error = type(exc).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.perf_counter() - started
+            self._export(span)
+
+    def record_span(
+        self,
+        name: str,
+        *,
+        duration: float,
+        attributes: t.Optional[t.Dict[str, AttributeValue]] = None,
+        error: t.Optional[BaseException] = None,
+    ) -> Span:
+        """
+        Add a finished span, that ended now, as a child of the current one
+        """
+
+        span = self._create_span(name, time.time() - duration, attributes or {})
+        span.duration = duration
+        if error is not None:
+            span.error = type(error).__name__
+        self._export(span)
+        return span
+
+    def _export(self, span: Span) -> None:
+        try:
+            self.exporter.export(span)
+        except Exception:
+            logger.exception(f"Failed to export span {span.name}")
+
+
+def bind_context(function: t.Callable) -> t.Callable:
+    """
+    Run `function` in the current context, so spans it opens in another thread
+    have the current span as parent
+    """
+
+    context = contextvars.copy_context()
+
+    @functools.wraps(function)
+    def wrapper(*args: t.Any, **kwargs: t.Any) -> t.Any:
+        return context.copy().run(function, *args, **kwargs)
+
+    return wrapper
+
+
+def _get_attributes(kwargs: t.Dict[str, t.Any]) -> t.Dict[str, AttributeValue]:
+    return {
+        key: value
+        for key, value in kwargs.items()
+        if isinstance(value, (str, int, float, bool))
+    }
+
+
+def traced(method: t.Callable) -> t.Callable:
+    """
+    Decorator of API methods, opening a span named after the method if the
+    client has a tracer. Scalar keyword arguments become span attributes.
+    """
+
+    name = method.__name__
+
+    if inspect.iscoroutinefunction(method):
+
+        @functools.wraps(method)
+        async def async_wrapper(self, *args: t.Any, **kwargs: t.Any) -> t.Any:
+            if self._tracer is None:
+                return await method(self, *args, **kwargs)
+            with self._tracer.span(name, **_get_attributes(kwargs)):
+                return await method(self, *args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args: t.Any, **kwargs: t.Any) -> t.Any:
+        if self._tracer is None:
+            return method(self, *args, **kwargs)
+        with self._tracer.span(name, **_get_attributes(kwargs)):
+            return method(self, *args, **kwargs)
+
+    return wrapper
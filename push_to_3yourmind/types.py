@@ -37,6 +37,15 @@ ResponseDict = t.Dict[str, t.Any]
 AnyResponse = t.Union[str, ResponseDict, t.List[ResponseDict], t.List[str]]
 RequestMethod = t.Literal["GET", "PUT", "POST", "DELETE", "PATCH", "HEAD"]
 Unit = t.Literal["mm", "inch"]
+JobStage = t.Literal[
+    "mapped",
+    "line_created",
+    "uploaded",
+    "analysed",
+    "line_configured",
+    "catalog_item_created",
+    "attachments_done",
+]
 AttachmentFileSpecifier = CadFileSpecifier = t.Union[str, t.IO]
 
 OptionalInteger = t.Union[int, NoValueType]
@@ -64,3 +73,33 @@ class FormData:
 class PostProcessingConfig:
     post_processing_id: int
     color_id: t.Union[int, NoValueType]
+
+
+@dataclass
+class CadFileLineConfig:
+    cad_file: CadFileSpecifier
+    product_id: int
+    quantity: int = 1
+    post_processings: t.Sequence[PostProcessingConfig] = ()
+    preferred_due_date: OptionalDate = NoValue
+
+
+@dataclass
+class CatalogItemConfig:
+    cad_file: CadFileSpecifier
+    product_id: int
+    quantity: int = 1
+    post_processings: t.Sequence[PostProcessingConfig] = ()
+    part_requirements: t.Optional[FormData] = None
+    attachments: t.Sequence[AttachmentFileSpecifier] = ()
+
+
+@dataclass
+class BatchItemResult:
+    item: t.Any
+    response: t.Optional[ResponseDict] = None
+    error: t.Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
@@ -0,0 +1,386 @@
+"""
+Migration of the users of an organization to another platform, ex. from a
+staging to a production instance, with their preferences and addresses
+"""
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+import json
+import threading
+import time
+import typing as t
+
+from push_to_3yourmind import exceptions, types
+from push_to_3yourmind.logger import logger
+from push_to_3yourmind.pipeline import Pipeline, PipelineError, PipelineReport, Stage
+from push_to_3yourmind.tracing import bind_context
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from push_to_3yourmind.main import PushTo3YourmindAPI
+
+
+__all__ = ["MigrationReport", "MigrationResult", "UserMigrator"]
+
+
+MigrationStatus = t.Literal["migrated", "skipped", "failed"]
+MigrationStep = t.Literal[
+    "create_user", "transfer_preferences", "transfer_addresses", "unexpected"
+]
+
+
+@dataclass
+class MigrationResult:
+    """
+    Attributes:
+        user_id: ID of the user in the origin platform
+        status: "skipped" if a user with the same email exists in the target
+            platform
+        target_user_id: ID of the user in the target platform
+        error: step the migration of the user failed at, "unexpected" for
+            errors outside of the steps, ex. an unexpected response
+        error_reason: message of the error
+    """
+
+    user_id: int
+    email: str
+    status: MigrationStatus = "migrated"
+    target_user_id: t.Optional[int] = None
+    error: t.Optional[MigrationStep] = None
+    error_reason: t.Optional[str] = None
+    duration: float = 0.0
+
+
+@dataclass
+class MigrationReport:
+    """
+    Attributes:
+        counts: number of users per status
+        failed_steps: number of failed users per step they failed at
+        pipeline: throughput of the run, per stage
+        log_path: JSON lines file with the result of every user
+    """
+
+    counts: t.Dict[str, int] = field(default_factory=dict)
+    failed_steps: t.Dict[str, int] = field(default_factory=dict)
+    pipeline: t.Optional[PipelineReport] = None
+    log_path: t.Optional[str] = None
+
+    @property
+    def failed(self) -> int:
+        return self.counts.get("failed", 0)
+
+    def format(self) -> str:
+        lines = [
+            ", ".join(f"{count} {status}" for status, count in self.counts.items())
+        ]
+        if self.failed_steps:
+            steps = self.failed_steps.items()
+            lines.append(
+                "failed at: " + ", ".join(f"{step} {count}" for step, count in steps)
+            )
+        if self.pipeline is not None:
+            lines.append(self.pipeline.format())
+        return "\n".join(lines)
+
+
+@dataclass
+class _Transfer:
+    user: types.ResponseDict
+    result: MigrationResult
+    started: float = field(default_factory=time.perf_counter)
+    done: bool = False
+
+
+class _ResultLog:
+    """
+    Appends results to a JSON lines file as users finish, and counts them
+    """
+
+    def __init__(self, path: t.Optional[str]):
+        self.path = path
+        self.report = MigrationReport(
+            counts={"migrated": 0, "skipped": 0, "failed": 0}, log_path=path
+        )
+        self._file = open(path, "w", encoding="utf-8") if path is not None else None
+        self._lock = threading.Lock()
+
+    def write(self, result: MigrationResult) -> None:
+        with self._lock:
+            self.report.counts[result.status] += 1
+            if result.error is not None:
+                steps = self.report.failed_steps
+                steps[result.error] = steps.get(result.error, 0) + 1
+            if self._file is not None:
+                self._file.write(json.dumps(asdict(result)) + "\n")
+                self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+class UserMigrator:
+    """
+    Creates every user of the origin organization in the target organization,
+    and copies their preferences and addresses:
+
+    >>> migrator = UserMigrator(origin_client, target_client, workers=16)
+    >>> report = migrator.migrate(log_path="migration.jsonl")
+    >>> print(report.format())
+
+    The emails of the target organization are listed before the migration, so
+    users who already have an account there are skipped without a request.
+    Users are read from the origin page by page, and created by `workers`
+    threads. The preferences and the addresses of a user are copied at the same
+    time, by a pool of `detail_workers` threads shared by all users.
+
+    The clients should have a connection pool for all workers, see
+    `pool_maxsize` of `PushTo3YourmindAPI`.
+    """
+
+    def __init__(
+        self,
+        origin: "PushTo3YourmindAPI",
+        target: "PushTo3YourmindAPI",
+        *,
+        workers: int = 8,
+        detail_workers: int = 16,
+        page_size: int = 100,
+        default_country: str = "US",
+    ):
+        """
+        Args:
+            origin: client of the platform to migrate users from
+            target: client of the platform to migrate users to
+            workers: number of users created at the same time, and number of
+                users whose details are copied at the same time
+            detail_workers: number of preferences and addresses copied at the
+                same time
+            page_size: users per page, when listing users
+            default_country: country set in the preferences of users who
+                have none, the target platform requires one
+        """
+        self.origin = origin
+        self.target = target
+        self.workers = workers
+        self.detail_workers = detail_workers
+        self.page_size = page_size
+        self.default_country = default_country
+        self._email_index: t.Dict[str, t.Optional[int]] = {}
+        self._index_lock = threading.Lock()
+
+    def build_email_index(self) -> t.Dict[str, t.Optional[int]]:
+        """
+        Map the emails of all users of the target organization, lowercase, to
+        their IDs
+        """
+
+        index = {
+            user["email"].lower(): user["id"]
+            for user in self.target.organization_panel.fetch_all_users(
+                page_size=self.page_size, max_workers=self.workers, ordered=False
+            )
+        }
+        logger.info(f"Target organization has {len(index)} users")
+        with self._index_lock:
+            self._email_index = index
+        return index
+
+    def _reserve_email(self, email: str) -> bool:
+        """
+        Claim an email for a user about to be created. False if a user with
+        the email exists in the target organization, or is being created for
+        another user of the origin.
+        """
+
+        key = email.lower()
+        with self._index_lock:
+            if key in self._email_index:
+                return False
+            self._email_index[key] = None
+            return True
+
+    def migrate(
+        self,
+        users: t.Optional[t.Iterable[types.ResponseDict]] = None,
+        *,
+        log_path: t.Optional[str] = None,
+    ) -> MigrationReport:
+        """
+        Migrate users, and write the result of every user to `log_path` as soon
+        as it is known.
+
+        Args:
+            users: users of the origin to migrate, all users of the origin
+                organization by default
+            log_path: JSON lines file the results are written to
+        """
+
+        self.build_email_index()
+        if users is None:
+            users = self.origin.organization_panel.fetch_all_users(
+                page_size=self.page_size, max_workers=2, ordered=False
+            )
+
+        result_log = _ResultLog(log_path)
+        detail_executor = ThreadPoolExecutor(
+            max_workers=self.detail_workers,
+            thread_name_prefix="push_to_3yourmind-migration",
+        )
+
+        def finish(transfer: _Transfer) -> None:
+            transfer.result.duration = time.perf_counter() - transfer.started
+            result_log.write(transfer.result)
+
+        def on_error(error: PipelineError) -> None:
+            # Errors other than API errors, ex. an unexpected response
+            transfer = error.item
+            transfer.result.status = "failed"
+            transfer.result.error = "unexpected"
+            transfer.result.error_reason = repr(error.error)
+            logger.warning(f"User(id={transfer.result.user_id}): {error.error!r}")
+            finish(transfer)
+
+        stages = [
+            Stage("create_user", self._create_user, workers=self.workers),
+            Stage(
+                "transfer_details",
+                lambda transfer: self._transfer_details(transfer, detail_executor),
+                workers=self.workers,
+            ),
+        ]
+        pipeline = Pipeline(stages, on_done=finish, on_error=on_error)
+        try:
+            transfers = (
+                _Transfer(user=user, result=MigrationResult(user["id"], user["email"]))
+                for user in users
+            )
+            pipeline_report = pipeline.run(transfers)
+        finally:
+            detail_executor.shutdown(wait=False, cancel_futures=True)
+            result_log.close()
+
+        report = result_log.report
+        report.pipeline = pipeline_report
+        logger.info(f"Migration finished: {report.counts}")
+        return report
+
+    def _fail(
+        self, transfer: _Transfer, step: MigrationStep, error: BaseException
+    ) -> _Transfer:
+        result = transfer.result
+        result.status = "failed"
+        result.error = step
+        result.error_reason = str(error)
+        transfer.done = True
+        logger.warning(f"User(id={result.user_id}): {step} failed: {str(error)[:256]}")
+        return transfer
+
+    def _create_user(self, transfer: _Transfer) -> _Transfer:
+        user = transfer.user
+        if not self._reserve_email(user["email"]):
+            transfer.result.status = "skipped"
+            transfer.result.error_reason = "Email already exists"
+            transfer.done = True
+            return transfer
+
+        try:
+            target_user = self.target.organization_panel.create_user(
+                email=user["email"],
+                first_name=user["firstName"],
+                last_name=user["lastName"],
+            )
+        except Exception as exc:
+            with self._index_lock:
+                self._email_index.pop(user["email"].lower(), None)
+            return self._fail(transfer, "create_user", exc)
+
+        transfer.result.target_user_id = target_user["id"]
+        with self._index_lock:
+            self._email_index[user["email"].lower()] = target_user["id"]
+        return transfer
+
+    def _transfer_details(
+        self, transfer: _Transfer, executor: ThreadPoolExecutor
+    ) -> _Transfer:
+        if transfer.done:
+            return transfer
+
+        transfer_preferences = bind_context(self._transfer_preferences)
+        preferences = executor.submit(transfer_preferences, transfer)
+        try:
+            self._transfer_addresses(transfer, executor)
+        except Exception as exc:
+            wait([preferences])
+            return self._fail(transfer, "transfer_addresses", exc)
+        try:
+            preferences.result()
+        except Exception as exc:
+            return self._fail(transfer, "transfer_preferences", exc)
+        return transfer
+
+    def _transfer_preferences(self, transfer: _Transfer) -> None:
+        preferences = self.origin.organization_panel.get_user_preferences(
+            user_id=transfer.result.user_id
+        )
+        if preferences["country"] is None:
+            preferences["country"] = self.default_country
+        self.target.organization_panel.update_user_preferences(
+            user_id=transfer.result.target_user_id, **preferences
+        )
+
+    def _transfer_addresses(
+        self, transfer: _Transfer, executor: ThreadPoolExecutor
+    ) -> None:
+        addresses = self.origin.organization_panel.get_user_addresses(
+            user_id=transfer.result.user_id
+        )
+        if not addresses:
+            return
+        default_address_id = transfer.user.get("defaultAddressId")
+        if default_address_id:
+            addresses = sorted(
+                addresses, key=lambda address: abs(address["id"] - default_address_id)
+            )
+
+        def create_address(address: types.ResponseDict) -> None:
+            self.target.organization_panel.create_user_address(
+                user_id=transfer.result.target_user_id,
+                city=address["city"],
+                country=address["country"],
+                first_name=address["firstName"],
+                last_name=address["lastName"],
+                line1=address["line1"],
+                phone_number=address["phoneNumber"],
+                zip_code=address["zipCode"],
+                company_name=address["companyName"],
+                department=address["department"],
+                line2=address["line2"],
+                state=address["state"],
+                title=address["title"],
+                vat_id=address["vatId"],
+            )
+
+        # The first address of a user becomes their default address, the
+        # others are created once it exists
+        failed_addresses = []
+        try:
+            create_address(addresses[0])
+        except Exception as exc:
+            failed_addresses.append((addresses[0]["id"], exc))
+        futures: t.List[t.Tuple[int, Future]] = [
+            (address["id"], executor.submit(bind_context(create_address), address))
+            for address in addresses[1:]
+        ]
+        for address_id, future in futures:
+            try:
+                future.result()
+            except Exception as exc:
+                failed_addresses.append((address_id, exc))
+
+        if failed_addresses:
+            raise exceptions.AddressTransferError(
+                "Transfer of addresses failed for addresses with ids "
+                + ", ".join(
+                    f"{address_id} ({exc})" for address_id, exc in failed_addresses
+                )
+            )
@@ -1,28 +1,136 @@
+import contextlib
+import io
 from io import IOBase, BytesIO
-
-import requests
+import os
+import typing as t
+import urllib.parse
+import warnings
 
 from push_to_3yourmind import types, exceptions
+from push_to_3yourmind.multipart import get_stream_length
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+
+DOWNLOAD_TIMEOUT = (10, 60)  # seconds to connect, seconds between received bytes
+DEFAULT_DOWNLOAD_FILE_NAME = "originalFile.stl"
+
+
+def get_download_file_name(
+    url: str, content_disposition: t.Optional[str] = None
+) -> str:
+    """
+    File name of a download, taken from Content-Disposition header or the URL path
+    """
+
+    if content_disposition:
+        import email.message
+
+        message = email.message.Message()
+        message["Content-Disposition"] = content_disposition
+        filename = message.get_filename()
+        if filename:
+            return os.path.basename(filename)
+    path = urllib.parse.unquote(urllib.parse.urlparse(url).path)
+    return os.path.basename(path) or DEFAULT_DOWNLOAD_FILE_NAME
+
+
+def get_download_length(headers: t.Mapping[str, str]) -> t.Optional[int]:
+    """
+    Length of the decoded download body, if the server tells it
+    """
+
+    if headers.get("Content-Encoding", "identity") != "identity":
+        return None
+    try:
+        return int(headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+
+
+class DownloadStream(io.RawIOBase):
+    """
+    Read-only, non-seekable stream over the body of a streamed `requests` response.
+    `len` is the body length if known, it is used to set the Content-Length of the
+    upload.
+    """
+
+    def __init__(self, response: "requests.Response"):
+        self._raw = response.raw
+        self._raw.decode_content = True
+        self.name = get_download_file_name(
+            response.url, response.headers.get("Content-Disposition")
+        )
+        self.len = get_download_length(response.headers)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
 
+def get_file_name(file: t.IO, default: str = "file") -> str:
+    name = getattr(file, "name", None)
+    if isinstance(name, str) and name:
+        return os.path.basename(name)
+    return default
 
-def extract_file_content(file: types.CadFileSpecifier) -> BytesIO:
+
+def get_file_size(file: types.CadFileSpecifier) -> t.Optional[int]:
+    """
+    Size in bytes of a file to be uploaded, None if it is not known before the upload
+    """
+
+    if isinstance(file, str) and file.startswith("http"):
+        return None
     if isinstance(file, str):
-        if file.startswith("http"):
-            response = requests.get(file)
+        try:
+            return os.path.getsize(file)
+        except OSError:
+            return None
+    if isinstance(file, IOBase):
+        return get_stream_length(file)
+    return None
+
+
+@contextlib.contextmanager
+def open_file(
+    file: types.CadFileSpecifier,
+    session: t.Optional["requests.Session"] = None,
+) -> t.Iterator[t.Tuple[str, t.IO[bytes]]]:
+    """
+    Open a file to be uploaded without reading it into memory. Yields the file name
+    and a binary stream. Local files and downloads are closed on exit, file-like
+    objects passed by the caller are left open.
+
+    A URL is downloaded through `session`, and its body is streamed as it arrives.
+    The file name comes from the Content-Disposition header or the URL path.
+    """
+
+    if isinstance(file, str) and file.startswith("http"):
+        import requests
+
+        response = (session or requests).get(file, stream=True, timeout=DOWNLOAD_TIMEOUT)
+        with response:
             if response.status_code != 200:
                 raise exceptions.CADFileNotFoundError(response.content)
-            extracted_file_contents = BytesIO(response.content)
-            extracted_file_contents.name = "originalFile.stl"
-        else:
-            try:
-                with open(file, "rb") as cad_file_obj:
-                    extracted_file_contents = BytesIO(cad_file_obj.read())
-                    extracted_file_contents.name = cad_file_obj.name
-            except IOError as exc:
-                raise exceptions.CADFileNotFoundError from exc
+            stream = DownloadStream(response)
+            yield stream.name, stream
+
+    elif isinstance(file, str):
+        try:
+            file_obj = open(file, "rb")
+        except IOError as exc:
+            raise exceptions.CADFileNotFoundError from exc
+        with file_obj:
+            yield get_file_name(file_obj), file_obj
 
     elif isinstance(file, IOBase):
-        extracted_file_contents = file
+        yield get_file_name(file), file
 
     else:
         raise exceptions.BadArgument(
@@ -30,4 +138,24 @@ def extract_file_content(file: types.CadFileSpecifier) -> BytesIO:
             "or a file-like object"
         )
 
-    return extracted_file_contents
+
+def extract_file_content(
+    file: types.CadFileSpecifier,
+    session: t.Optional["requests.Session"] = None,
+) -> BytesIO:
+    """
+    Deprecated, reads a whole file into memory. Use `open_file` to stream it.
+    File-like objects are returned as they are.
+    """
+
+    warnings.warn(
+        "extract_file_content is deprecated, use open_file",
+        DeprecationWarning,
+        stacklevel=2,
+    )
+    if isinstance(file, IOBase):
+        return file
+    with open_file(file, session) as (filename, stream):
+        content = BytesIO(stream.read())
+    content.name = filename
+    return content
@@ -0,0 +1,161 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import json
+
+import pytest
+
+from push_to_3yourmind import PushTo3YourmindAPI, exceptions
+from push_to_3yourmind.cassette import Cassette, Exchange, get_request_key
+
+
+BASE_URL = "https://example.com"
+
+
+def test_key_ignores_query_order_and_method_case():
+    assert get_request_key("get", "https://example.com/users/?b=2&a=1") == (
+        "GET example.com/users/?a=1&b=2"
+    )
+
+
+def test_key_tells_hosts_apart():
+    assert get_request_key("GET", "https://a.example.com/users/") != (
+        get_request_key("GET", "https://b.example.com/users/")
+    )
+
+
+def test_key_hashes_normalized_json_body():
+    url = "https://example.com/users/"
+    key = get_request_key("POST", url, b'{"email":"a@example.com","admin":true}')
+    reordered = '{"admin": true, "email": "a@example.com"}'
+    other = b'{"email":"b@example.com","admin":true}'
+
+    assert key.startswith("POST example.com/users/ #")
+    assert key == get_request_key("POST", url, reordered)
+    assert key != get_request_key("POST", url, other)
+    assert get_request_key("POST", url, b"") == "POST example.com/users/"
+
+
+def test_exchange_round_trip():
+    exchanges = [
+        Exchange("GET example.com/", 0, 200, {"Content-Type": "text/html"}, b"ok", 0.5),
+        Exchange("GET example.com/file/", None, 200, {}, b"\xff\x00", 0.1),
+    ]
+
+    for exchange in exchanges:
+        assert Exchange.from_json(exchange.to_json()) == exchange
+
+
+@pytest.fixture
+def client():
+    client = PushTo3YourmindAPI(access_token="token", base_url=BASE_URL)
+    yield client
+    client.close()
+
+
+def create_user_exchange(client, email: str, user_id: int) -> Exchange:
+    url = client.user_panel._get_url("users/")
+    return Exchange(
+        key=get_request_key("POST", url, json.dumps({"email": email})),
+        request_bytes=None,
+        status_code=201,
+        headers={"Content-Type": "application/json"},
+        body=json.dumps({"id": user_id, "email": email}).encode(),
+        duration=0.01,
+    )
+
+
+@pytest.fixture
+def cassette_path(tmp_path, client):
+    path = tmp_path / "cassette.jsonl.gz"
+    with Cassette(str(path), mode="record") as cassette:
+        for user_id in range(20):
+            email = f"{user_id}@example.com"
+            cassette.add(create_user_exchange(client, email, user_id))
+        url = client.user_panel._get_url("my-profile/preferences/")
+        for unit in ("mm", "inch"):
+            cassette.add(
+                Exchange(
+                    key=get_request_key("GET", url),
+                    request_bytes=0,
+                    status_code=200,
+                    headers={"Content-Type": "application/json"},
+                    body=json.dumps({"unit": unit}).encode(),
+                    duration=0.01,
+                )
+            )
+    return path
+
+
+def test_replay_matches_requests_by_body(cassette_path):
+    cassette = Cassette(str(cassette_path), mode="replay")
+    client = PushTo3YourmindAPI(
+        access_token="token", base_url=BASE_URL, cassette=cassette, pool_maxsize=8
+    )
+
+    def create_user(user_id: int) -> dict:
+        return client.user_panel._request(
+            "POST", "users/", json={"email": f"{user_id}@example.com"}
+        )
+
+    # Replayed in another order than recorded, and concurrently
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        users = list(executor.map(create_user, reversed(range(20))))
+
+    assert [user["id"] for user in users] == list(reversed(range(20)))
+    client.close()
+
+
+def test_replay_repeats_last_response_once_used_up(cassette_path):
+    cassette = Cassette(str(cassette_path), mode="replay")
+    client = PushTo3YourmindAPI(
+        access_token="token", base_url=BASE_URL, cassette=cassette
+    )
+
+    units = [client.my_profile.get_preferences()["unit"] for _ in range(3)]
+
+    assert units == ["mm", "inch", "inch"]
+    client.close()
+
+
+def test_unrecorded_request_is_rejected(cassette_path):
+    cassette = Cassette(str(cassette_path), mode="replay")
+    client = PushTo3YourmindAPI(
+        access_token="token", base_url=BASE_URL, cassette=cassette
+    )
+
+    with pytest.raises(exceptions.UnrecordedRequest):
+        client.user_panel._request("POST", "users/", json={"email": "new@example.com"})
+    client.close()
+
+
+def test_cassette_of_other_version_is_rejected(tmp_path):
+    path = tmp_path / "cassette.jsonl.gz"
+    with gzip.open(path, "wt") as cassette_file:
+        cassette_file.write(json.dumps({"version": 1}) + "\n")
+
+    with pytest.raises(exceptions.BadArgument):
+        Cassette(str(path), mode="replay")
+
+
+def test_async_replay_matches_requests_by_body(cassette_path):
+    pytest.importorskip("httpx")
+    from push_to_3yourmind.aio import AsyncPushTo3YourmindAPI
+
+    async def create_users() -> list:
+        cassette = Cassette(str(cassette_path), mode="replay")
+        async with AsyncPushTo3YourmindAPI(
+            access_token="token", base_url=BASE_URL, cassette=cassette
+        ) as client:
+            return await asyncio.gather(
+                *(
+                    client.user_panel._request(
+                        "POST", "users/", json={"email": f"{user_id}@example.com"}
+                    )
+                    for user_id in reversed(range(20))
+                )
+            )
+
+    users = asyncio.run(create_users())
+
+    assert [user["id"] for user in users] == list(reversed(range(20)))
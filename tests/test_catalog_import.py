@@ -0,0 +1,161 @@
+import pytest
+
+from benchmarks.run import write_cube_stl
+from benchmarks.server import StandInServer
+from push_to_3yourmind import PushTo3YourmindAPI, exceptions, td
+from push_to_3yourmind.catalog_import import CatalogImporter
+from push_to_3yourmind.journal import JobJournal
+from push_to_3yourmind.pipeline import Pipeline, Stage
+from push_to_3yourmind.polling import FileStatusPoller
+
+
+def test_pipeline_runs_items_through_stages():
+    errors = []
+
+    def check(item: int) -> int:
+        if item == 3:
+            raise ValueError("bad item")
+        return item
+
+    report = Pipeline(
+        [Stage("check", check), Stage("double", lambda item: item * 2, workers=2)],
+        on_error=errors.append,
+    ).run(range(10))
+
+    assert (report.items, report.completed, report.failed) == (10, 9, 1)
+    assert [(error.item, error.stage) for error in errors] == [(3, "check")]
+    assert [stage.processed for stage in report.stages] == [10, 9]
+    assert [stage.failed for stage in report.stages] == [1, 0]
+
+
+def test_bottleneck_leaves_out_waiting_stages():
+    report = Pipeline(
+        [
+            Stage("wait", lambda item: item, waiting=True),
+            Stage("work", lambda item: item),
+        ]
+    ).run(range(5))
+    report.stages[0].utilization, report.stages[1].utilization = 0.9, 0.2
+
+    assert report.bottleneck == "work"
+
+
+@pytest.fixture
+def server():
+    with StandInServer(analysis_polls=1) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    client = PushTo3YourmindAPI(
+        access_token="token",
+        base_url=server.url,
+        file_status_poller=FileStatusPoller(min_interval=0.01, max_interval=0.02),
+    )
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def rows(tmp_path):
+    cad_file = tmp_path / "cube.stl"
+    write_cube_stl(cad_file)
+    return [{"file": str(cad_file), "product_id": index} for index in range(6)]
+
+
+@pytest.fixture
+def journal(tmp_path):
+    with JobJournal(tmp_path / "journal.sqlite3", job_id="catalog.csv") as journal:
+        yield journal
+
+
+def mapper(row: dict) -> td.CatalogItemConfig:
+    return td.CatalogItemConfig(cad_file=row["file"], product_id=row["product_id"])
+
+
+@pytest.fixture
+def deleted_baskets(client, monkeypatch):
+    deleted = []
+    monkeypatch.setattr(
+        client.user_panel,
+        "delete_basket",
+        lambda *, basket_id: deleted.append(basket_id),
+    )
+    return deleted
+
+
+def test_import_creates_catalog_items(client, journal, rows, deleted_baskets):
+    report = CatalogImporter(client, journal=journal).run(rows, mapper)
+
+    assert report.errors == {}
+    assert report.stage_counts["attachments_done"] == len(rows)
+    assert deleted_baskets == [report.basket_id]
+
+
+def test_rerun_skips_imported_rows(client, journal, rows, deleted_baskets):
+    CatalogImporter(client, journal=journal).run(rows[:4], mapper)
+
+    report = CatalogImporter(client, journal=journal).run(rows, mapper)
+
+    assert report.skipped == 4
+    assert report.pipeline.completed == 2
+    assert report.stage_counts["attachments_done"] == len(rows)
+
+
+def test_dry_run_stops_at_configured_lines_and_keeps_basket(
+    client, journal, rows, deleted_baskets
+):
+    dry_run = CatalogImporter(client, journal=journal, dry_run=True).run(rows, mapper)
+
+    assert dry_run.stage_counts["line_configured"] == len(rows)
+    assert deleted_baskets == []
+
+    report = CatalogImporter(client, journal=journal).run(rows, mapper)
+
+    assert report.basket_id == dry_run.basket_id
+    assert report.stage_counts["attachments_done"] == len(rows)
+
+
+def test_basket_is_kept_until_all_rows_are_imported(
+    client, journal, rows, deleted_baskets
+):
+    CatalogImporter(client, journal=journal, dry_run=True).run(rows, mapper)
+
+    report = CatalogImporter(client, journal=journal).run(rows[:2], mapper)
+
+    assert report.stage_counts["line_configured"] == len(rows) - 2
+    assert deleted_baskets == []
+
+
+def test_rows_start_over_in_new_basket_once_basket_was_deleted(
+    client, journal, rows, deleted_baskets
+):
+    dry_run = CatalogImporter(client, journal=journal, dry_run=True).run(rows, mapper)
+    CatalogImporter(client, journal=journal).run(rows[:2], mapper)
+    journal.set_meta("basket_deleted", True)
+
+    report = CatalogImporter(client, journal=journal).run(rows, mapper)
+
+    assert report.basket_id != dry_run.basket_id
+    assert report.skipped == 2
+    assert report.pipeline.completed == len(rows) - 2
+    assert report.stage_counts["attachments_done"] == len(rows)
+    assert deleted_baskets == [report.basket_id]
+
+
+def test_failed_analysis_is_not_recorded_as_analysed(client, journal, rows):
+    check_status = client.user_panel.check_uploaded_file_status
+
+    def check_uploaded_file_status(**kwargs):
+        if kwargs["line_id"] == journal.get("2").data["line_id"]:
+            raise exceptions.FileAnalysisError("failed")
+        return check_status(**kwargs)
+
+    client.user_panel.check_uploaded_file_status = check_uploaded_file_status
+
+    report = CatalogImporter(client, journal=journal, dry_run=True).run(rows, mapper)
+
+    assert list(report.errors) == ["2"]
+    assert journal.get("2").stage == "uploaded"
+    assert report.stage_counts["line_configured"] == len(rows) - 1
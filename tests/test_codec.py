@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+import datetime
+import decimal
+import json
+
+import pytest
+
+from push_to_3yourmind.codec import JSONCodec, OrjsonCodec, get_default_json_codec
+
+
+@dataclass
+class Price:
+    amount: decimal.Decimal
+    currency: str
+
+
+@pytest.fixture(params=[JSONCodec, OrjsonCodec], ids=lambda codec: codec.__name__)
+def codec(request):
+    if request.param is OrjsonCodec:
+        pytest.importorskip("orjson")
+    return request.param()
+
+
+def test_round_trip(codec):
+    value = {"name": "Cube", "quantity": 3, "scale": 1.5, "tags": ["a", None, True]}
+
+    assert codec.loads(codec.dumps(value)) == value
+
+
+def test_non_ascii_text_is_kept(codec):
+    assert codec.dumps({"name": "Würfel"}) == '{"name":"Würfel"}'.encode()
+
+
+def test_decimals_are_numbers_with_all_digits(codec):
+    value = {
+        "amount": decimal.Decimal("10.10"),
+        "amounts": [decimal.Decimal("0.1"), decimal.Decimal("1E+3")],
+        "precise": decimal.Decimal("12345678901234567890.123456789"),
+    }
+
+    data = codec.dumps(value)
+
+    assert data == (
+        b'{"amount":10.10,"amounts":[0.1,1000],'
+        b'"precise":12345678901234567890.123456789}'
+    )
+    assert json.loads(data, parse_float=decimal.Decimal) == value
+
+
+def test_strings_looking_like_placeholders_are_kept(codec):
+    data = codec.dumps({"amount": decimal.Decimal("1.5"), "note": "0000:0"})
+
+    assert json.loads(data)["note"] == "0000:0"
+
+
+def test_non_finite_decimals_are_rejected(codec):
+    with pytest.raises(TypeError):
+        codec.dumps({"amount": decimal.Decimal("NaN")})
+
+
+def test_dates_and_dataclasses(codec):
+    value = {
+        "due": datetime.date(2024, 5, 17),
+        "at": datetime.datetime(2024, 5, 17, 8, 30),
+        "price": Price(amount=decimal.Decimal("9.99"), currency="EUR"),
+    }
+
+    assert json.loads(codec.dumps(value)) == {
+        "due": "2024-05-17",
+        "at": "2024-05-17T08:30:00",
+        "price": {"amount": 9.99, "currency": "EUR"},
+    }
+
+
+def test_non_string_keys_are_converted(codec):
+    assert json.loads(codec.dumps({1: "a", None: "b"})) == {"1": "a", "null": "b"}
+
+
+def test_unsupported_values_are_rejected(codec):
+    with pytest.raises(TypeError):
+        codec.dumps({"value": object()})
+
+
+def test_codecs_encode_the_same_way():
+    pytest.importorskip("orjson")
+    value = {
+        "amount": decimal.Decimal("10.10"),
+        "due": datetime.date(2024, 5, 17),
+        "lines": [{"id": 1, "price": Price(decimal.Decimal("1"), "USD")}],
+    }
+
+    assert JSONCodec().dumps(value) == OrjsonCodec().dumps(value)
+
+
+def test_default_codec_is_orjson_when_installed():
+    pytest.importorskip("orjson")
+    assert isinstance(get_default_json_codec(), OrjsonCodec)
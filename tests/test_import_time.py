@@ -0,0 +1,8 @@
+from benchmarks import import_time
+
+
+def test_import_stays_within_budget():
+    result = import_time.measure(runs=3)
+
+    assert result["loaded_deferred_modules"] == []
+    assert result["best_ms"] <= import_time.DEFAULT_BUDGET_MS
@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+from push_to_3yourmind.journal import STAGES, JobJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    with JobJournal(tmp_path / "journal.sqlite3", job_id="catalog.csv") as journal:
+        yield journal
+
+
+def test_unknown_item_has_no_stage(journal):
+    entry = journal.get("row-1")
+
+    assert entry.stage is None
+    assert not entry.has_reached("mapped")
+
+
+def test_stages_only_move_forward(journal):
+    journal.record("row-1", "uploaded", line_id=4)
+    entry = journal.record("row-1", "line_created")
+
+    assert entry.stage == "uploaded"
+    assert entry.has_reached("line_created")
+    assert entry.has_reached("uploaded")
+    assert not entry.has_reached("analysed")
+    assert journal.get("row-1").stage == "uploaded"
+
+
+def test_data_is_merged(journal):
+    journal.record("row-1", "line_created", line_id=4)
+    journal.record("row-1", "catalog_item_created", catalog_item_id=8)
+
+    assert journal.get("row-1").data == {"line_id": 4, "catalog_item_id": 8}
+
+
+def test_error_is_kept_until_next_stage(journal):
+    journal.record("row-1", "uploaded", line_id=4)
+    journal.record_error("row-1", ValueError("analysis failed"))
+    journal.record_error("row-2", "bad row")
+
+    failed = journal.get("row-1")
+    assert (failed.stage, failed.error) == ("uploaded", "analysis failed")
+    assert journal.get("row-2").stage is None
+    assert {entry.key for entry in journal.iter_entries(failed=True)} == {
+        "row-1",
+        "row-2",
+    }
+    assert journal.record("row-1", "analysed").error is None
+    assert journal.get("row-1").error is None
+
+
+def test_stage_counts(journal):
+    journal.record("row-1", "attachments_done")
+    journal.record("row-2", "attachments_done")
+    journal.record("row-3", "line_configured")
+    journal.record_error("row-4", "bad row")
+
+    counts = journal.get_stage_counts()
+
+    assert list(counts) == ["pending", *STAGES, "failed"]
+    assert counts["attachments_done"] == 2
+    assert counts["line_configured"] == 1
+    assert counts["pending"] == 1
+    assert counts["failed"] == 1
+
+
+def test_reset_before_starts_unfinished_items_over(journal):
+    journal.record("row-1", "line_configured", line_id=4)
+    journal.record("row-2", "catalog_item_created", line_id=5, catalog_item_id=9)
+    journal.record_error("row-3", "bad row")
+
+    assert journal.reset_before("catalog_item_created") == 2
+
+    assert journal.get("row-1").stage is None
+    assert journal.get("row-1").data == {}
+    assert journal.get("row-3").error is None
+    assert journal.get("row-2").stage == "catalog_item_created"
+    assert journal.get("row-2").data == {"line_id": 5, "catalog_item_id": 9}
+
+
+def test_jobs_and_meta_are_separate(tmp_path):
+    path = tmp_path / "journal.sqlite3"
+    with JobJournal(path, job_id="a") as first, JobJournal(path, job_id="b") as second:
+        first.record("row-1", "mapped")
+        first.set_meta("basket_id", 3)
+
+        assert second.get("row-1").stage is None
+        assert second.get_meta("basket_id") is None
+        assert first.get_meta("basket_id") == 3
+
+
+def test_progress_survives_reopening(tmp_path):
+    path = tmp_path / "journal.sqlite3"
+    with JobJournal(path) as journal:
+        journal.record("row-1", "uploaded", line_id=4)
+
+    with JobJournal(path) as journal:
+        assert journal.get("row-1").stage == "uploaded"
+        assert journal.get("row-1").data == {"line_id": 4}
+
+
+def test_journal_is_shared_by_threads(journal):
+    def record(thread_number: int) -> None:
+        for row in range(50):
+            journal.record(f"{thread_number}-{row}", "mapped")
+
+    threads = [threading.Thread(target=record, args=(number,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert journal.get_stage_counts()["mapped"] == 400
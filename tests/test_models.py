@@ -0,0 +1,95 @@
+import pytest
+
+from push_to_3yourmind import PushTo3YourmindAPI
+from push_to_3yourmind.models import (
+    Address,
+    Basket,
+    BasketLine,
+    Order,
+    User,
+    _Encoded,
+    from_list,
+)
+
+
+ORDER = {
+    "id": 5,
+    "number": "O-5",
+    "status": "new",
+    "lines": [{"id": 1, "quantity": 2, "product": {"id": 7}}],
+    "shippingAddress": {"id": 9, "city": "Berlin", "zipCode": "10115"},
+    "totalPrice": {"inclusiveTax": "12.50", "currency": "EUR"},
+    "trackingCode": "XYZ",
+}
+
+
+def test_keys_are_snake_case_attributes():
+    user = User.from_dict({"id": 1, "firstName": "Ada", "isActive": True})
+
+    assert (user.id, user.first_name, user.is_active) == (1, "Ada", True)
+
+
+def test_missing_keys_read_as_none_and_unknown_keys_are_extra():
+    order = Order.from_dict(ORDER)
+
+    assert order.created is None
+    assert order.billing_address is None
+    assert order.extra == {"trackingCode": "XYZ"}
+    with pytest.raises(AttributeError):
+        order.tracking_code
+
+
+def test_models_have_no_dict():
+    assert not hasattr(Address.from_dict({"id": 1}), "__dict__")
+
+
+def test_nested_fields_are_decoded_on_first_access():
+    order = Order.from_dict(ORDER)
+
+    assert isinstance(object.__getattribute__(order, "_lines"), _Encoded)
+    line = order.lines[0]
+    assert isinstance(line, BasketLine)
+    assert (line.quantity, line.product) == (2, {"id": 7})
+    assert order.lines[0] is line
+    assert isinstance(order.shipping_address, Address)
+    assert order.shipping_address.zip_code == "10115"
+    assert order.total_price == {"inclusiveTax": "12.50", "currency": "EUR"}
+
+
+def test_raw_rebuilds_the_response():
+    order = Order.from_dict(ORDER)
+
+    assert order.raw == ORDER
+    order.lines
+    assert order.raw == ORDER
+
+
+def test_models_are_equal_by_content():
+    assert Order.from_dict(ORDER) == Order.from_dict(dict(ORDER))
+    assert Order.from_dict(ORDER) != Order.from_dict({**ORDER, "status": "paid"})
+
+
+def test_from_list():
+    baskets = from_list(Basket, [{"id": 1, "lines": []}, {"id": 2}])
+
+    assert [basket.id for basket in baskets] == [1, 2]
+    assert baskets[0].lines == []
+    assert baskets[1].lines is None
+
+
+def test_getters_return_models_on_request(monkeypatch):
+    client = PushTo3YourmindAPI(access_token="token", base_url="https://example.com")
+
+    def request(self, method, path, **kwargs):
+        if path == "my-profile/addresses/":
+            return [ORDER["shippingAddress"]]
+        return ORDER
+
+    monkeypatch.setattr(type(client.user_panel), "_request", request)
+    monkeypatch.setattr(type(client.my_profile), "_request", request)
+
+    assert isinstance(client.user_panel.get_order(order_id=5, as_model=True), Order)
+    assert client.user_panel.get_order(order_id=5) == ORDER
+    addresses = client.my_profile.get_addresses(as_models=True)
+    assert [address.city for address in addresses] == ["Berlin"]
+    client.close()
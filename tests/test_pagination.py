@@ -0,0 +1,130 @@
+import asyncio
+import threading
+
+from push_to_3yourmind.pagination import (
+    afetch_all_records,
+    aiter_records,
+    fetch_all_records,
+    iter_records,
+)
+
+
+PAGE_SIZE = 3
+TOTAL_PAGES = 4
+
+
+def get_page(page_number: int) -> dict:
+    first = (page_number - 1) * PAGE_SIZE
+    return {
+        "currentPage": page_number,
+        "totalPages": TOTAL_PAGES,
+        "results": [{"id": id_} for id_ in range(first, first + PAGE_SIZE)],
+    }
+
+
+async def aget_page(page_number: int) -> dict:
+    # Later pages arrive first, to check ordering
+    await asyncio.sleep(0.01 * (TOTAL_PAGES - page_number))
+    return get_page(page_number)
+
+
+ALL_IDS = list(range(PAGE_SIZE * TOTAL_PAGES))
+
+
+def collect(records) -> list:
+    return [record["id"] for record in records]
+
+
+async def acollect(records) -> list:
+    return [record["id"] async for record in records]
+
+
+def test_iter_records_walks_all_pages():
+    assert collect(iter_records(get_page)) == ALL_IDS
+    assert collect(iter_records(get_page, prefetch=False)) == ALL_IDS
+
+
+def test_iter_records_of_empty_result():
+    def get_empty_page(page_number: int) -> dict:
+        return {"currentPage": 1, "totalPages": 0, "results": []}
+
+    assert list(iter_records(get_empty_page)) == []
+
+
+def test_iter_records_prefetches_next_page():
+    requested = []
+    second_page_requested = threading.Event()
+
+    def get_recorded_page(page_number: int) -> dict:
+        requested.append(page_number)
+        if page_number == 2:
+            second_page_requested.set()
+        return get_page(page_number)
+
+    records = iter_records(get_recorded_page)
+    next(records)
+
+    assert second_page_requested.wait(1)
+    assert requested == [1, 2]
+    records.close()
+
+
+def test_iter_records_stops_requesting_when_closed():
+    requested = []
+
+    def get_recorded_page(page_number: int) -> dict:
+        requested.append(page_number)
+        return get_page(page_number)
+
+    records = iter_records(get_recorded_page, prefetch=False)
+    next(records)
+    records.close()
+
+    assert requested == [1]
+
+
+def test_iter_records_converts_records():
+    records = iter_records(get_page, convert=lambda record: record["id"] * 2)
+
+    assert list(records) == [id_ * 2 for id_ in ALL_IDS]
+
+
+def test_fetch_all_records_in_order():
+    assert collect(fetch_all_records(get_page, max_workers=2)) == ALL_IDS
+
+
+def test_fetch_all_records_unordered():
+    records = fetch_all_records(get_page, max_workers=3, ordered=False)
+
+    assert sorted(collect(records)) == ALL_IDS
+
+
+def test_fetch_all_records_bounds_pages_ahead():
+    requested = []
+    total_pages = 20
+
+    def get_recorded_page(page_number: int) -> dict:
+        requested.append(page_number)
+        return {**get_page(page_number), "totalPages": total_pages}
+
+    records = fetch_all_records(get_recorded_page, max_workers=2)
+    next(records)
+
+    # The first page, plus at most 2 * max_workers pages ahead
+    assert len(requested) <= 5
+    assert len(list(records)) == PAGE_SIZE * total_pages - 1
+
+
+def test_aiter_records_walks_all_pages():
+    assert asyncio.run(acollect(aiter_records(aget_page))) == ALL_IDS
+    assert asyncio.run(acollect(aiter_records(aget_page, prefetch=False))) == ALL_IDS
+
+
+def test_afetch_all_records():
+    ordered = afetch_all_records(aget_page, max_workers=3)
+    unordered = afetch_all_records(aget_page, max_workers=3, ordered=False)
+
+    assert asyncio.run(acollect(ordered)) == ALL_IDS
+    ids = asyncio.run(acollect(unordered))
+    assert sorted(ids) == ALL_IDS
+    assert ids != ALL_IDS
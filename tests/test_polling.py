@@ -0,0 +1,105 @@
+from concurrent.futures import CancelledError
+import threading
+
+import pytest
+
+from push_to_3yourmind import PushTo3YourmindAPI, exceptions
+from push_to_3yourmind.polling import MEGABYTE, FileStatusPoller
+
+
+@pytest.fixture
+def poller():
+    poller = FileStatusPoller(min_interval=0.001, max_interval=0.01, timeout=5)
+    yield poller
+    poller.close()
+
+
+def iter_statuses(*statuses: str):
+    statuses = iter(statuses)
+    return lambda: next(statuses)
+
+
+def test_interval_grows_with_file_size_and_attempts():
+    poller = FileStatusPoller(
+        min_interval=0.5, max_interval=10, backoff_factor=2, seconds_per_megabyte=0.5
+    )
+
+    assert poller.get_interval(0) == 0.5
+    assert poller.get_interval(2) == 2
+    assert poller.get_interval(0, 3 * MEGABYTE) == 2
+    assert poller.get_interval(10) == 10
+
+
+def test_timeout_grows_with_file_size():
+    poller = FileStatusPoller(timeout=60, timeout_per_megabyte=5)
+
+    assert poller.get_timeout() == 60
+    assert poller.get_timeout(2 * MEGABYTE) == 70
+
+
+def test_future_resolves_once_analysis_is_finished(poller):
+    get_status = iter_statuses("analysing", "analysing", "finished")
+
+    assert poller.submit(get_status).result(timeout=1) is None
+
+
+def test_failed_analysis(poller):
+    future = poller.submit(iter_statuses("analysing", "failed"))
+
+    with pytest.raises(exceptions.FileAnalysisError):
+        future.result(timeout=1)
+
+
+def test_analysis_times_out_at_deadline(poller):
+    future = poller.submit(lambda: "analysing", timeout=0.05)
+
+    with pytest.raises(exceptions.FileAnalysisTimeout):
+        future.result(timeout=1)
+
+
+def test_status_request_error_is_raised(poller):
+    def get_status():
+        raise exceptions.ServerError("down")
+
+    with pytest.raises(exceptions.ServerError):
+        poller.submit(get_status).result(timeout=1)
+
+
+def test_many_files_are_polled_from_one_scheduler(poller):
+    futures = [
+        poller.submit(iter_statuses("analysing", "finished")) for _ in range(50)
+    ]
+
+    for future in futures:
+        future.result(timeout=1)
+    scheduler_threads = [
+        thread
+        for thread in threading.enumerate()
+        if thread.name == "push_to_3yourmind-file-status"
+    ]
+    assert len(scheduler_threads) == 1
+
+
+def test_close_cancels_pending_analyses():
+    poller = FileStatusPoller(min_interval=10)
+    future = poller.submit(lambda: "analysing")
+
+    poller.close()
+
+    with pytest.raises(CancelledError):
+        future.result(timeout=1)
+    with pytest.raises(RuntimeError):
+        poller.submit(lambda: "finished")
+
+
+def test_deprecated_attributes_set_the_timeout():
+    client = PushTo3YourmindAPI(access_token="token", base_url="https://example.com")
+    user_panel = client.user_panel
+
+    assert user_panel._get_file_status_timeout(None) is None
+    user_panel.CHECK_FILE_STATUS_MAX_ATTEMPTS = 4
+    user_panel.CHECK_FILE_STATUS_DELAY = 0.25
+    with pytest.warns(DeprecationWarning):
+        assert user_panel._get_file_status_timeout(None) == 1
+    assert user_panel._get_file_status_timeout(3) == 3
+    client.close()
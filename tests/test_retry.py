@@ -0,0 +1,181 @@
+import io
+
+import pytest
+import requests
+
+from push_to_3yourmind import PushTo3YourmindAPI
+from push_to_3yourmind.exceptions import ServerError
+from push_to_3yourmind.multipart import MultipartEncoder
+from push_to_3yourmind.retry import (
+    RetryPolicy,
+    RetryState,
+    get_stream_positions,
+    is_rewindable,
+    rewind_streams,
+)
+
+
+class Download(io.RawIOBase):
+    """
+    Stream that tells its position but can't seek, like a streamed response
+    """
+
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        return self._data.readinto(buffer)
+
+    def tell(self) -> int:
+        return self._data.tell()
+
+
+def create_response(status_code: int, **headers: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    response._content = b"{}"
+    response.url = "https://example.com/"
+    return response
+
+
+def test_backoff_doubles_up_to_max():
+    policy = RetryPolicy(backoff_factor=0.5, backoff_max=3, jitter=False)
+
+    assert [policy.get_backoff(number) for number in range(1, 6)] == [
+        0.5,
+        1,
+        2,
+        3,
+        3,
+    ]
+
+
+def test_backoff_jitter_stays_below_delay():
+    policy = RetryPolicy(backoff_factor=1, backoff_max=30)
+
+    delays = [policy.get_backoff(4) for _ in range(100)]
+
+    assert all(0 <= delay <= 8 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_retry_after_seconds_and_date():
+    policy = RetryPolicy()
+
+    assert policy.get_retry_after("12") == 12
+    assert policy.get_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert policy.get_retry_after("soon") is None
+    assert RetryPolicy(respect_retry_after=False).get_retry_after("12") is None
+
+
+def test_max_retries_depend_on_method():
+    policy = RetryPolicy(idempotent_retries=3, non_idempotent_retries=1)
+
+    assert policy.get_max_retries("get") == 3
+    assert policy.get_max_retries("DELETE") == 3
+    assert policy.get_max_retries("POST") == 1
+    assert policy.get_max_retries("PATCH") == 1
+
+
+def test_state_stops_after_max_retries():
+    state = RetryState(RetryPolicy(idempotent_retries=2, jitter=False), "GET")
+
+    assert state.get_next_delay() == 0.5
+    assert state.get_next_delay() == 1
+    assert state.get_next_delay() is None
+    assert state.retries == 2
+
+
+def test_state_stops_at_retry_budget():
+    policy = RetryPolicy(idempotent_retries=10, retry_budget=5)
+    state = RetryState(policy, "GET")
+
+    assert state.get_next_delay("4") == 4
+    assert state.get_next_delay("2") is None
+    assert state.total_delay == 4
+
+
+def test_state_without_policy_or_rewindable_body_never_retries():
+    assert RetryState(None, "GET").get_next_delay() is None
+    state = RetryState(RetryPolicy(), "PUT", rewindable=False)
+    assert state.get_next_delay() is None
+
+
+def test_is_rewindable():
+    assert is_rewindable({})
+    assert is_rewindable({"data": b"{}"})
+    assert is_rewindable({"data": {"unit": "mm"}})
+    assert is_rewindable({"data": io.BytesIO(b"data")})
+    assert is_rewindable({"files": {"file": ("cube.stl", io.BytesIO(b"data"))}})
+    assert not is_rewindable({"data": Download(b"data")})
+    assert not is_rewindable({"content": (chunk for chunk in [b"data"])})
+
+
+def test_multipart_body_is_rewindable_if_its_files_are():
+    seekable = MultipartEncoder(files={"file": ("cube.stl", io.BytesIO(b"data"))})
+    download = MultipartEncoder(files={"file": ("cube.stl", Download(b"data"))})
+
+    assert is_rewindable({"data": seekable})
+    assert is_rewindable({"content": seekable.async_stream()})
+    assert not is_rewindable({"data": download})
+    assert not is_rewindable({"content": download.async_stream()})
+
+
+def test_streams_are_rewound_to_their_start_position():
+    stream = io.BytesIO(b"header,data")
+    stream.seek(7)
+    encoder = MultipartEncoder(files={"file": ("cube.stl", stream)})
+    positions = get_stream_positions({"data": encoder})
+
+    body = encoder.read()
+    rewind_streams(positions)
+
+    assert encoder.read() == body
+    assert b"header" not in body
+
+
+@pytest.fixture
+def client():
+    client = PushTo3YourmindAPI(
+        access_token="token",
+        base_url="https://example.com",
+        retry_policy=RetryPolicy(non_idempotent_retries=2, backoff_factor=0),
+    )
+    yield client
+    client.close()
+
+
+def test_retried_upload_sends_the_whole_body(client, monkeypatch):
+    bodies = []
+    responses = [create_response(503), create_response(200)]
+
+    def request(method, url, headers, data, **kwargs):
+        bodies.append(data.read())
+        return responses.pop(0)
+
+    monkeypatch.setattr(client.user_panel._session, "request", request)
+    encoder = MultipartEncoder(files={"file": ("cube.stl", io.BytesIO(b"solid"))})
+
+    client.user_panel._request("POST", "upload/", data=encoder)
+
+    assert len(bodies) == 2
+    assert bodies[0] == bodies[1]
+
+
+def test_upload_of_download_is_not_retried(client, monkeypatch):
+    bodies = []
+
+    def request(method, url, headers, data, **kwargs):
+        bodies.append(data.read())
+        return create_response(503)
+
+    monkeypatch.setattr(client.user_panel._session, "request", request)
+    encoder = MultipartEncoder(files={"file": ("cube.stl", Download(b"solid"))})
+
+    with pytest.raises(ServerError):
+        client.user_panel._request("POST", "upload/", data=encoder)
+    assert len(bodies) == 1
@@ -0,0 +1,161 @@
+from io import BytesIO
+import struct
+
+import pytest
+
+from push_to_3yourmind import stl
+
+
+CUBE_VERTICES = [(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)]
+CUBE_FACES = [
+    (0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+    (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3),
+]  # fmt: skip
+
+
+def get_cube_facets(size: float) -> list:
+    return [
+        [[value * size for value in CUBE_VERTICES[index]] for index in face]
+        for face in CUBE_FACES
+    ]
+
+
+def write_binary_stl(facets: list, header: bytes = b"cube") -> bytes:
+    data = header.ljust(80, b" ") + struct.pack("<I", len(facets))
+    for facet in facets:
+        corners = [value for vertex in facet for value in vertex]
+        data += struct.pack("<12fH", 0, 0, 0, *corners, 0)
+    return data
+
+
+def write_ascii_stl(facets: list) -> bytes:
+    lines = ["solid cube"]
+    for facet in facets:
+        lines += ["  facet normal 0 0 0", "    outer loop"]
+        lines += [f"      vertex {x:g} {y:g} {z:g}" for x, y, z in facet]
+        lines += ["    endloop", "  endfacet"]
+    lines.append("endsolid cube")
+    return "\n".join(lines).encode()
+
+
+@pytest.fixture(autouse=True)
+def numpy():
+    return pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("write", [write_binary_stl, write_ascii_stl])
+def test_cube_report(write):
+    report = stl.inspect_stl(write(get_cube_facets(20)))
+
+    assert report.triangle_count == 12
+    assert report.size == (20, 20, 20)
+    assert report.volume == pytest.approx(8000)
+    assert report.surface_area == pytest.approx(2400)
+    assert report.degenerate_facets == 0
+    assert report.is_valid
+    assert report.warnings == []
+
+
+def test_binary_file_starting_with_solid():
+    data = write_binary_stl(get_cube_facets(20), header=b"solid cube")
+
+    assert not stl.is_ascii_stl(data[: stl.SNIFF_SIZE])
+    assert stl.inspect_stl(data).triangle_count == 12
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 12, 1000])
+@pytest.mark.parametrize("write", [write_binary_stl, write_ascii_stl])
+def test_chunks_cover_all_facets(write, chunk_size, numpy):
+    facets = get_cube_facets(3)
+
+    chunks = list(stl.iter_stl_triangles(BytesIO(write(facets)), chunk_size))
+
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+    assert numpy.concatenate(chunks).tolist() == facets
+
+
+def test_ascii_to_binary_conversion(numpy):
+    facets = get_cube_facets(2)
+    target = BytesIO()
+
+    facet_count = stl.convert_ascii_stl_to_binary(
+        b"", BytesIO(write_ascii_stl(facets)), target
+    )
+
+    assert facet_count == 12
+    assert stl.read_stl_triangles(target.getvalue()).tolist() == facets
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"solid cube\nfacet normal 0 0\nendsolid", write_binary_stl([])[:50]],
+)
+def test_invalid_files_are_reported(data):
+    report = stl.inspect_stl(data)
+
+    assert not report.is_valid
+    assert report.triangle_count == 0
+
+
+def test_empty_and_flat_meshes_are_invalid():
+    flat = [[(0, 0, 0), (10, 0, 0), (0, 10, 0)], [(0, 0, 0), (0, 10, 0), (10, 0, 0)]]
+
+    assert stl.inspect_stl(write_binary_stl([])).problems == ["mesh has no facets"]
+    assert "mesh encloses no volume" in stl.inspect_stl(write_binary_stl(flat)).problems
+
+
+def test_degenerate_facets_are_counted():
+    facets = get_cube_facets(20) + [[(0, 0, 0), (1, 1, 1), (2, 2, 2)]] * 3
+
+    report = stl.inspect_stl(write_binary_stl(facets))
+
+    assert report.degenerate_facets == 3
+    assert not report.is_valid
+
+
+@pytest.mark.parametrize(
+    "largest_dimension, plausible_units, suggested_unit",
+    [
+        (1, ["inch"], "inch"),
+        (10, ["mm", "inch"], None),
+        (40, ["mm", "inch"], None),
+        (100, ["mm"], "mm"),
+        (0.1, [], None),
+        (5000, [], None),
+    ],
+)
+def test_unit_suggestion(largest_dimension, plausible_units, suggested_unit):
+    assert stl.get_plausible_units(largest_dimension) == plausible_units
+    assert stl.suggest_unit(largest_dimension) == suggested_unit
+
+
+def test_unusual_size_is_a_warning():
+    report = stl.inspect_stl(write_binary_stl(get_cube_facets(3000)))
+
+    assert report.is_valid
+    assert report.plausible_units == []
+    assert report.warnings == ["largest dimension 3000 is unusual in mm and inch"]
+
+
+def test_inspect_cad_file_skips_other_files(tmp_path):
+    step_file = tmp_path / "part.step"
+    step_file.write_bytes(b"ISO-10303-21;")
+    stl_file = tmp_path / "cube.stl"
+    stl_file.write_bytes(write_binary_stl(get_cube_facets(20)))
+
+    assert stl.inspect_cad_file(str(step_file)) is None
+    assert stl.inspect_cad_file("https://example.com/cube.stl") is None
+    assert stl.inspect_cad_file(str(stl_file)).triangle_count == 12
+    assert stl.inspect_cad_file(BytesIO(stl_file.read_bytes())) is None
+
+
+def test_inspected_stream_is_rewound(tmp_path):
+    stl_file = tmp_path / "cube.stl"
+    stl_file.write_bytes(b"prefix" + write_binary_stl(get_cube_facets(20)))
+
+    with open(stl_file, "rb") as file:
+        file.read(6)
+        report = stl.inspect_cad_file(file)
+        assert file.tell() == 6
+
+    assert report.triangle_count == 12
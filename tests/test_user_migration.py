@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+import pytest
+
+from benchmarks.server import StandInServer, make_user
+from push_to_3yourmind import PushTo3YourmindAPI, exceptions
+from push_to_3yourmind.user_migration import UserMigrator
+
+
+def test_email_is_reserved_once_case_insensitively():
+    migrator = UserMigrator(origin=None, target=None)
+
+    assert migrator._reserve_email("Ada@example.com")
+    assert not migrator._reserve_email("ada@EXAMPLE.com")
+
+
+def test_concurrent_reservations_of_one_email():
+    migrator = UserMigrator(origin=None, target=None)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        reserved = list(
+            executor.map(migrator._reserve_email, ["ada@example.com"] * 100)
+        )
+
+    assert reserved.count(True) == 1
+
+
+@pytest.fixture
+def servers():
+    with StandInServer(user_count=20) as origin, StandInServer(user_count=5) as target:
+        yield origin, target
+
+
+@pytest.fixture
+def migrator(servers):
+    origin, target = servers
+    origin_client = PushTo3YourmindAPI(access_token="token", base_url=origin.url)
+    target_client = PushTo3YourmindAPI(access_token="token", base_url=target.url)
+    yield UserMigrator(origin_client, target_client, workers=4, page_size=7)
+    origin_client.close()
+    target_client.close()
+
+
+def test_existing_users_are_skipped(migrator, tmp_path):
+    log_path = tmp_path / "migration.jsonl"
+
+    report = migrator.migrate(log_path=str(log_path))
+
+    assert report.counts == {"migrated": 15, "skipped": 5, "failed": 0}
+    results = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert len(results) == 20
+    skipped = {result["user_id"] for result in results if result["status"] == "skipped"}
+    assert skipped == {1, 2, 3, 4, 5}
+    assert migrator.build_email_index().keys() == {
+        f"user{user_id}@example.com" for user_id in range(1, 6)
+    }
+
+
+def test_users_with_same_email_are_created_once(migrator):
+    users = [make_user(30), {**make_user(31), "email": "USER30@example.com"}]
+
+    report = migrator.migrate(users)
+
+    assert report.counts == {"migrated": 1, "skipped": 1, "failed": 0}
+
+
+def test_failed_creation_releases_email(migrator, monkeypatch):
+    def create_user(**kwargs):
+        raise exceptions.ServerError("down")
+
+    monkeypatch.setattr(migrator.target.organization_panel, "create_user", create_user)
+
+    report = migrator.migrate([make_user(30)])
+
+    assert report.failed_steps == {"create_user": 1}
+    assert migrator._reserve_email("user30@example.com")
+
+
+def test_unexpected_errors_are_logged(migrator, tmp_path, monkeypatch):
+    log_path = tmp_path / "migration.jsonl"
+    transfer_details = migrator._transfer_details
+
+    def fail_for_user_30(transfer, executor):
+        if transfer.result.user_id == 30:
+            raise RuntimeError("unexpected response")
+        return transfer_details(transfer, executor)
+
+    monkeypatch.setattr(migrator, "_transfer_details", fail_for_user_30)
+
+    report = migrator.migrate(
+        [make_user(30), make_user(31)], log_path=str(log_path)
+    )
+
+    assert report.counts == {"migrated": 1, "skipped": 0, "failed": 1}
+    assert report.failed_steps == {"unexpected": 1}
+    results = {
+        result["user_id"]: result
+        for result in map(json.loads, log_path.read_text().splitlines())
+    }
+    assert results[30]["error"] == "unexpected"
+    assert "unexpected response" in results[30]["error_reason"]